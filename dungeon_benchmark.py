@@ -0,0 +1,444 @@
+"""Benchmark DungeonTrackerLogic against synthetic histories of several sizes.
+
+    python dungeon_benchmark.py --scales 1000 10000 100000
+    python dungeon_benchmark.py --json baseline.json
+    python dungeon_benchmark.py --compare baseline.json
+    python dungeon_benchmark.py --scales 1000000 --profiles legacy wal
+
+A synthetic database is generated once per scale (and kept in --data-dir
+when given). Each benchmark runs against a fresh copy. It reports the
+median wall time, the peak Python allocation seen by tracemalloc and the
+number of SQL statements traced per call; every trigger program that fires
+counts as one more statement. --compare exits non-zero when a benchmark is
+more than --tolerance times slower than the baseline. --profiles repeats
+every benchmark under each named storage profile from dungeon_config.
+The record_choice benchmarks make 1000 clicks, so their median in ms is
+the time per click in microseconds, with and without the journal.
+
+--comparisons adds the *_legacy benchmarks, which time the code paths
+the current ones replaced. With several scales, the growth exponent of
+each benchmark's time against the visit count is printed (1.0 is linear);
+--max-exponent exits non-zero when one grows faster than that.
+
+This is a script rather than a pytest-benchmark or asv suite because it
+needs a generated database per scale, tracemalloc peaks and traced SQL
+counts, which neither measures. test_dungeon_benchmark.py runs every
+benchmark once at a small scale under pytest, so none of them can rot.
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import date
+
+from dungeon_config import DEFAULT_PROFILE, PROFILES
+from dungeon_journal import RunJournal, journal_path
+from dungeon_service import RunSession
+from dungeon_synthetic import generate_runs, populate, synthetic_loot_names
+from dungeon_tracker_logic import DungeonTrackerLogic
+
+DEFAULT_SCALES = (10**3, 10**4, 10**5)
+SEED = 0
+# The synthetic history covers 2024, so "today" is its last day
+TODAY = date(2024, 12, 31)
+
+BENCHMARKS = {}
+# Old-vs-new comparisons, only run with --comparisons or --only
+COMPARISONS = set()
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    scale: int
+    profile: str
+    seconds: float
+    peak_bytes: int
+    statements: int
+
+
+def benchmark(name, repeat=20, comparison=False, **logic_options):
+    """Register func(logic, context) as a benchmark."""
+
+    def register(func):
+        BENCHMARKS[name] = (func, repeat, logic_options)
+        if comparison:
+            COMPARISONS.add(name)
+        return func
+
+    return register
+
+
+@benchmark("complete_run")
+def bench_complete_run(logic, context):
+    logic.complete_run(next(context["runs"])[2], create_missing_loot=True)
+
+
+@benchmark("complete_run_write_behind_x100", repeat=5, write_behind=True)
+def bench_complete_run_write_behind(logic, context):
+    for _ in range(100):
+        logic.complete_run(next(context["runs"])[2], create_missing_loot=True)
+    logic.flush()
+
+
+@benchmark("save_runs_x1000", repeat=5)
+def bench_save_runs(logic, context):
+    logic.save_runs(
+        [next(context["runs"]) for _ in range(1000)], create_missing_loot=True
+    )
+
+
+def legacy_complete_run(logic, run_data):
+    """complete_run as first written: a room and a loot lookup per visit."""
+    rows = []
+    for date, room, door, loot in run_data:
+        logic.cursor.execute(
+            "SELECT id FROM rooms WHERE dungeon_id = ? AND position = ?",
+            (logic.dungeon_id, room),
+        )
+        room_id = logic.cursor.fetchone()
+        if not room_id:
+            raise ValueError(f"Room {room} not found!")
+        loot_id = None
+        if loot:
+            logic.cursor.execute("SELECT id FROM loot_items WHERE name = ?", (loot,))
+            loot_id = logic.cursor.fetchone()
+            if not loot_id:
+                raise ValueError(f"Loot item '{loot}' not found!")
+            loot_id = loot_id[0]
+        rows.append((logic.dungeon_id, date, room_id[0], door, loot_id))
+    logic.cursor.executemany(
+        "INSERT INTO runs (dungeon_id, run_date, room_id, door, loot_id) "
+        "VALUES (?, ?, ?, ?, ?)",
+        rows,
+    )
+    logic.conn.commit()
+
+
+def register_save_runs_comparison(runs, repeat):
+    """Time saving `runs` runs through save_runs and the legacy path."""
+
+    @benchmark(f"save_runs_x{runs}", repeat=repeat, comparison=True)
+    def bench_save_runs_batch(logic, context):
+        logic.save_runs([next(context["runs"]) for _ in range(runs)])
+
+    @benchmark(f"save_runs_legacy_x{runs}", repeat=repeat, comparison=True)
+    def bench_save_runs_legacy(logic, context):
+        for _ in range(runs):
+            legacy_complete_run(logic, next(context["runs"])[2])
+
+
+for runs, repeat in ((1, 20), (100, 5), (100_000, 1)):
+    register_save_runs_comparison(runs, repeat)
+
+
+@benchmark("get_graph_data")
+def bench_get_graph_data(logic, context):
+    logic.get_graph_data(1)
+
+
+@benchmark("get_graph_data_cached", cache=True)
+def bench_get_graph_data_cached(logic, context):
+    logic.get_graph_data(1)
+
+
+@benchmark("get_loot_items")
+def bench_get_loot_items(logic, context):
+    logic.get_loot_items()
+
+
+@benchmark("generate_report", repeat=5)
+def bench_generate_report(logic, context):
+    logic.generate_report()
+
+
+def legacy_generate_report(logic):
+    """generate_report as first written: two queries per room, loot in Python."""
+    logic.cursor.execute(
+        "SELECT position, id FROM rooms WHERE dungeon_id = ? ORDER BY position",
+        (logic.dungeon_id,),
+    )
+    report_data = {}
+    for room, room_id in logic.cursor.fetchall():
+        logic.cursor.execute(
+            """
+            SELECT li.name
+            FROM runs r
+            JOIN loot_items li ON r.loot_id = li.id
+            WHERE r.room_id = ?
+        """,
+            (room_id,),
+        )
+        loot = [row[0] for row in logic.cursor.fetchall()]
+        logic.cursor.execute(
+            "SELECT door, COUNT(*) FROM runs WHERE room_id = ? GROUP BY door",
+            (room_id,),
+        )
+        door_counts = dict(logic.cursor.fetchall())
+        report_data[room] = (set(loot), door_counts, sum(door_counts.values()))
+    return report_data
+
+
+@benchmark("generate_report_legacy", repeat=5, comparison=True)
+def bench_generate_report_legacy(logic, context):
+    legacy_generate_report(logic)
+
+
+@benchmark("get_crosstab", repeat=3)
+def bench_get_crosstab(logic, context):
+    logic.get_crosstab()
+
+
+@benchmark("crosstab_next_door_slice", cache=True)
+def bench_crosstab_next_door_slice(logic, context):
+    logic.get_crosstab().marginal("next_door", room=2, loot="Synthetic Loot 000")
+
+
+@benchmark("get_run_summaries", repeat=5)
+def bench_get_run_summaries(logic, context):
+    logic.get_run_summaries(limit=50)
+
+
+@benchmark("get_recent_door_counts")
+def bench_get_recent_door_counts(logic, context):
+    logic.get_recent_door_counts(30, today=TODAY)
+
+
+@benchmark("get_daily_door_series")
+def bench_get_daily_door_series(logic, context):
+    logic.get_daily_door_series(1)
+
+
+@benchmark("record_choice_x1000")
+def bench_record_choice(logic, context):
+    session = RunSession(logic.num_rooms, dungeon_id=logic.dungeon_id)
+    for _ in range(1000):
+        session.record_choice(1, "left", "Synthetic Loot 000")
+
+
+@benchmark("record_choice_journaled_x1000")
+def bench_record_choice_journaled(logic, context):
+    session = RunSession(logic.num_rooms, context["journal"], logic.dungeon_id)
+    for _ in range(1000):
+        session.record_choice(1, "left", "Synthetic Loot 000")
+
+
+def synthetic_database(scale, data_dir):
+    """Return the path of a synthetic database with `scale` visits."""
+    path = os.path.join(data_dir, f"synthetic_{scale}_{SEED}.db")
+    if not os.path.exists(path):
+        logic = DungeonTrackerLogic(path, storage=PROFILES["bulk"])
+        try:
+            logic.database_setup()
+            populate(logic, scale, seed=SEED)
+            # Small histories miss rare loot; new runs may need all of it
+            logic.save_runs([], loot_items=synthetic_loot_names())
+            logic.cursor.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            logic.close()
+    return path
+
+
+def run_benchmark(name, scale, source, work_dir, profile=DEFAULT_PROFILE):
+    func, repeat, logic_options = BENCHMARKS[name]
+    path = os.path.join(work_dir, "bench.db")
+    shutil.copyfile(source, path)
+    # New runs come from a different seed so they do not repeat the history
+    context = {
+        "runs": generate_runs(10**9, seed=SEED + 1),
+        "journal": RunJournal(journal_path(path)),
+    }
+    logic = DungeonTrackerLogic(path, storage=PROFILES[profile], **logic_options)
+    try:
+        logic.database_setup()
+        func(logic, context)  # warm up caches and prepared statements
+
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(logic, context)
+            timings.append(time.perf_counter() - start)
+
+        # Memory and statement counts come from one separate, slower call
+        statements = []
+        logic.conn.set_trace_callback(statements.append)
+        tracemalloc.start()
+        try:
+            func(logic, context)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            logic.conn.set_trace_callback(None)
+    finally:
+        logic.close()
+        context["journal"].close()
+        for file in (path, path + "-wal", path + "-shm", journal_path(path)):
+            if os.path.exists(file):
+                os.remove(file)
+    return BenchmarkResult(
+        name, scale, profile, statistics.median(timings), peak, len(statements)
+    )
+
+
+def measure_app_import():
+    """Time importing the Tk app in a fresh interpreter.
+
+    Heavy optional dependencies are imported lazily, so they must not
+    show up in sys.modules after the import.
+    """
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import dungeon_tracker_app\n"
+        "elapsed = time.perf_counter() - start\n"
+        "heavy = [m for m in ('matplotlib', 'numpy', 'pyarrow') if m in sys.modules]\n"
+        "print(elapsed, ','.join(heavy))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    heavy = output[1].split(",") if len(output) > 1 else []
+    return float(output[0]), heavy
+
+
+def scaling_exponents(results):
+    """Return {(name, profile): exponent} of time against visits.
+
+    The exponent is the log-log slope between the smallest and largest
+    scale measured, so 1.0 means linear and anything below is better.
+    """
+    by_benchmark = {}
+    for result in results:
+        if result.scale and result.seconds > 0:
+            by_benchmark.setdefault((result.name, result.profile), []).append(result)
+    exponents = {}
+    for key, measured in by_benchmark.items():
+        small = min(measured, key=lambda result: result.scale)
+        large = max(measured, key=lambda result: result.scale)
+        if large.scale > small.scale:
+            exponents[key] = math.log(large.seconds / small.seconds) / math.log(
+                large.scale / small.scale
+            )
+    return exponents
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def compare(results, baseline_path, tolerance):
+    """Return the results that are more than tolerance times slower."""
+    with open(baseline_path) as f:
+        baseline = {(r["name"], r["scale"], r["profile"]): r for r in json.load(f)}
+    regressions = []
+    for result in results:
+        previous = baseline.get((result.name, result.scale, result.profile))
+        if previous and result.seconds > previous["seconds"] * tolerance:
+            regressions.append((result, previous["seconds"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scales", type=int, nargs="+", default=DEFAULT_SCALES, help="room visits"
+    )
+    parser.add_argument(
+        "--only", nargs="+", choices=sorted(BENCHMARKS), help="benchmarks to run"
+    )
+    parser.add_argument(
+        "--comparisons",
+        action="store_true",
+        help="also time the legacy code paths the benchmarks replaced",
+    )
+    parser.add_argument(
+        "--max-exponent",
+        type=float,
+        help="fail when a benchmark's time grows faster than visits**N",
+    )
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        choices=sorted(PROFILES),
+        default=[DEFAULT_PROFILE],
+        help="storage profiles to compare",
+    )
+    parser.add_argument("--data-dir", help="keep generated databases here")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="baseline results from --json")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    names = args.only or [
+        name for name in BENCHMARKS if args.comparisons or name not in COMPARISONS
+    ]
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        data_dir = args.data_dir or work_dir
+        os.makedirs(data_dir, exist_ok=True)
+        print(
+            f"{'benchmark':<34}{'profile':>8}{'visits':>10}{'median':>12}"
+            f"{'peak':>10}{'SQL':>9}"
+        )
+        for scale in args.scales:
+            start = time.perf_counter()
+            source = synthetic_database(scale, data_dir)
+            print(f"# {scale} visits ready in {time.perf_counter() - start:.1f}s")
+            for name in names:
+                for profile in args.profiles:
+                    result = run_benchmark(name, scale, source, work_dir, profile)
+                    results.append(result)
+                    print(
+                        f"{name:<34}{profile:>8}{scale:>10}"
+                        f"{result.seconds * 1000:>10.3f}ms"
+                        f"{format_bytes(result.peak_bytes):>10}{result.statements:>9}"
+                    )
+
+    status = 0
+    exponents = scaling_exponents(results)
+    for (name, profile), exponent in exponents.items():
+        print(f"{name:<34}{profile:>8}  time grows as visits^{exponent:.2f}")
+        if args.max_exponent is not None and exponent > args.max_exponent:
+            print(f"Scaling: {name} ({profile}) grows faster than linear.")
+            status = 1
+
+    elapsed, heavy = measure_app_import()
+    results.append(BenchmarkResult("import_dungeon_tracker_app", 0, "", elapsed, 0, 0))
+    print(f"{'import_dungeon_tracker_app':<34}{'':>18}{elapsed * 1000:>10.3f}ms")
+    if heavy:
+        print(f"Importing the app pulled in {', '.join(heavy)} eagerly.")
+        status = 1
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([asdict(result) for result in results], f, indent=2)
+    if args.compare:
+        for result, previous in compare(results, args.compare, args.tolerance):
+            print(
+                f"Regression: {result.name} ({result.profile}) at {result.scale} "
+                f"visits took "
+                f"{result.seconds * 1000:.3f}ms (baseline {previous * 1000:.3f}ms)"
+            )
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+class StatsCache:
+    """In-memory copy of the door counts, loot catalogue, room loot and cross-tab.
+
+    DungeonTrackerLogic applies its own writes to the cache right after they
+    are committed, and invalidates it when another connection commits.
+    Everything is for one dungeon, keyed by room number within it.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidate()
+
+    def invalidate(self):
+        """Drop every cached value so the next read goes to the database."""
+        self.loot_items = None
+        self.door_counts = None
+        self.room_loot = None
+        self.crosstab = None
+
+    def get(self, name, loader):
+        """Return the cached value for name, loading it on a miss."""
+        value = getattr(self, name)
+        if value is None:
+            self.misses += 1
+            value = loader()
+            setattr(self, name, value)
+        else:
+            self.hits += 1
+        return value
+
+    def add_loot_item(self, name):
+        if self.loot_items is not None:
+            self.loot_items.append(name)
+
+    def record_visits(self, visits):
+        """Apply committed (room, door, loot_name) visits to the cache."""
+        for room, door, loot_name in visits:
+            if self.door_counts is not None:
+                counts = self.door_counts.setdefault(room, {})
+                counts[door] = counts.get(door, 0) + 1
+            if self.room_loot is not None and loot_name:
+                self.room_loot.setdefault(room, set()).add(loot_name)
+
+    def record_runs(self, runs):
+        """Apply committed runs, each a list of (room, door, loot_name)."""
+        for visits in runs:
+            self.record_visits(visits)
+            if self.crosstab is not None:
+                self.crosstab.add_run(visits)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,81 @@
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+
+DOORS = ["Left", "Right"]
+DOOR_COLORS = ["blue", "green"]
+YLIM_STEP = 10
+
+
+class DoorChartRenderer:
+    """Draw every room's door counts as subplots of a single Tk figure.
+
+    Bars are animated artists: their heights are updated in place and only
+    the changed axes are blitted. A full redraw happens only when a y-limit
+    changes, because that also moves the tick labels.
+    """
+
+    def __init__(self, master, rooms, columns=2):
+        rows = -(-len(rooms) // columns)
+        self.figure = Figure(figsize=(3 * columns, 2 * rows), dpi=100)
+        self.canvas = FigureCanvasTkAgg(self.figure, master)
+
+        self.axes = {}
+        self.bars = {}
+        self.counts = {}
+        self.backgrounds = {}
+        for index, room in enumerate(rooms):
+            ax = self.figure.add_subplot(rows, columns, index + 1)
+            bars = ax.bar(DOORS, [0, 0], color=DOOR_COLORS)
+            for bar in bars:
+                bar.set_animated(True)
+            ax.set_title(f"Room {room} Door Selections")
+            ax.set_ylim(0, 10)
+            self.axes[room] = ax
+            self.bars[room] = bars
+            self.counts[room] = (0, 0)
+        self.figure.tight_layout()
+
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def widget(self):
+        return self.canvas.get_tk_widget()
+
+    def _on_draw(self, event):
+        """Capture the static backgrounds after a full redraw."""
+        for room, ax in self.axes.items():
+            self.backgrounds[room] = self.canvas.copy_from_bbox(ax.bbox)
+        self._blit(self.axes)
+
+    def _blit(self, rooms):
+        for room in rooms:
+            ax = self.axes[room]
+            self.canvas.restore_region(self.backgrounds[room])
+            for bar in self.bars[room]:
+                ax.draw_artist(bar)
+            self.canvas.blit(ax.bbox)
+
+    def update(self, graph_data_by_room):
+        """Apply {room: {"Left": n, "Right": n}} and redraw what changed."""
+        changed = []
+        needs_full_draw = not self.backgrounds
+        for room, graph_data in graph_data_by_room.items():
+            counts = tuple(graph_data[door] for door in DOORS)
+            if counts == self.counts[room]:
+                continue
+            self.counts[room] = counts
+            changed.append(room)
+
+            for bar, height in zip(self.bars[room], counts):
+                bar.set_height(height)
+            # Round the limit up so most updates keep the axes (and ticks) as-is
+            ylim = -(-(max(counts) + 5) // YLIM_STEP) * YLIM_STEP
+            ax = self.axes[room]
+            if ax.get_ylim()[1] != ylim:
+                ax.set_ylim(0, ylim)
+                needs_full_draw = True
+
+        if needs_full_draw:
+            self.canvas.draw()
+        elif changed:
+            self._blit(changed)
+        return bool(changed)
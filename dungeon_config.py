@@ -0,0 +1,120 @@
+"""Storage profiles: where the database lives and how SQLite is tuned.
+
+A profile is read from the [storage] section of an INI file, then any
+DUNGEON_TRACKER_* environment variables are applied on top:
+
+    [storage]
+    profile = wal              ; start from one of PROFILES
+    path = ~/dungeon_runs.db   ; relative paths are relative to this file
+    mmap_size = 268435456
+    cache_size = -65536        ; negative values are KiB, as in SQLite
+    busy_timeout_ms = 5000
+
+The file is DUNGEON_TRACKER_CONFIG, or dungeon_tracker.ini next to this
+module when that exists. Environment variables use the field name, e.g.
+DUNGEON_TRACKER_PATH or DUNGEON_TRACKER_JOURNAL_MODE, and
+DUNGEON_TRACKER_PROFILE picks the base profile.
+"""
+
+import configparser
+import os
+import sqlite3
+from dataclasses import dataclass, fields, replace
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_PATH = os.path.join(MODULE_DIR, "dungeon_runs.db")
+DEFAULT_CONFIG_PATH = os.path.join(MODULE_DIR, "dungeon_tracker.ini")
+ENV_PREFIX = "DUNGEON_TRACKER_"
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+TEMP_STORES = {"DEFAULT", "FILE", "MEMORY"}
+
+
+@dataclass(frozen=True)
+class StorageProfile:
+    """Database path plus the pragmas applied to every new connection."""
+
+    path: str = DEFAULT_DB_PATH
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size: int = -64 * 1024
+    temp_store: str = "MEMORY"
+    busy_timeout_ms: int = 5000
+
+    def __post_init__(self):
+        for name, allowed in (
+            ("journal_mode", JOURNAL_MODES),
+            ("synchronous", SYNCHRONOUS_MODES),
+            ("temp_store", TEMP_STORES),
+        ):
+            value = str(getattr(self, name)).upper()
+            if value not in allowed:
+                raise ValueError(f"Invalid {name} '{value}'")
+            object.__setattr__(self, name, value)
+        for name in ("mmap_size", "cache_size", "busy_timeout_ms"):
+            object.__setattr__(self, name, int(getattr(self, name)))
+
+    def connect(self, path=None):
+        """Open path (default: the profile's path) with this profile's pragmas."""
+        conn = sqlite3.connect(path or self.path, timeout=self.busy_timeout_ms / 1000)
+        conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA mmap_size={self.mmap_size}")
+        conn.execute(f"PRAGMA cache_size={self.cache_size}")
+        conn.execute(f"PRAGMA temp_store={self.temp_store}")
+        conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+        return conn
+
+
+PROFILES = {
+    # SQLite's own defaults: rollback journal, no mmap, ~2 MB page cache
+    "legacy": StorageProfile(
+        journal_mode="DELETE",
+        synchronous="FULL",
+        mmap_size=0,
+        cache_size=-2000,
+        temp_store="DEFAULT",
+    ),
+    "wal": StorageProfile(),
+    # Bulk imports and benchmarks: a crash may lose the last transactions
+    "bulk": StorageProfile(synchronous="OFF", cache_size=-256 * 1024),
+}
+DEFAULT_PROFILE = "wal"
+
+
+def _settings_from_file(path):
+    parser = configparser.ConfigParser(inline_comment_prefixes=(";", "#"))
+    parser.read(path)
+    if not parser.has_section("storage"):
+        return {}
+    settings = dict(parser["storage"])
+    if "path" in settings:
+        settings["path"] = os.path.join(
+            os.path.dirname(os.path.abspath(path)),
+            os.path.expanduser(settings["path"]),
+        )
+    return settings
+
+
+def load_storage_profile(config_path=None, environ=None):
+    """Build the storage profile from the config file and the environment."""
+    environ = os.environ if environ is None else environ
+    config_path = config_path or environ.get(ENV_PREFIX + "CONFIG")
+    if config_path is None and os.path.exists(DEFAULT_CONFIG_PATH):
+        config_path = DEFAULT_CONFIG_PATH
+
+    settings = _settings_from_file(config_path) if config_path else {}
+    for field in ["profile"] + [field.name for field in fields(StorageProfile)]:
+        value = environ.get(ENV_PREFIX + field.upper())
+        if value:
+            settings[field] = os.path.expanduser(value) if field == "path" else value
+
+    name = settings.pop("profile", DEFAULT_PROFILE)
+    if name not in PROFILES:
+        raise ValueError(f"Unknown storage profile '{name}'")
+    unknown = settings.keys() - {field.name for field in fields(StorageProfile)}
+    if unknown:
+        raise ValueError(f"Unknown storage settings: {', '.join(sorted(unknown))}")
+    return replace(PROFILES[name], **settings)
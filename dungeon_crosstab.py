@@ -0,0 +1,107 @@
+DIMENSIONS = ("room", "loot", "door", "next_door")
+
+
+def _label_key(value):
+    # Missing loot / next doors (None) sort after the real values
+    return (value is None, value if value is not None else 0)
+
+
+class CrossTab:
+    """Sparse visit counts over room, loot, door and the next room's door.
+
+    Keys are (room, loot_name, door, next_door) tuples, room being the room
+    number; loot_name is None for visits without loot and next_door is None
+    when the run ended in that room. Only combinations that occurred are
+    stored, and every query is answered from these counts without touching
+    the database.
+    """
+
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, key, count=1):
+        self.counts[key] = self.counts.get(key, 0) + count
+
+    def add_run(self, visits):
+        """Count a run's (room, door, loot_name) visits, in room order."""
+        doors = {room: door for room, door, _ in visits}
+        for room, door, loot_name in visits:
+            self.add((room, loot_name or None, door, doors.get(room + 1)))
+
+    def _matches(self, filters):
+        unknown = filters.keys() - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {', '.join(sorted(unknown))}")
+        positions = [(DIMENSIONS.index(dim), value) for dim, value in filters.items()]
+        for key, count in self.counts.items():
+            if all(key[i] == value for i, value in positions):
+                yield key, count
+
+    def slice(self, **filters):
+        """Return a CrossTab holding only the keys that match every filter."""
+        return CrossTab(self._matches(filters))
+
+    def total(self, **filters):
+        return sum(count for _, count in self._matches(filters))
+
+    def marginal(self, *dimensions, **filters):
+        """Sum the matching counts over everything but the given dimensions.
+
+        With one dimension the result is keyed by its values, otherwise by
+        tuples of values, e.g. marginal("next_door", room=2, loot="Mamonite").
+        """
+        positions = [DIMENSIONS.index(name) for name in dimensions]
+        totals = {}
+        for key, count in self._matches(filters):
+            label = tuple(key[i] for i in positions)
+            if len(label) == 1:
+                label = label[0]
+            totals[label] = totals.get(label, 0) + count
+        return totals
+
+    def matrix(self, rows, columns, **filters):
+        """Return (row labels, column labels, dense rows) for two dimensions."""
+        cells = self.marginal(rows, columns, **filters)
+        row_labels = sorted({row for row, _ in cells}, key=_label_key)
+        column_labels = sorted({column for _, column in cells}, key=_label_key)
+        values = [
+            [cells.get((row, column), 0) for column in column_labels]
+            for row in row_labels
+        ]
+        return row_labels, column_labels, values
+
+
+def fetch_crosstab(cursor, dungeon_id):
+    """Build one dungeon's cross-tab in one grouped pass over its visits.
+
+    Each visit is joined to the visit of the next room in the same
+    dungeon run, which the (dungeon_run_id, room_id, loot_id) index serves
+    once room_order has mapped every room to the id of the room after it.
+    """
+    cursor.execute(
+        """
+        WITH room_order AS (
+            SELECT rm.id, rm.position, nr.id AS next_id
+            FROM rooms rm
+            LEFT JOIN rooms nr
+              ON nr.dungeon_id = rm.dungeon_id AND nr.position = rm.position + 1
+            WHERE rm.dungeon_id = ?
+        )
+        SELECT ro.position, li.name, r.door, nxt.door, COUNT(*)
+        FROM runs r
+        JOIN room_order ro ON ro.id = r.room_id
+        LEFT JOIN loot_items li ON li.id = r.loot_id
+        LEFT JOIN runs nxt
+          ON nxt.dungeon_run_id = r.dungeon_run_id AND nxt.room_id = ro.next_id
+        WHERE r.dungeon_id = ?
+        GROUP BY r.room_id, r.loot_id, r.door, nxt.door
+    """,
+        (dungeon_id, dungeon_id),
+    )
+    crosstab = CrossTab()
+    for room, loot_name, door, next_door, count in cursor.fetchall():
+        crosstab.add((room, loot_name, door, next_door), count)
+    return crosstab
@@ -0,0 +1,376 @@
+"""Export the tracker tables to columnar files and analyse them offline.
+
+    python dungeon_export.py export history.npz
+    python dungeon_export.py export history_parquet --format parquet
+    python dungeon_export.py report history.npz --compare
+
+Room visits of the selected dungeon (--dungeon) are streamed out in chunks,
+with room_id holding the room number within that dungeon; the dungeon's
+depth is stored alongside so reports cover all of its rooms. Doors and loot names are
+dictionary-encoded as small integer codes (-1 for no loot); the report
+statistics are then computed from those arrays with NumPy alone.
+NumPy .npz needs nothing else; Parquet needs pyarrow.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from dungeon_migrations import DEFAULT_DUNGEON_ID
+from dungeon_report import NUM_ROOMS, build_report
+from dungeon_tracker_logic import DungeonTrackerLogic
+
+DOORS = ("left", "right")
+
+
+@contextmanager
+def read_snapshot(conn):
+    """Run every query inside one read transaction.
+
+    In WAL mode the queries all see the snapshot taken by the first of them,
+    so counts, chunks and dictionaries agree even while others commit.
+    """
+    conn.execute("BEGIN")
+    try:
+        yield
+    finally:
+        conn.execute("COMMIT")
+
+
+def fetch_loot_dictionary(cursor):
+    """Return (loot names, {loot_id: code}) for dictionary encoding."""
+    cursor.execute("SELECT id, name FROM loot_items ORDER BY id")
+    rows = cursor.fetchall()
+    codes = {loot_id: i for i, (loot_id, _) in enumerate(rows)}
+    return [name for _, name in rows], codes
+
+
+def iter_visit_chunks(logic, chunk_size):
+    """Yield the runs table as dicts of encoded NumPy columns, chunk by chunk.
+
+    run_date is yielded as a list of strings; callers encode it themselves.
+    """
+    logic.flush()
+    _, loot_codes = fetch_loot_dictionary(logic.cursor)
+    door_codes = {door: i for i, door in enumerate(DOORS)}
+
+    cursor = logic.conn.cursor()
+    cursor.execute(
+        """
+        SELECT r.id, IFNULL(r.dungeon_run_id, -1), rm.position, r.door, r.loot_id,
+               r.run_date
+        FROM runs r
+        JOIN rooms rm ON rm.id = r.room_id
+        WHERE r.dungeon_id = ?
+        ORDER BY r.id
+    """,
+        (logic.dungeon_id,),
+    )
+    while rows := cursor.fetchmany(chunk_size):
+        visit_ids, run_ids, room_ids, doors, loot_ids, run_dates = zip(*rows)
+        yield {
+            "visit_id": np.array(visit_ids, dtype=np.int64),
+            "dungeon_run_id": np.array(run_ids, dtype=np.int64),
+            "room_id": np.array(room_ids, dtype=np.int32),
+            "door": np.array([door_codes[door] for door in doors], dtype=np.int8),
+            "loot": np.array(
+                [loot_codes.get(loot_id, -1) for loot_id in loot_ids], dtype=np.int32
+            ),
+            "run_date": list(run_dates),
+        }
+
+
+def export_npz(logic, path, chunk_size=100000):
+    """Write every visit column plus the dictionaries to one .npz file.
+
+    Chunks are written into memory-mapped scratch arrays first, so memory
+    use stays bounded by the chunk size rather than the table size. The
+    row count and the rows come from one read snapshot, so rows committed
+    meanwhile cannot overflow the preallocated arrays.
+    """
+    logic.flush()
+    with read_snapshot(logic.conn):
+        return _export_npz(logic, path, chunk_size)
+
+
+def _export_npz(logic, path, chunk_size):
+    logic.cursor.execute(
+        "SELECT COUNT(*) FROM runs WHERE dungeon_id = ?", (logic.dungeon_id,)
+    )
+    total = logic.cursor.fetchone()[0]
+    loot_names, _ = fetch_loot_dictionary(logic.cursor)
+    dtypes = {
+        "visit_id": np.int64,
+        "dungeon_run_id": np.int64,
+        "room_id": np.int32,
+        "door": np.int8,
+        "loot": np.int32,
+        "run_date": np.int32,
+    }
+
+    with tempfile.TemporaryDirectory() as scratch:
+        columns = {
+            name: np.lib.format.open_memmap(
+                os.path.join(scratch, f"{name}.npy"),
+                mode="w+",
+                dtype=dtype,
+                shape=(total,),
+            )
+            for name, dtype in dtypes.items()
+        }
+        date_codes = {}
+        offset = 0
+        for chunk in iter_visit_chunks(logic, chunk_size):
+            size = len(chunk["visit_id"])
+            chunk["run_date"] = np.array(
+                [
+                    date_codes.setdefault(day, len(date_codes))
+                    for day in chunk["run_date"]
+                ],
+                dtype=np.int32,
+            )
+            for name, values in chunk.items():
+                columns[name][offset : offset + size] = values
+            offset += size
+
+        logic.cursor.execute(
+            "SELECT id, run_date, started_at, ended_at FROM dungeon_runs "
+            "WHERE dungeon_id = ? ORDER BY id",
+            (logic.dungeon_id,),
+        )
+        runs = logic.cursor.fetchall()
+        np.savez(
+            path,
+            **columns,
+            loot_names=np.array(loot_names, dtype=str),
+            doors=np.array(DOORS),
+            num_rooms=np.int32(logic.num_rooms),
+            dates=np.array(list(date_codes), dtype=str),
+            run_ids=np.array([row[0] for row in runs], dtype=np.int64),
+            run_started_at=np.array([row[2] or "" for row in runs], dtype=str),
+            run_ended_at=np.array([row[3] or "" for row in runs], dtype=str),
+        )
+        del columns
+    return total
+
+
+def export_parquet(logic, directory, chunk_size=100000):
+    """Write visits, dungeon_runs and loot_items as Parquet files.
+
+    Every table is read from one snapshot, so the files agree with each other.
+    """
+    os.makedirs(directory, exist_ok=True)
+    logic.flush()
+    with read_snapshot(logic.conn):
+        return _export_parquet(logic, directory, chunk_size)
+
+
+def _export_parquet(logic, directory, chunk_size):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    loot_names, _ = fetch_loot_dictionary(logic.cursor)
+    loot_dictionary = pa.array(loot_names, type=pa.string())
+    door_dictionary = pa.array(DOORS, type=pa.string())
+
+    schema = pa.schema(
+        [
+            ("visit_id", pa.int64()),
+            ("dungeon_run_id", pa.int64()),
+            ("room_id", pa.int32()),
+            ("door", pa.dictionary(pa.int8(), pa.string())),
+            ("loot", pa.dictionary(pa.int32(), pa.string())),
+            ("run_date", pa.string()),
+        ],
+        metadata={"num_rooms": str(logic.num_rooms)},
+    )
+    total = 0
+    with pq.ParquetWriter(os.path.join(directory, "visits.parquet"), schema) as writer:
+        for chunk in iter_visit_chunks(logic, chunk_size):
+            loot = chunk["loot"]
+            batch = pa.record_batch(
+                [
+                    pa.array(chunk["visit_id"]),
+                    pa.array(chunk["dungeon_run_id"]),
+                    pa.array(chunk["room_id"]),
+                    pa.DictionaryArray.from_arrays(chunk["door"], door_dictionary),
+                    pa.DictionaryArray.from_arrays(
+                        pa.array(loot, mask=loot < 0), loot_dictionary
+                    ),
+                    pa.array(chunk["run_date"], type=pa.string()),
+                ],
+                schema=schema,
+            )
+            writer.write_batch(batch)
+            total += len(loot)
+
+    logic.cursor.execute(
+        "SELECT id, run_date, started_at, ended_at FROM dungeon_runs "
+        "WHERE dungeon_id = ? ORDER BY id",
+        (logic.dungeon_id,),
+    )
+    runs = logic.cursor.fetchall()
+    pq.write_table(
+        pa.table(
+            dict(zip(("id", "run_date", "started_at", "ended_at"), zip(*runs)))
+            if runs
+            else {"id": pa.array([], pa.int64())}
+        ),
+        os.path.join(directory, "dungeon_runs.parquet"),
+    )
+    pq.write_table(
+        pa.table({"name": loot_dictionary}),
+        os.path.join(directory, "loot_items.parquet"),
+    )
+    return total
+
+
+class ColumnarAnalytics:
+    """Read-only report statistics computed from exported columns."""
+
+    def __init__(self, room_id, door, loot, loot_names, num_rooms=NUM_ROOMS):
+        self.room_id = np.asarray(room_id)
+        self.door = np.asarray(door)
+        self.loot = np.asarray(loot)
+        self.loot_names = list(loot_names)
+        self.num_rooms = num_rooms
+
+    @classmethod
+    def load(cls, path):
+        """Load an .npz file or a Parquet export directory."""
+        if os.path.isdir(path):
+            return cls._load_parquet(path)
+        with np.load(path) as data:
+            # Exports written before num_rooms was stored are of the default dungeon
+            num_rooms = int(data["num_rooms"]) if "num_rooms" in data else NUM_ROOMS
+            return cls(
+                data["room_id"],
+                data["door"],
+                data["loot"],
+                data["loot_names"],
+                num_rooms,
+            )
+
+    @classmethod
+    def _load_parquet(cls, directory):
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(
+            os.path.join(directory, "visits.parquet"),
+            columns=["room_id", "door", "loot"],
+        ).unify_dictionaries()
+        metadata = table.schema.metadata or {}
+        num_rooms = int(metadata.get(b"num_rooms", NUM_ROOMS))
+        loot_names = pq.read_table(os.path.join(directory, "loot_items.parquet"))
+
+        def codes(name):
+            chunks = table.column(name).chunks
+            if not chunks:
+                return np.array([], dtype=np.int32)
+            return np.concatenate(
+                [pc.fill_null(chunk.indices, -1).to_numpy() for chunk in chunks]
+            )
+
+        return cls(
+            table.column("room_id").to_numpy(),
+            codes("door"),
+            codes("loot"),
+            loot_names.column("name").to_pylist(),
+            num_rooms,
+        )
+
+    def door_counts(self):
+        """Return {room_id: {door: count}} with one bincount."""
+        if not len(self.room_id):
+            return {}
+        counts = np.bincount(
+            self.room_id.astype(np.int64) * len(DOORS) + self.door,
+            minlength=(self.room_id.max() + 1) * len(DOORS),
+        ).reshape(-1, len(DOORS))
+        return {
+            room_id: {door: int(n) for door, n in zip(DOORS, row) if n}
+            for room_id, row in enumerate(counts)
+            if row.any()
+        }
+
+    def room_loot(self):
+        """Return {room_id: {loot names}} from the distinct (room, loot) pairs."""
+        has_loot = self.loot >= 0
+        width = len(self.loot_names)
+        pairs = np.unique(
+            self.room_id[has_loot].astype(np.int64) * width + self.loot[has_loot]
+        )
+        room_loot = {}
+        for room_id, code in zip(*np.divmod(pairs, width)):
+            room_loot.setdefault(int(room_id), set()).add(self.loot_names[code])
+        return room_loot
+
+    def report(self):
+        return build_report(self.door_counts(), self.room_loot(), self.num_rooms)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database file (default: storage profile path)")
+    parser.add_argument(
+        "--dungeon", type=int, default=DEFAULT_DUNGEON_ID, help="dungeon id"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export = subparsers.add_parser("export", help="write a columnar export")
+    export.add_argument("path", help=".npz file or Parquet directory")
+    export.add_argument("--format", choices=["npz", "parquet"], default="npz")
+    export.add_argument("--chunk-size", type=int, default=100000)
+
+    report = subparsers.add_parser("report", help="report from a columnar export")
+    report.add_argument("path", help=".npz file or Parquet directory")
+    report.add_argument(
+        "--compare", action="store_true", help="time the SQLite report as well"
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        logic = DungeonTrackerLogic(args.db, dungeon_id=args.dungeon)
+        try:
+            logic.database_setup()
+            start = time.perf_counter()
+            rows = logic.export_columnar(
+                args.path, format=args.format, chunk_size=args.chunk_size
+            )
+            elapsed = time.perf_counter() - start
+        finally:
+            logic.close()
+        print(f"Exported {rows} visits to {args.path} in {elapsed:.2f}s.")
+        return 0
+
+    start = time.perf_counter()
+    analytics = ColumnarAnalytics.load(args.path)
+    columnar_report = analytics.report()
+    columnar_time = time.perf_counter() - start
+    for row in columnar_report.as_rows().values():
+        print(" | ".join(value.replace("\n", ", ") for value in row))
+    print(f"Columnar report: {columnar_time * 1000:.1f}ms (including load)")
+
+    if args.compare:
+        logic = DungeonTrackerLogic(args.db, dungeon_id=args.dungeon)
+        try:
+            logic.database_setup()
+            start = time.perf_counter()
+            sqlite_report = logic.get_report()
+            sqlite_time = time.perf_counter() - start
+        finally:
+            logic.close()
+        print(f"SQLite report: {sqlite_time * 1000:.1f}ms")
+        if sqlite_report != columnar_report:
+            print("Warning: the export is out of date with the database.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""Stream historical door/loot logs from CSV or JSONL into the database.
+
+Each record describes one room visit with the fields run_date (YYYY-MM-DD),
+room (1 up to the dungeon's depth), door (left/right) and an optional loot
+name. An optional run field groups visits into runs; without it a new run
+starts whenever the date changes or the room number does not increase:
+
+    python dungeon_import.py history.csv --db dungeon_runs.db --dungeon 1
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from datetime import date
+
+from dungeon_migrations import DEFAULT_DUNGEON_ID
+from dungeon_report import NUM_ROOMS
+from dungeon_tracker_logic import DungeonTrackerLogic
+
+DOORS = ("left", "right")
+
+
+def read_csv(path):
+    """Yield (line_number, record) pairs from a CSV file with a header row."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for record in reader:
+            yield reader.line_num, record
+
+
+def read_jsonl(path):
+    """Yield (line_number, record) pairs from a JSON-lines file."""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, ValueError(f"invalid JSON: {e}")
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+def parse_record(record, num_rooms=NUM_ROOMS):
+    """Convert a raw record into a (run_key, (run_date, room, door, loot)) pair."""
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("record is not an object")
+
+    run_date = str(record.get("run_date") or "").strip()
+    try:
+        date.fromisoformat(run_date)
+    except ValueError:
+        raise ValueError(f"invalid run_date {run_date!r}") from None
+
+    try:
+        room = int(record.get("room"))
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid room {record.get('room')!r}") from None
+    if not 1 <= room <= num_rooms:
+        raise ValueError(f"room {room} is out of range")
+
+    door = str(record.get("door") or "").strip().lower()
+    if door not in DOORS:
+        raise ValueError(f"invalid door {record.get('door')!r}")
+
+    loot = str(record.get("loot") or "").strip()
+    return record.get("run") or None, (run_date, room, door, loot)
+
+
+def validate(records, errors, num_rooms=NUM_ROOMS):
+    """Yield parsed records, reporting bad ones to errors and skipping them."""
+    for line_number, record in records:
+        try:
+            yield parse_record(record, num_rooms)
+        except ValueError as e:
+            errors.write(f"line {line_number}: {e}\n")
+
+
+def group_runs(records):
+    """Yield the visits of each run as a list, in file order."""
+    run = []
+    previous_key = None
+    for run_key, visit in records:
+        if run:
+            previous_date, previous_room = run[-1][:2]
+            if run_key is not None or previous_key is not None:
+                new_run = run_key != previous_key
+            else:
+                new_run = visit[0] != previous_date or visit[1] <= previous_room
+            if new_run:
+                yield run
+                run = []
+        run.append(visit)
+        previous_key = run_key
+    if run:
+        yield run
+
+
+def chunk_runs(runs, size):
+    """Yield lists of whole runs holding roughly size visits each."""
+    chunk = []
+    rows = 0
+    for run_data in runs:
+        chunk.append((None, None, run_data))
+        rows += len(run_data)
+        if rows >= size:
+            yield chunk, rows
+            chunk = []
+            rows = 0
+    if chunk:
+        yield chunk, rows
+
+
+def import_file(logic, path, file_format, chunk_size=10000, progress=None):
+    """Import a log file chunk by chunk and return (rows, seconds)."""
+    logic.enable_bulk_writes()
+    records = READERS[file_format](path)
+    runs = group_runs(validate(records, sys.stderr, logic.num_rooms))
+
+    rows = 0
+    start = time.perf_counter()
+    for chunk, chunk_rows in chunk_runs(runs, chunk_size):
+        logic.save_runs(chunk, create_missing_loot=True)
+        rows += chunk_rows
+        if progress is not None:
+            elapsed = time.perf_counter() - start
+            progress.write(f"{rows} rows ({rows / elapsed:,.0f} rows/s)\n")
+    return rows, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="CSV or JSONL file to import")
+    parser.add_argument("--db", help="database file (default: storage profile path)")
+    parser.add_argument(
+        "--format",
+        choices=sorted(READERS),
+        help="input format (default: from the file extension)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=10000,
+        help="rows committed per transaction",
+    )
+    parser.add_argument("--quiet", action="store_true", help="no progress output")
+    parser.add_argument(
+        "--dungeon", type=int, default=DEFAULT_DUNGEON_ID, help="dungeon id"
+    )
+    args = parser.parse_args(argv)
+
+    file_format = args.format or args.path.rsplit(".", 1)[-1].lower()
+    if file_format not in READERS:
+        parser.error(f"cannot infer the format of {args.path}; pass --format")
+
+    logic = DungeonTrackerLogic(args.db, dungeon_id=args.dungeon)
+    try:
+        logic.database_setup()
+        rows, seconds = import_file(
+            logic,
+            args.path,
+            file_format,
+            chunk_size=args.chunk_size,
+            progress=None if args.quiet else sys.stderr,
+        )
+    finally:
+        logic.close()
+
+    rate = rows / seconds if seconds else 0
+    print(f"Imported {rows} rows in {seconds:.2f}s ({rate:,.0f} rows/s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
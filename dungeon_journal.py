@@ -0,0 +1,146 @@
+"""Crash-recovery journal for the run in progress.
+
+Every door choice is appended to a JSON-lines file next to the database
+before the run is saved, so a crash or an unexpected exit mid-dungeon
+loses nothing: the GUIs replay the journal on startup and truncate it
+once the run is completed.
+"""
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Longest time a written choice waits for fsync; a crash of the app itself
+# loses nothing because every line is flushed to the OS immediately
+SYNC_INTERVAL = 1.0
+ENTRY_KEYS = {"dungeon_id", "started_at", "run_date", "room", "door", "loot"}
+
+
+def journal_path(db_path):
+    """Return the journal file used alongside the given database."""
+    return os.path.splitext(db_path)[0] + ".journal"
+
+
+@dataclass
+class PendingRun:
+    """A run recovered from the journal."""
+
+    dungeon_id: int
+    started_at: str
+    run_data: list
+
+
+class RunJournal:
+    """Append-only JSON-lines journal with batched fsync.
+
+    append() costs one small write plus a flush; a background thread
+    fsyncs whatever was appended at most every sync_interval seconds.
+    A torn last line left by a crash mid-write is dropped when the
+    journal is opened.
+    """
+
+    def __init__(self, path, sync_interval=SYNC_INTERVAL):
+        self.path = path
+        self._drop_torn_tail()
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._closed = threading.Event()
+        self._thread = threading.Thread(
+            target=self._sync_loop,
+            args=(sync_interval,),
+            name="RunJournal",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _drop_torn_tail(self):
+        try:
+            with open(self.path, "rb+") as f:
+                data = f.read()
+                if data and not data.endswith(b"\n"):
+                    f.truncate(data.rfind(b"\n") + 1)
+        except FileNotFoundError:
+            pass
+
+    def append(self, dungeon_id, started_at, visit):
+        """Journal one (run_date, room, door, loot) visit of a run."""
+        run_date, room, door, loot = visit
+        line = json.dumps(
+            {
+                "dungeon_id": dungeon_id,
+                "started_at": started_at,
+                "run_date": run_date,
+                "room": room,
+                "door": door,
+                "loot": loot,
+            },
+            separators=(",", ":"),
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self._dirty = True
+
+    def replay(self):
+        """Return the journaled PendingRun, or None if the journal is empty."""
+        with self._lock:
+            with open(self.path, encoding="utf-8", errors="replace") as f:
+                entries = [entry for entry in map(self._parse, f) if entry]
+        if not entries:
+            return None
+        first = entries[0]
+        return PendingRun(
+            first["dungeon_id"],
+            first["started_at"],
+            [
+                (entry["run_date"], entry["room"], entry["door"], entry["loot"])
+                for entry in entries
+                if entry["dungeon_id"] == first["dungeon_id"]
+            ],
+        )
+
+    @staticmethod
+    def _parse(line):
+        # A power cut can leave garbage anywhere, not just a torn last line;
+        # skip it rather than refuse to start
+        if not line.strip():
+            return None
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            entry = None
+        if not isinstance(entry, dict) or not ENTRY_KEYS <= entry.keys():
+            logger.warning("Skipping unreadable journal line: %r", line[:80])
+            return None
+        return entry
+
+    def truncate(self):
+        """Empty the journal durably, e.g. once its run has been saved."""
+        with self._lock:
+            self._file.truncate(0)
+            os.fsync(self._file.fileno())
+            self._dirty = False
+
+    def sync(self):
+        """fsync anything appended since the last sync."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, False
+        # Outside the lock, so appends never wait on the disk
+        if dirty:
+            os.fsync(self._file.fileno())
+
+    def _sync_loop(self, interval):
+        while not self._closed.wait(interval):
+            self.sync()
+
+    def close(self):
+        """Stop the sync thread, then sync and close the file."""
+        self._closed.set()
+        self._thread.join()
+        self.sync()
+        self._file.close()
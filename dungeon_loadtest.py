@@ -0,0 +1,123 @@
+"""Load-test a running dungeon_server and report requests/s and latency.
+
+    python dungeon_loadtest.py --port 8080 --clients 32 --requests 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date
+
+READ_PATHS = ["/stats/doors", "/stats/report", "/loot", "/runs?limit=20"]
+
+
+async def send(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        (
+            f"{method} {path} HTTP/1.1\r\n"
+            "Host: localhost\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode("latin-1")
+        + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+def random_run(rng, loot_items):
+    run_date = date.today().isoformat()
+    depth = rng.randint(1, 5)
+    return [
+        [run_date, room, rng.choice(["left", "right"]), rng.choice(loot_items)]
+        for room in range(1, depth + 1)
+    ]
+
+
+async def client(host, port, requests, write_ratio, loot_items, seed, latencies):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    errors = 0
+    try:
+        for _ in range(requests):
+            start = time.perf_counter()
+            if rng.random() < write_ratio:
+                payload = {"run_data": random_run(rng, loot_items)}
+                status = await send(reader, writer, "POST", "/runs", payload)
+            else:
+                status = await send(reader, writer, "GET", rng.choice(READ_PATHS))
+            latencies.append(time.perf_counter() - start)
+            errors += status >= 400
+    finally:
+        writer.close()
+    return errors
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+async def run_load_test(args):
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    await send(reader, writer, "POST", "/loot", {"name": "Load Test Coffer"})
+    writer.close()
+    loot_items = ["", "Load Test Coffer"]
+
+    latencies = []
+    start = time.perf_counter()
+    errors = await asyncio.gather(
+        *(
+            client(
+                args.host,
+                args.port,
+                args.requests,
+                args.write_ratio,
+                loot_items,
+                args.seed + i,
+                latencies,
+            )
+            for i in range(args.clients)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies)} requests in {elapsed:.2f}s")
+    print(f"throughput: {len(latencies) / elapsed:,.0f} requests/s")
+    print(
+        f"latency: p50 {percentile(latencies, 0.50) * 1000:.2f}ms, "
+        f"p99 {percentile(latencies, 0.99) * 1000:.2f}ms, "
+        f"max {latencies[-1] * 1000:.2f}ms"
+    )
+    print(f"errors: {sum(errors)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200, help="per client")
+    parser.add_argument(
+        "--write-ratio", type=float, default=0.2, help="share of POST /runs"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    asyncio.run(run_load_test(args))
+
+
+if __name__ == "__main__":
+    main()
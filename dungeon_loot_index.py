@@ -0,0 +1,60 @@
+from bisect import bisect_left, insort
+
+
+class LootIndex:
+    """Case-insensitive type-ahead index over loot names.
+
+    Every word start of every name is kept in one sorted list, so a query
+    matches names where any word begins with it ("gla" finds "Cat Eye
+    Glasses") with a binary search instead of a scan. Adding a name inserts
+    its entries in place.
+    """
+
+    def __init__(self, names=()):
+        self._name_set = set(names)
+        self.names = sorted(self._name_set, key=str.casefold)
+        self._entries = sorted(
+            entry for name in self.names for entry in self._entries_for(name)
+        )
+
+    @staticmethod
+    def _entries_for(name):
+        folded = name.casefold()
+        starts = [0] + [i + 1 for i, char in enumerate(folded) if char == " "]
+        return {(folded[start:], name) for start in starts if start < len(folded)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._name_set
+
+    def add(self, name):
+        """Index a new name and return its position in the sorted names."""
+        if name in self._name_set:
+            return self.names.index(name)
+        position = bisect_left(self.names, name.casefold(), key=str.casefold)
+        self._name_set.add(name)
+        self.names.insert(position, name)
+        for entry in self._entries_for(name):
+            insort(self._entries, entry)
+        return position
+
+    def search(self, query, limit=50):
+        """Return up to limit names with a word starting with query."""
+        query = query.strip().casefold()
+        if not query:
+            return self.names[:limit]
+
+        matches = []
+        seen = set()
+        position = bisect_left(self._entries, (query,))
+        while position < len(self._entries) and len(matches) < limit:
+            key, name = self._entries[position]
+            if not key.startswith(query):
+                break
+            if name not in seen:
+                seen.add(name)
+                matches.append(name)
+            position += 1
+        return sorted(matches, key=str.casefold)
@@ -0,0 +1,524 @@
+import argparse
+import sys
+
+from dungeon_config import load_storage_profile
+
+ROOMS = [
+    ("Room 1", "The first room of the dungeon."),
+    ("Room 2", "The second room of the dungeon."),
+    ("Room 3", "The third room of the dungeon."),
+    ("Room 4", "The fourth room of the dungeon."),
+    ("Room 5", "The final room of the dungeon."),
+]
+
+# The dungeon every room and run recorded before schema version 6 belongs to
+DEFAULT_DUNGEON_ID = 1
+DEFAULT_DUNGEON_NAME = "Treasure Dungeon"
+
+
+def create_dungeon(cursor, name, num_rooms):
+    """Insert a dungeon and its numbered rooms; return the new dungeon id."""
+    if num_rooms < 2:
+        raise ValueError("A dungeon needs at least two rooms.")
+    cursor.execute("INSERT INTO dungeons (name) VALUES (?)", (name,))
+    dungeon_id = cursor.lastrowid
+    cursor.executemany(
+        "INSERT INTO rooms (name, description, dungeon_id, position) "
+        "VALUES (?, ?, ?, ?)",
+        [
+            (
+                f"Room {position}",
+                f"Room {position} of {name}."
+                if position < num_rooms
+                else f"The final room of {name}.",
+                dungeon_id,
+                position,
+            )
+            for position in range(1, num_rooms + 1)
+        ],
+    )
+    return dungeon_id
+
+
+def create_base_schema(cursor):
+    """Create the original rooms, loot_items and runs tables."""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rooms (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT
+        )
+    """
+    )
+
+    for room_name, room_description in ROOMS:
+        # Check if the room already exists by its name
+        cursor.execute("SELECT COUNT(*) FROM rooms WHERE name = ?", (room_name,))
+        if cursor.fetchone()[0] == 0:
+            # If the room does not exist, insert it
+            cursor.execute(
+                "INSERT INTO rooms (name, description) VALUES (?, ?)",
+                (room_name, room_description),
+            )
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS loot_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL
+        )
+    """
+    )
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_date TEXT NOT NULL,
+            room_id INTEGER NOT NULL,
+            door TEXT NOT NULL,
+            loot_id INTEGER,
+            FOREIGN KEY (room_id) REFERENCES rooms(id),
+            FOREIGN KEY (loot_id) REFERENCES loot_items(id)
+        )
+    """
+    )
+
+
+def add_covering_indexes(cursor):
+    """Index the columns used by the graph, report and lookup queries."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rooms_name ON rooms(name)")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_runs_room_door ON runs(room_id, door)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_runs_room_loot ON runs(room_id, loot_id)"
+    )
+
+
+def rebuild_door_stats(cursor):
+    """Recompute room_door_stats from the raw runs table."""
+    cursor.execute("DELETE FROM room_door_stats")
+    cursor.execute(
+        """
+        INSERT INTO room_door_stats (room_id, door, count)
+        SELECT room_id, door, COUNT(*)
+        FROM runs
+        GROUP BY room_id, door
+    """
+    )
+
+
+def verify_door_stats(cursor):
+    """Return the (room_id, door, stored, actual) rows that are out of sync."""
+    cursor.execute(
+        """
+        SELECT room_id, door, SUM(stored), SUM(actual)
+        FROM (
+            SELECT room_id, door, count AS stored, 0 AS actual
+            FROM room_door_stats
+            UNION ALL
+            SELECT room_id, door, 0, COUNT(*)
+            FROM runs
+            GROUP BY room_id, door
+        )
+        GROUP BY room_id, door
+        HAVING SUM(stored) != SUM(actual)
+    """
+    )
+    return cursor.fetchall()
+
+
+def add_door_stats_summary(cursor):
+    """Materialize per-room door counts and keep them in sync with triggers."""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS room_door_stats (
+            room_id INTEGER NOT NULL,
+            door TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (room_id, door)
+        ) WITHOUT ROWID
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_runs_door_stats_insert
+        AFTER INSERT ON runs
+        BEGIN
+            INSERT INTO room_door_stats (room_id, door, count)
+            VALUES (NEW.room_id, NEW.door, 1)
+            ON CONFLICT (room_id, door) DO UPDATE SET count = count + 1;
+        END
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_runs_door_stats_delete
+        AFTER DELETE ON runs
+        BEGIN
+            UPDATE room_door_stats SET count = count - 1
+            WHERE room_id = OLD.room_id AND door = OLD.door;
+        END
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_runs_door_stats_update
+        AFTER UPDATE OF room_id, door ON runs
+        BEGIN
+            UPDATE room_door_stats SET count = count - 1
+            WHERE room_id = OLD.room_id AND door = OLD.door;
+            INSERT INTO room_door_stats (room_id, door, count)
+            VALUES (NEW.room_id, NEW.door, 1)
+            ON CONFLICT (room_id, door) DO UPDATE SET count = count + 1;
+        END
+    """
+    )
+    rebuild_door_stats(cursor)
+
+
+def add_dungeon_runs(cursor):
+    """Give each run a header row and link its room visits to it.
+
+    Existing visits are grouped into runs by walking them in insertion order
+    and starting a new run whenever the date changes or the room number does
+    not increase. Backfilled runs have no start/end timestamps.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS dungeon_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_date TEXT NOT NULL,
+            started_at TEXT,
+            ended_at TEXT
+        )
+    """
+    )
+    cursor.execute(
+        "ALTER TABLE runs ADD COLUMN dungeon_run_id INTEGER "
+        "REFERENCES dungeon_runs(id)"
+    )
+
+    # visit_id is the table's rowid, so the backfill UPDATE below looks each
+    # visit up by key instead of scanning run_groups once per row
+    cursor.execute(
+        "CREATE TEMP TABLE run_groups "
+        "(visit_id INTEGER PRIMARY KEY, run_seq INTEGER NOT NULL)"
+    )
+    cursor.execute(
+        """
+        INSERT INTO temp.run_groups (visit_id, run_seq)
+        SELECT id, SUM(new_run) OVER (ORDER BY id)
+        FROM (
+            SELECT id,
+                   CASE
+                       WHEN LAG(run_date) OVER w IS NOT run_date
+                         OR LAG(room_id) OVER w >= room_id
+                       THEN 1 ELSE 0
+                   END AS new_run
+            FROM runs
+            WINDOW w AS (ORDER BY id)
+        )
+    """
+    )
+    cursor.execute(
+        """
+        INSERT INTO dungeon_runs (id, run_date)
+        SELECT g.run_seq, MIN(r.run_date)
+        FROM temp.run_groups g
+        JOIN runs r ON r.id = g.visit_id
+        GROUP BY g.run_seq
+    """
+    )
+    cursor.execute(
+        """
+        UPDATE runs SET dungeon_run_id = (
+            SELECT run_seq FROM temp.run_groups WHERE visit_id = runs.id
+        )
+    """
+    )
+    cursor.execute("DROP TABLE temp.run_groups")
+
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_runs_dungeon_run "
+        "ON runs(dungeon_run_id, room_id, loot_id)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_dungeon_runs_date ON dungeon_runs(run_date)"
+    )
+
+
+def rebuild_daily_rollups(cursor):
+    """Recompute daily_rollups from the raw runs table (version 5 layout)."""
+    cursor.execute("DELETE FROM daily_rollups")
+    cursor.execute(
+        """
+        INSERT INTO daily_rollups (day, room_id, door, loot_id, count)
+        SELECT run_date, room_id, door, IFNULL(loot_id, 0), COUNT(*)
+        FROM runs
+        GROUP BY run_date, room_id, door, IFNULL(loot_id, 0)
+    """
+    )
+
+
+def add_daily_rollups(cursor):
+    """Roll visits up by (day, room, door, loot) and keep them in sync.
+
+    Visits without loot are stored under loot_id 0 so the key stays NOT NULL.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS daily_rollups (
+            day TEXT NOT NULL,
+            room_id INTEGER NOT NULL,
+            door TEXT NOT NULL,
+            loot_id INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, room_id, door, loot_id)
+        ) WITHOUT ROWID
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_runs_daily_rollups_insert
+        AFTER INSERT ON runs
+        BEGIN
+            INSERT INTO daily_rollups (day, room_id, door, loot_id, count)
+            VALUES (NEW.run_date, NEW.room_id, NEW.door, IFNULL(NEW.loot_id, 0), 1)
+            ON CONFLICT (day, room_id, door, loot_id)
+            DO UPDATE SET count = count + 1;
+        END
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_runs_daily_rollups_delete
+        AFTER DELETE ON runs
+        BEGIN
+            UPDATE daily_rollups SET count = count - 1
+            WHERE day = OLD.run_date AND room_id = OLD.room_id
+              AND door = OLD.door AND loot_id = IFNULL(OLD.loot_id, 0);
+        END
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_runs_daily_rollups_update
+        AFTER UPDATE OF run_date, room_id, door, loot_id ON runs
+        BEGIN
+            UPDATE daily_rollups SET count = count - 1
+            WHERE day = OLD.run_date AND room_id = OLD.room_id
+              AND door = OLD.door AND loot_id = IFNULL(OLD.loot_id, 0);
+            INSERT INTO daily_rollups (day, room_id, door, loot_id, count)
+            VALUES (NEW.run_date, NEW.room_id, NEW.door, IFNULL(NEW.loot_id, 0), 1)
+            ON CONFLICT (day, room_id, door, loot_id)
+            DO UPDATE SET count = count + 1;
+        END
+    """
+    )
+    rebuild_daily_rollups(cursor)
+
+
+def add_dungeons(cursor):
+    """Add a dungeon dimension so one file can track several dungeon types.
+
+    Rooms get a dungeon and a position (their room number within it), and
+    runs and visits record their dungeon so every per-dungeon query starts
+    with a dungeon_id index prefix. daily_rollups is rebuilt keyed by
+    dungeon first for the same reason. Existing data joins the default
+    dungeon.
+    """
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS dungeons (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL
+        )
+    """
+    )
+    cursor.execute(
+        "INSERT OR IGNORE INTO dungeons (id, name) VALUES (?, ?)",
+        (DEFAULT_DUNGEON_ID, DEFAULT_DUNGEON_NAME),
+    )
+    # SQLite only accepts a non-NULL default on a REFERENCES column added by
+    # ALTER TABLE while foreign keys are off, which is how we connect
+    for table in ("rooms", "dungeon_runs", "runs"):
+        cursor.execute(
+            f"ALTER TABLE {table} ADD COLUMN dungeon_id INTEGER NOT NULL "
+            f"DEFAULT {DEFAULT_DUNGEON_ID} REFERENCES dungeons(id)"
+        )
+    cursor.execute("ALTER TABLE rooms ADD COLUMN position INTEGER")
+    cursor.execute(
+        """
+        UPDATE rooms SET position = (
+            SELECT COUNT(*) FROM rooms earlier
+            WHERE earlier.dungeon_id = rooms.dungeon_id AND earlier.id <= rooms.id
+        )
+    """
+    )
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_rooms_dungeon_position "
+        "ON rooms(dungeon_id, position)"
+    )
+
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_runs_dungeon_room_door "
+        "ON runs(dungeon_id, room_id, door)"
+    )
+    # Per-dungeon loot queries use this instead of the room-only index
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_runs_dungeon_room_loot "
+        "ON runs(dungeon_id, room_id, loot_id)"
+    )
+    cursor.execute("DROP INDEX IF EXISTS idx_runs_room_loot")
+    # Rows stay in id order per dungeon, so "latest runs" needs no sort
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_dungeon_runs_dungeon "
+        "ON dungeon_runs(dungeon_id)"
+    )
+
+    cursor.execute("DROP TRIGGER IF EXISTS trg_runs_daily_rollups_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_runs_daily_rollups_delete")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_runs_daily_rollups_update")
+    cursor.execute("ALTER TABLE daily_rollups RENAME TO daily_rollups_v5")
+    cursor.execute(
+        """
+        CREATE TABLE daily_rollups (
+            dungeon_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            room_id INTEGER NOT NULL,
+            door TEXT NOT NULL,
+            loot_id INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dungeon_id, day, room_id, door, loot_id)
+        ) WITHOUT ROWID
+    """
+    )
+    cursor.execute(
+        """
+        INSERT INTO daily_rollups (dungeon_id, day, room_id, door, loot_id, count)
+        SELECT rm.dungeon_id, d.day, d.room_id, d.door, d.loot_id, d.count
+        FROM daily_rollups_v5 d
+        JOIN rooms rm ON rm.id = d.room_id
+    """
+    )
+    cursor.execute("DROP TABLE daily_rollups_v5")
+    cursor.execute(
+        """
+        CREATE TRIGGER trg_runs_daily_rollups_insert
+        AFTER INSERT ON runs
+        BEGIN
+            INSERT INTO daily_rollups (dungeon_id, day, room_id, door, loot_id, count)
+            VALUES (NEW.dungeon_id, NEW.run_date, NEW.room_id, NEW.door,
+                    IFNULL(NEW.loot_id, 0), 1)
+            ON CONFLICT (dungeon_id, day, room_id, door, loot_id)
+            DO UPDATE SET count = count + 1;
+        END
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER trg_runs_daily_rollups_delete
+        AFTER DELETE ON runs
+        BEGIN
+            UPDATE daily_rollups SET count = count - 1
+            WHERE dungeon_id = OLD.dungeon_id AND day = OLD.run_date
+              AND room_id = OLD.room_id AND door = OLD.door
+              AND loot_id = IFNULL(OLD.loot_id, 0);
+        END
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER trg_runs_daily_rollups_update
+        AFTER UPDATE OF dungeon_id, run_date, room_id, door, loot_id ON runs
+        BEGIN
+            UPDATE daily_rollups SET count = count - 1
+            WHERE dungeon_id = OLD.dungeon_id AND day = OLD.run_date
+              AND room_id = OLD.room_id AND door = OLD.door
+              AND loot_id = IFNULL(OLD.loot_id, 0);
+            INSERT INTO daily_rollups (dungeon_id, day, room_id, door, loot_id, count)
+            VALUES (NEW.dungeon_id, NEW.run_date, NEW.room_id, NEW.door,
+                    IFNULL(NEW.loot_id, 0), 1)
+            ON CONFLICT (dungeon_id, day, room_id, door, loot_id)
+            DO UPDATE SET count = count + 1;
+        END
+    """
+    )
+
+
+# Each entry upgrades the schema by one version; never edit a released step,
+# append a new one instead.
+MIGRATIONS = [
+    create_base_schema,
+    add_covering_indexes,
+    add_door_stats_summary,
+    add_dungeon_runs,
+    add_daily_rollups,
+    add_dungeons,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn):
+    """Return the schema version recorded in the database file."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Upgrade the database in place to the latest schema version."""
+    version = get_schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this "
+            f"application supports ({SCHEMA_VERSION})."
+        )
+
+    cursor = conn.cursor()
+    for target_version, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        # Every step and its version bump commit together, so an interrupted
+        # upgrade leaves the file at the last completed version.
+        with conn:
+            cursor.execute("BEGIN")
+            step(cursor)
+            cursor.execute(f"PRAGMA user_version = {target_version}")
+    return get_schema_version(conn)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dungeon tracker schema tools.")
+    parser.add_argument("--db", help="database file (default: storage profile path)")
+    parser.add_argument(
+        "command",
+        choices=["upgrade", "verify-stats", "rebuild-stats"],
+        help="upgrade the schema, or check/rebuild the door-count summary",
+    )
+    args = parser.parse_args(argv)
+
+    conn = load_storage_profile().connect(args.db)
+    try:
+        version = migrate(conn)
+        cursor = conn.cursor()
+        if args.command == "upgrade":
+            print(f"Schema is at version {version}.")
+        elif args.command == "verify-stats":
+            mismatches = verify_door_stats(cursor)
+            for room_id, door, stored, actual in mismatches:
+                print(f"Room {room_id} {door}: summary={stored} runs={actual}")
+            if mismatches:
+                return 1
+            print("room_door_stats matches runs.")
+        else:
+            with conn:
+                rebuild_door_stats(cursor)
+            print("room_door_stats rebuilt.")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
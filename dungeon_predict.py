@@ -0,0 +1,330 @@
+from dataclasses import dataclass
+from math import erfc, sqrt
+
+import numpy as np
+
+# Two-sided 95% normal quantile
+Z_95 = 1.959963984540054
+# Exact Beta quantiles up to this many pseudo-counts, normal approximation above
+EXACT_INTERVAL_LIMIT = 10000
+# Enough for 1e-12 convergence near the tail quantiles below
+# EXACT_INTERVAL_LIMIT pseudo-counts; converged slices stop iterating earlier
+CONTINUED_FRACTION_TERMS = 100
+# Safeguarded Newton steps per quantile; most slices converge in under ten
+QUANTILE_STEPS = 60
+# Lanczos approximation (g=7, n=9) of the gamma function
+LANCZOS_G = 7
+LANCZOS_COEFFICIENTS = (
+    0.99999999999980993,
+    676.5203681218851,
+    -1259.1392167224028,
+    771.32342877765313,
+    -176.61502916214059,
+    12.507343278686905,
+    -0.13857109526572012,
+    9.9843695780195716e-6,
+    1.5056327351493116e-7,
+)
+
+SLICE_COLUMNS = {"room": "rm.position", "loot": "li.name", "date": "r.run_date"}
+
+
+def wilson_interval(successes, trials, z=Z_95):
+    """Vectorized Wilson score interval; slices without trials get (0, 1)."""
+    successes = np.asarray(successes, dtype=float)
+    trials = np.asarray(trials, dtype=float)
+    safe_trials = np.where(trials > 0, trials, 1)
+    p = successes / safe_trials
+    denominator = 1 + z**2 / safe_trials
+    centre = (p + z**2 / (2 * safe_trials)) / denominator
+    margin = (
+        z
+        * np.sqrt(p * (1 - p) / safe_trials + z**2 / (4 * safe_trials**2))
+        / denominator
+    )
+    empty = trials == 0
+    return (
+        np.where(empty, 0.0, centre - margin),
+        np.where(empty, 1.0, centre + margin),
+    )
+
+
+def beta_posterior(successes, trials, prior=(1.0, 1.0)):
+    """Beta(alpha, beta) posterior parameters for a Binomial likelihood."""
+    successes = np.asarray(successes, dtype=float)
+    trials = np.asarray(trials, dtype=float)
+    return prior[0] + successes, prior[1] + trials - successes
+
+
+def log_gamma(x):
+    """Vectorized log-gamma for positive x (Lanczos approximation)."""
+    x = np.asarray(x, dtype=float)
+    # Shift small arguments up by one, where the series is accurate
+    small = x < 0.5
+    z = np.where(small, x + 1, x) - 1
+    series = np.full_like(z, LANCZOS_COEFFICIENTS[0])
+    for k, coefficient in enumerate(LANCZOS_COEFFICIENTS[1:], start=1):
+        series += coefficient / (z + k)
+    t = z + LANCZOS_G + 0.5
+    result = 0.5 * np.log(2 * np.pi) + (z + 0.5) * np.log(t) - t + np.log(series)
+    return np.where(small, result - np.log(x), result)
+
+
+def log_beta(a, b):
+    """Elementwise log B(a, b); symmetric in a and b."""
+    return log_gamma(a) + log_gamma(b) - log_gamma(np.add(a, b))
+
+
+def _beta_continued_fraction(x, a, b):
+    """Lentz's continued fraction for the incomplete beta function.
+
+    Only the elements that have not converged are iterated on.
+    """
+    tiny = 1e-300
+
+    def clamp(value):
+        return np.where(np.abs(value) < tiny, tiny, value)
+
+    c = np.ones_like(x)
+    d = 1 / clamp(1 - (a + b) * x / (a + 1))
+    h = d.copy()
+    active = np.arange(x.size)
+    for m in range(1, CONTINUED_FRACTION_TERMS + 1):
+        for numerator in (
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ):
+            d = 1 / clamp(1 + numerator * d)
+            c = clamp(1 + numerator / c)
+            delta = c * d
+            h[active] *= delta
+        running = np.abs(delta - 1) >= 1e-12
+        if not running.any():
+            break
+        active = active[running]
+        x, a, b, c, d = x[running], a[running], b[running], c[running], d[running]
+    return h
+
+
+def beta_cdf(x, alpha, beta, log_b=None):
+    """Regularized incomplete beta function I_x(alpha, beta), elementwise.
+
+    log_b, log B(alpha, beta), can be passed in when it is already known.
+    """
+    x, alpha, beta = np.broadcast_arrays(
+        np.asarray(x, dtype=float),
+        np.asarray(alpha, dtype=float),
+        np.asarray(beta, dtype=float),
+    )
+    if log_b is None:
+        log_b = log_beta(alpha, beta)
+    # The continued fraction converges fast below the mean; use symmetry above
+    flip = x > (alpha + 1) / (alpha + beta + 2)
+    a = np.where(flip, beta, alpha)
+    b = np.where(flip, alpha, beta)
+    y = np.where(flip, 1 - x, x)
+    with np.errstate(divide="ignore"):
+        front = np.exp(a * np.log(y) + b * np.log1p(-y) - log_b)
+    fraction = _beta_continued_fraction(y.ravel(), a.ravel(), b.ravel())
+    tail = front * fraction.reshape(y.shape) / a
+    return np.where(flip, 1 - tail, tail)
+
+
+def beta_quantile(q, alpha, beta):
+    """Beta(alpha, beta) quantiles by safeguarded Newton steps on beta_cdf.
+
+    Each slice keeps a bracket around its quantile and bisects it whenever a
+    Newton step would leave the bracket; slices drop out once they converge.
+    """
+    alpha, beta = np.broadcast_arrays(
+        np.asarray(alpha, dtype=float), np.asarray(beta, dtype=float)
+    )
+    shape = alpha.shape
+    alpha, beta = alpha.ravel(), beta.ravel()
+    log_b = log_beta(alpha, beta)
+    low = np.zeros(alpha.size)
+    high = np.ones(alpha.size)
+    # Start from the mean; Newton steps the rest of the way
+    x = alpha / (alpha + beta)
+    result = x.copy()
+    active = np.arange(alpha.size)
+    for _ in range(QUANTILE_STEPS):
+        error = beta_cdf(x, alpha, beta, log_b) - q
+        low = np.where(error < 0, x, low)
+        high = np.where(error < 0, high, x)
+        with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+            density = np.exp(
+                (alpha - 1) * np.log(x) + (beta - 1) * np.log1p(-x) - log_b
+            )
+            step = x - error / density
+        inside = (step > low) & (step < high)
+        updated = np.where(inside, step, (low + high) / 2)
+        # The CDF itself is only good to about 1e-12, so stop there too
+        solved = np.abs(error) < 1e-12
+        updated = np.where(solved, x, updated)
+        result[active] = updated
+        running = ~solved & (np.abs(updated - x) >= 1e-13)
+        if not running.any():
+            break
+        active = active[running]
+        x, alpha, beta, log_b = (
+            updated[running],
+            alpha[running],
+            beta[running],
+            log_b[running],
+        )
+        low, high = low[running], high[running]
+    return result.reshape(shape)
+
+
+def beta_credible_interval(alpha, beta, z=Z_95):
+    """Posterior mean and the equal-tailed credible interval matching z.
+
+    Small samples get exact Beta quantiles; above EXACT_INTERVAL_LIMIT
+    pseudo-counts the normal approximation is used, as it is accurate there
+    and the continued fraction would need many more terms.
+    """
+    alpha = np.asarray(alpha, dtype=float)
+    beta = np.asarray(beta, dtype=float)
+    total = alpha + beta
+    mean = alpha / total
+    sd = np.sqrt(alpha * beta / (total**2 * (total + 1)))
+    lower = np.clip(mean - z * sd, 0, 1)
+    upper = np.clip(mean + z * sd, 0, 1)
+
+    exact = total <= EXACT_INTERVAL_LIMIT
+    if exact.any():
+        # Slices with the same counts share a posterior; solve each pair once
+        pairs, inverse = np.unique(
+            np.column_stack([alpha[exact], beta[exact]]), axis=0, return_inverse=True
+        )
+        inverse = inverse.reshape(-1)
+        tail = 0.5 * erfc(z / sqrt(2))
+        lower, upper = np.asarray(lower), np.asarray(upper)
+        np.place(lower, exact, beta_quantile(tail, *pairs.T)[inverse])
+        np.place(upper, exact, beta_quantile(1 - tail, *pairs.T)[inverse])
+    return mean, lower, upper
+
+
+@dataclass
+class DoorPrediction:
+    """Estimated probability that the left door is the correct one."""
+
+    trials: int
+    left_mean: float
+    left_lower: float
+    left_upper: float
+    wilson_lower: float
+    wilson_upper: float
+
+    @property
+    def favoured_door(self):
+        if self.left_lower > 0.5:
+            return "left"
+        if self.left_upper < 0.5:
+            return "right"
+        return None
+
+    def describe(self):
+        return (
+            f"{self.left_mean * 100:.1f}% "
+            f"({self.left_lower * 100:.1f}-{self.left_upper * 100:.1f}%)"
+        )
+
+
+class DoorPredictor:
+    """Beta-Binomial door posteriors for many slices held in NumPy arrays.
+
+    Each slice (a room, or a room/loot/date combination) owns one row of a
+    (slices, 2) array of left/right counts; every statistic is computed for
+    all rows at once.
+    """
+
+    def __init__(self, keys=(), counts=None, prior=(1.0, 1.0)):
+        self.keys = list(keys)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.counts = (
+            np.zeros((len(self.keys), 2), dtype=np.int64)
+            if counts is None
+            else np.asarray(counts, dtype=np.int64).reshape(len(self.keys), 2)
+        )
+        self.prior = prior
+
+    @classmethod
+    def from_door_counts(cls, door_counts, **kwargs):
+        """Build from {key: {"left": n, "right": n}} (any door-name case)."""
+        keys = sorted(door_counts)
+        counts = [
+            [
+                sum(n for door, n in door_counts[key].items() if door.lower() == side)
+                for side in ("left", "right")
+            ]
+            for key in keys
+        ]
+        return cls(keys, counts, **kwargs)
+
+    @classmethod
+    def from_database(cls, logic, by=("room",), **kwargs):
+        """Build one slice per combination of the given dimensions.
+
+        Only the visits of the logic's selected dungeon are counted.
+        """
+        columns = [SLICE_COLUMNS[dimension] for dimension in by]
+        logic.flush()
+        logic.cursor.execute(
+            f"""
+            SELECT {", ".join(columns)},
+                   SUM(r.door = 'left'), SUM(r.door = 'right')
+            FROM runs r
+            JOIN rooms rm ON rm.id = r.room_id
+            LEFT JOIN loot_items li ON r.loot_id = li.id
+            WHERE r.dungeon_id = ?
+            GROUP BY {", ".join(columns)}
+        """,
+            (logic.dungeon_id,),
+        )
+        rows = logic.cursor.fetchall()
+        width = len(columns)
+        keys = [row[0] if width == 1 else row[:width] for row in rows]
+        return cls(keys, [row[width:] for row in rows], **kwargs)
+
+    def _row(self, key):
+        if key not in self.index:
+            self.index[key] = len(self.keys)
+            self.keys.append(key)
+            self.counts = np.vstack([self.counts, np.zeros((1, 2), dtype=np.int64)])
+        return self.index[key]
+
+    def update(self, key, door, count=1):
+        """Add observations of the correct door for one slice."""
+        self.counts[self._row(key), 0 if door.lower() == "left" else 1] += count
+
+    def update_many(self, keys, doors):
+        """Add many (key, door) observations with a single scatter-add."""
+        rows = np.fromiter((self._row(key) for key in keys), dtype=np.int64)
+        columns = np.array([door.lower() != "left" for door in doors], dtype=np.int64)
+        np.add.at(self.counts, (rows, columns), 1)
+
+    def statistics(self, z=Z_95):
+        """Return every statistic as arrays aligned with self.keys."""
+        left = self.counts[:, 0]
+        trials = self.counts.sum(axis=1)
+        alpha, beta = beta_posterior(left, trials, self.prior)
+        mean, lower, upper = beta_credible_interval(alpha, beta, z)
+        wilson_lower, wilson_upper = wilson_interval(left, trials, z)
+        return {
+            "trials": trials,
+            "left_mean": mean,
+            "left_lower": lower,
+            "left_upper": upper,
+            "wilson_lower": wilson_lower,
+            "wilson_upper": wilson_upper,
+        }
+
+    def predictions(self, z=Z_95):
+        """Return {key: DoorPrediction} for every slice."""
+        stats = self.statistics(z)
+        columns = zip(*(stats[field].tolist() for field in stats))
+        return {
+            key: DoorPrediction(*values) for key, values in zip(self.keys, columns)
+        }
@@ -0,0 +1,259 @@
+"""Query and method profiling for DungeonTrackerLogic.
+
+    python dungeon_profiling.py --db dungeon_runs.db --slow-query-ms 5
+
+Pass a QueryProfiler to DungeonTrackerLogic (or start either app with
+--profile) to time every SQL statement and public method. The CLI runs the
+read paths the GUIs use once and prints the collected statistics.
+"""
+
+import argparse
+import functools
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_QUERY_MS = 50.0
+# The progress handler fires every PROGRESS_STEPS SQLite VM instructions
+PROGRESS_STEPS = 1000
+# Upper bounds of the latency histogram buckets; the last bucket is open
+BUCKET_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def normalize_sql(sql):
+    """Collapse whitespace and IN (?, ?, ...) lists so batches share a key."""
+    sql = " ".join(sql.split())
+    return re.sub(r"\(\?(?:, \?)+\)", "(?, ...)", sql)
+
+
+class LatencyHistogram:
+    """Call counts bucketed by latency, with a running total and maximum."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms):
+        self.buckets[bisect_left(BUCKET_BOUNDS_MS, elapsed_ms)] += 1
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of calls."""
+        target = fraction * self.calls
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS_MS, self.buckets):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+
+class QueryStats(LatencyHistogram):
+    def __init__(self):
+        super().__init__()
+        self.rows = 0
+        self.vm_steps = 0
+
+
+class ProfilingCursor(sqlite3.Cursor):
+    """Cursor that reports each statement's latency to a QueryProfiler.
+
+    A statement's time includes fetching its rows, so it is recorded once
+    the rows are exhausted or the cursor runs its next statement.
+    """
+
+    def __init__(self, connection, profiler):
+        super().__init__(connection)
+        self.profiler = profiler
+        self._statement = None
+
+    def _begin(self, sql):
+        self._finish()
+        self._statement = [sql, 0.0, 0, self.profiler.vm_steps]
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            if self._statement is not None:
+                self._statement[1] += (time.perf_counter() - start) * 1000
+
+    def _finish(self):
+        if self._statement is not None:
+            sql, elapsed_ms, rows, steps_before = self._statement
+            self._statement = None
+            steps = self.profiler.vm_steps - steps_before
+            self.profiler.record_query(sql, elapsed_ms, rows, steps)
+
+    def execute(self, sql, parameters=()):
+        self._begin(sql)
+        self._timed(super().execute, sql, parameters)
+        if self.description is None:
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._begin(sql)
+        self._timed(super().executemany, sql, seq_of_parameters)
+        self._finish()
+        return self
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        elif self._statement is not None:
+            self._statement[2] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, size or self.arraysize)
+        if self._statement is not None:
+            self._statement[2] += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if self._statement is not None:
+            self._statement[2] += len(rows)
+        self._finish()
+        return rows
+
+
+class QueryProfiler:
+    """Latency histograms, row counts and VM steps per query and per method.
+
+    Queries slower than slow_query_ms are logged as warnings. "VM steps"
+    counts SQLite bytecode instructions in units of PROGRESS_STEPS and is a
+    rough measure of how many rows a statement scanned.
+    """
+
+    def __init__(self, slow_query_ms=DEFAULT_SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self.queries = {}
+        self.methods = {}
+        self.vm_steps = 0
+        self._lock = threading.Lock()
+
+    def _count_steps(self):
+        self.vm_steps += PROGRESS_STEPS
+        return 0
+
+    def attach(self, conn):
+        """Start counting VM steps on conn and return a profiling cursor."""
+        conn.set_progress_handler(self._count_steps, PROGRESS_STEPS)
+        return conn.cursor(lambda connection: ProfilingCursor(connection, self))
+
+    def instrument(self, logic):
+        """Time every public method of a DungeonTrackerLogic instance."""
+        for name in dir(type(logic)):
+            method = getattr(logic, name)
+            if not name.startswith("_") and callable(method):
+                setattr(logic, name, self._timed_method(name, method))
+
+    def _timed_method(self, name, method):
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record_method(name, (time.perf_counter() - start) * 1000)
+
+        return timed
+
+    def record_query(self, sql, elapsed_ms, rows=0, vm_steps=0):
+        key = normalize_sql(sql)
+        with self._lock:
+            stats = self.queries.setdefault(key, QueryStats())
+            stats.record(elapsed_ms)
+            stats.rows += rows
+            stats.vm_steps += vm_steps
+        if elapsed_ms >= self.slow_query_ms:
+            logger.warning(
+                "Slow query (%.1fms, %d rows, ~%d VM steps): %s",
+                elapsed_ms,
+                rows,
+                vm_steps,
+                key,
+            )
+
+    def record_method(self, name, elapsed_ms):
+        with self._lock:
+            self.methods.setdefault(name, LatencyHistogram()).record(elapsed_ms)
+
+    def reset(self):
+        with self._lock:
+            self.queries = {}
+            self.methods = {}
+
+    def report(self, limit=20):
+        """Return the statistics as a plain-text table, slowest first."""
+        with self._lock:
+            methods = sorted(self.methods.items(), key=lambda i: -i[1].total_ms)
+            queries = sorted(self.queries.items(), key=lambda i: -i[1].total_ms)
+        lines = [
+            f"{'method':<32}{'calls':>7}{'total ms':>11}"
+            f"{'p50':>8}{'p99':>8}{'max':>9}"
+        ]
+        for name, stats in methods:
+            lines.append(
+                f"{name:<32}{stats.calls:>7}{stats.total_ms:>11.1f}"
+                f"{stats.percentile(0.5):>8.2f}{stats.percentile(0.99):>8.2f}"
+                f"{stats.max_ms:>9.2f}"
+            )
+        lines.append("")
+        lines.append(
+            f"{'calls':>7}{'total ms':>11}{'p50':>8}{'p99':>8}{'max':>9}"
+            f"{'rows':>9}{'VM steps':>10}  query"
+        )
+        for sql, stats in queries[:limit]:
+            lines.append(
+                f"{stats.calls:>7}{stats.total_ms:>11.1f}"
+                f"{stats.percentile(0.5):>8.2f}{stats.percentile(0.99):>8.2f}"
+                f"{stats.max_ms:>9.2f}{stats.rows:>9}{stats.vm_steps:>10}  "
+                f"{sql[:100]}"
+            )
+        return "\n".join(lines)
+
+
+def main(argv=None):
+    from dungeon_tracker_logic import DungeonTrackerLogic
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database file (default: storage profile path)")
+    parser.add_argument("--slow-query-ms", type=float, default=DEFAULT_SLOW_QUERY_MS)
+    args = parser.parse_args(argv)
+    logging.basicConfig(format="%(levelname)s %(message)s")
+
+    profiler = QueryProfiler(args.slow_query_ms)
+    logic = DungeonTrackerLogic(args.db, profiler=profiler)
+    try:
+        logic.database_setup()
+        logic.get_loot_items()
+        for room in range(1, logic.num_rooms):
+            logic.get_graph_data(room)
+        logic.generate_report()
+        logic.get_run_summaries(limit=50)
+        logic.get_recent_door_counts(30)
+    finally:
+        logic.close()
+    print(profiler.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
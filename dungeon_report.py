@@ -0,0 +1,170 @@
+from dataclasses import dataclass, field
+
+# Depth of the default dungeon; other dungeons read theirs from the rooms table
+NUM_ROOMS = 5
+
+
+@dataclass
+class RoomReport:
+    """Aggregated door and loot statistics for a single room."""
+
+    room: int
+    left_count: int = 0
+    right_count: int = 0
+    total_visits: int = 0
+    loot: list = field(default_factory=list)
+
+    @property
+    def left_percentage(self):
+        if not self.total_visits:
+            return 0
+        return self.left_count / self.total_visits * 100
+
+    @property
+    def right_percentage(self):
+        if not self.total_visits:
+            return 0
+        return self.right_count / self.total_visits * 100
+
+    def as_row(self, final_room=False):
+        """Format the room as a row of display strings."""
+        left_percentage_string = f"{self.left_percentage:.2f}%"
+        right_percentage_string = f"{self.right_percentage:.2f}%"
+        if final_room:
+            left_percentage_string = "-"
+            right_percentage_string = "-"
+
+        return [
+            f"Room {self.room}",
+            "\n".join(self.loot) if self.loot else "No loot recorded",
+            left_percentage_string,
+            right_percentage_string,
+            str(self.left_count),
+            str(self.right_count),
+            str(self.total_visits),
+        ]
+
+
+@dataclass
+class Report:
+    """Report covering every room of the dungeon."""
+
+    rooms: dict
+
+    def as_rows(self):
+        """Format the report the way the GUIs display it."""
+        final_room = max(self.rooms, default=None)
+        return {
+            room: room_report.as_row(final_room=room == final_room)
+            for room, room_report in self.rooms.items()
+        }
+
+
+@dataclass
+class Dungeon:
+    """A treasure dungeon type and how many rooms deep it goes."""
+
+    id: int
+    name: str
+    num_rooms: int
+
+
+@dataclass
+class RunSummary:
+    """Depth reached and loot collected during one dungeon run."""
+
+    run_id: int
+    run_date: str
+    started_at: str
+    ended_at: str
+    depth: int
+    loot_count: int
+
+
+def fetch_dungeons(cursor):
+    """Fetch every dungeon with its room count, in creation order."""
+    cursor.execute(
+        """
+        SELECT d.id, d.name, COUNT(rm.id)
+        FROM dungeons d
+        LEFT JOIN rooms rm ON rm.dungeon_id = d.id
+        GROUP BY d.id
+        ORDER BY d.id
+    """
+    )
+    return [Dungeon(*row) for row in cursor.fetchall()]
+
+
+def fetch_door_counts(cursor, dungeon_id):
+    """Fetch door counts per room number of one dungeon from the summary."""
+    cursor.execute(
+        """
+        SELECT rm.position, s.door, s.count
+        FROM rooms rm
+        JOIN room_door_stats s ON s.room_id = rm.id
+        WHERE rm.dungeon_id = ?
+    """,
+        (dungeon_id,),
+    )
+    door_counts = {}
+    for room, door, count in cursor.fetchall():
+        door_counts.setdefault(room, {})[door] = count
+    return door_counts
+
+
+def fetch_room_loot(cursor, dungeon_id):
+    """Fetch the distinct loot names seen in every room of one dungeon."""
+    # De-duplicate the integer pairs on the covering index before any join
+    cursor.execute(
+        """
+        SELECT rm.position, li.name
+        FROM (
+            SELECT DISTINCT room_id, loot_id
+            FROM runs
+            WHERE dungeon_id = ? AND loot_id IS NOT NULL
+        ) v
+        JOIN rooms rm ON rm.id = v.room_id
+        JOIN loot_items li ON li.id = v.loot_id
+    """,
+        (dungeon_id,),
+    )
+    room_loot = {}
+    for room, loot_name in cursor.fetchall():
+        room_loot.setdefault(room, set()).add(loot_name)
+    return room_loot
+
+
+def build_report(door_counts, room_loot, num_rooms=NUM_ROOMS):
+    """Combine per-room door counts and loot sets into a Report."""
+    rooms = {}
+    for room in range(1, num_rooms + 1):
+        counts = door_counts.get(room, {})
+        rooms[room] = RoomReport(
+            room=room,
+            left_count=counts.get("left", 0),
+            right_count=counts.get("right", 0),
+            total_visits=sum(counts.values()),
+            loot=sorted(room_loot.get(room, ())),
+        )
+    return Report(rooms=rooms)
+
+
+def fetch_run_summaries(cursor, dungeon_id, run_date=None, limit=None):
+    """Fetch RunSummary rows through the dungeon_runs -> runs index join."""
+    query = """
+        SELECT dr.id, dr.run_date, dr.started_at, dr.ended_at,
+               COUNT(r.id), COUNT(r.loot_id)
+        FROM dungeon_runs dr
+        JOIN runs r ON r.dungeon_run_id = dr.id
+        WHERE dr.dungeon_id = ?
+    """
+    params = [dungeon_id]
+    if run_date is not None:
+        query += " AND dr.run_date = ?"
+        params.append(run_date)
+    query += " GROUP BY dr.id ORDER BY dr.id DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    cursor.execute(query, params)
+    return [RunSummary(*row) for row in cursor.fetchall()]
@@ -0,0 +1,165 @@
+import re
+
+PAGE_SIZE = 200
+
+ROOM_COLUMNS = [
+    "Room",
+    "Loot Obtained",
+    "Left Door Correct %",
+    "Right Door Correct %",
+    "Left Door Count",
+    "Right Door Count",
+    "Visits",
+    "Left Door Estimate (95% CI)",
+]
+
+# Detail views: a display name, column headings and a SELECT producing them
+# for the dungeon bound to its single ? parameter
+SQL_VIEWS = {
+    "runs": (
+        "Runs",
+        ["Run", "Date", "Started", "Ended", "Rooms", "Loot Drops"],
+        """
+        SELECT dr.id, dr.run_date, dr.started_at, dr.ended_at,
+               COUNT(r.id), COUNT(r.loot_id)
+        FROM dungeon_runs dr
+        JOIN runs r ON r.dungeon_run_id = dr.id
+        WHERE dr.dungeon_id = ?
+        GROUP BY dr.id
+    """,
+    ),
+    "loot": (
+        "Loot by Room",
+        ["Room", "Loot", "Drops", "Left Door", "Right Door"],
+        """
+        SELECT rm.position, li.name, COUNT(*),
+               SUM(r.door = 'left'), SUM(r.door = 'right')
+        FROM runs r
+        JOIN rooms rm ON rm.id = r.room_id
+        JOIN loot_items li ON li.id = r.loot_id
+        WHERE r.dungeon_id = ?
+        GROUP BY r.room_id, li.name
+    """,
+    ),
+    "days": (
+        "Doors by Day",
+        ["Date", "Room", "Left Door", "Right Door", "Visits"],
+        """
+        SELECT d.day, rm.position,
+               SUM(CASE WHEN d.door = 'left' THEN d.count ELSE 0 END),
+               SUM(CASE WHEN d.door = 'right' THEN d.count ELSE 0 END),
+               SUM(d.count)
+        FROM daily_rollups d
+        JOIN rooms rm ON rm.id = d.room_id
+        WHERE d.dungeon_id = ?
+        GROUP BY d.day, d.room_id
+    """,
+    ),
+    "visits": (
+        "Room Visits",
+        ["Visit", "Run", "Date", "Room", "Door", "Loot"],
+        """
+        SELECT r.id, r.dungeon_run_id, r.run_date, rm.position, r.door, li.name
+        FROM runs r
+        JOIN rooms rm ON rm.id = r.room_id
+        LEFT JOIN loot_items li ON li.id = r.loot_id
+        WHERE r.dungeon_id = ?
+    """,
+    ),
+}
+
+
+class ListRowSource:
+    """Sort, filter and page rows that are already in memory."""
+
+    def __init__(self, columns, rows, page_size=PAGE_SIZE):
+        self.columns = list(columns)
+        self.page_size = page_size
+        self._all_rows = [list(row) for row in rows]
+        self._rows = self._all_rows
+
+    def query(self, sort=None, descending=False, text=""):
+        """Apply a sort column index and filter text; return the row count."""
+        text = text.casefold()
+        rows = [
+            row
+            for row in self._all_rows
+            if not text or any(text in str(value).casefold() for value in row)
+        ]
+        if sort is not None:
+            rows.sort(
+                key=lambda row: (row[sort] is None, row[sort]), reverse=descending
+            )
+        self._rows = rows
+        return len(rows)
+
+    def page(self, number):
+        start = number * self.page_size
+        return self._rows[start : start + self.page_size]
+
+
+class SqlRowSource:
+    """Sort, filter and page the rows of a SELECT without fetching them all.
+
+    Unsorted, unfiltered pages are LIMIT/OFFSET reads of the SELECT itself,
+    so opening a view copies nothing. Otherwise query() writes the filtered
+    rows, in sort order, to a temp table once; every page is then a rowid
+    range read, however deep it is.
+    """
+
+    def __init__(
+        self, cursor, name, columns, select, page_size=PAGE_SIZE, parameters=()
+    ):
+        self.cursor = cursor
+        self.table = f"temp.report_view_{name}"
+        self.columns = list(columns)
+        self.select = select
+        self.page_size = page_size
+        self.parameters = list(parameters)
+        self._materialized = False
+
+    def query(self, sort=None, descending=False, text=""):
+        """Apply a sort column index and filter text; return the row count."""
+        self.cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+        self._materialized = sort is not None or bool(text)
+        if not self._materialized:
+            self.cursor.execute(
+                f"SELECT COUNT(*) FROM ({self.select})", self.parameters
+            )
+            return self.cursor.fetchone()[0]
+
+        names = [f"c{i}" for i in range(len(self.columns))]
+        where = ""
+        params = list(self.parameters)
+        if text:
+            # Match % and _ literally; backslash is the escape character
+            pattern = re.sub(r"([\\%_])", r"\\\1", text)
+            matches = [f"CAST({name} AS TEXT) LIKE ? ESCAPE '\\'" for name in names]
+            where = " WHERE " + " OR ".join(matches)
+            params += [f"%{pattern}%"] * len(names)
+        order = ""
+        if sort is not None:
+            order = f" ORDER BY {names[sort]} {'DESC' if descending else 'ASC'}"
+
+        self.cursor.execute(
+            f"CREATE TABLE {self.table} AS WITH v({', '.join(names)}) AS "
+            f"({self.select}) SELECT * FROM v{where}{order}",
+            params,
+        )
+        self.cursor.execute(f"SELECT COUNT(*) FROM {self.table}")
+        return self.cursor.fetchone()[0]
+
+    def page(self, number):
+        start = number * self.page_size
+        if not self._materialized:
+            self.cursor.execute(
+                f"SELECT * FROM ({self.select}) LIMIT ? OFFSET ?",
+                self.parameters + [self.page_size, start],
+            )
+        else:
+            # CREATE TABLE ... AS SELECT numbers rows 1..n in the order selected
+            self.cursor.execute(
+                f"SELECT * FROM {self.table} WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (start, self.page_size),
+            )
+        return [list(row) for row in self.cursor.fetchall()]
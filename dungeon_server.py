@@ -0,0 +1,397 @@
+"""Local HTTP/JSON service so several players can log runs into one database.
+
+    python dungeon_server.py --db dungeon_runs.db --port 8080
+
+Endpoints:
+    GET  /dungeons          dungeon ids, names and room counts
+    GET  /loot              loot catalogue
+    POST /loot              {"name": "..."}
+    POST /runs              {"run_data": [[run_date, room, door, loot], ...],
+                             "started_at": "..."}
+    GET  /runs?limit=N      latest run summaries
+    GET  /stats/doors       door counts per room
+    GET  /stats/report      per-room report
+
+Runs and statistics are for one dungeon: pass ?dungeon=ID (default 1) to
+POST /runs, GET /runs and the /stats endpoints. The loot catalogue is
+shared by every dungeon.
+
+All writes go through one connection that commits queued runs in batches;
+reads are served by a pool of WAL-mode connections, each on its own thread.
+"""
+
+import argparse
+import asyncio
+import json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+from dungeon_migrations import DEFAULT_DUNGEON_ID
+from dungeon_service import DungeonTrackerService
+from dungeon_tracker_logic import DungeonTrackerLogic
+
+REASONS = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class StatsServer:
+    """Serve DungeonTrackerLogic over HTTP with one writer and pooled readers."""
+
+    def __init__(self, db_path, read_pool_size=4, batch_size=64, batch_window_ms=5):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.batch_window = batch_window_ms / 1000
+        self.read_pool_size = read_pool_size
+        self._local = threading.local()
+
+    async def start(self, host, port):
+        # SQLite connections are bound to the thread that opened them, so the
+        # writer and every reader get a dedicated thread that opens its own.
+        self.writer_executor = ThreadPoolExecutor(1, thread_name_prefix="writer")
+        self.read_executors = [
+            ThreadPoolExecutor(1, thread_name_prefix=f"reader-{index}")
+            for index in range(self.read_pool_size)
+        ]
+        self.idle_readers = asyncio.Queue()
+        for executor in self.read_executors:
+            self.idle_readers.put_nowait(executor)
+        await self._write(self._open_writer)
+
+        self.write_queue = asyncio.Queue()
+        self.writer_task = asyncio.create_task(self._write_batches())
+        self.server = await asyncio.start_server(self._handle_client, host, port)
+        return self.server
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        await self.write_queue.join()
+        self.writer_task.cancel()
+        await self._write(lambda: self.writer.close())
+        self.writer_executor.shutdown()
+
+        # Take every reader back from the pool so in-flight reads finish first
+        loop = asyncio.get_running_loop()
+        for _ in self.read_executors:
+            executor = await self.idle_readers.get()
+            await loop.run_in_executor(executor, self._close_reader)
+            executor.shutdown()
+
+    def _open_writer(self):
+        self.writer = DungeonTrackerLogic(self.db_path)
+        self.writer.database_setup()
+        self.writer.enable_bulk_writes()
+
+    def _reader(self, dungeon_id):
+        service = getattr(self._local, "service", None)
+        if service is None:
+            logic = DungeonTrackerLogic(self.db_path)
+            service = self._local.service = DungeonTrackerService(logic)
+        if service.logic.dungeon_id != dungeon_id:
+            try:
+                service.select_dungeon(dungeon_id)
+            except ValueError as e:
+                raise HTTPError(404, str(e)) from None
+        return service
+
+    def _close_reader(self):
+        service = getattr(self._local, "service", None)
+        if service is not None:
+            self._local.service = None
+            service.logic.close()
+
+    async def _read(self, func, *args, dungeon_id=DEFAULT_DUNGEON_ID):
+        loop = asyncio.get_running_loop()
+        executor = await self.idle_readers.get()
+        try:
+            return await loop.run_in_executor(
+                executor, lambda: func(self._reader(dungeon_id), *args)
+            )
+        finally:
+            self.idle_readers.put_nowait(executor)
+
+    async def _write(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.writer_executor, func, *args)
+
+    async def _write_batches(self):
+        """Commit queued runs together, as many as arrive within the window."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.write_queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self.write_queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                results = await self._write(self._save_batch, batch)
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, future), error in zip(batch, results):
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+                self.write_queue.task_done()
+
+    def _save_batch(self, batch):
+        """Save each dungeon's runs in one transaction, isolating failed runs."""
+        results = [None] * len(batch)
+        by_dungeon = {}
+        for index, ((dungeon_id, _), _) in enumerate(batch):
+            by_dungeon.setdefault(dungeon_id, []).append(index)
+
+        for dungeon_id, indexes in by_dungeon.items():
+            runs = [batch[index][0][1] for index in indexes]
+            try:
+                self.writer.select_dungeon(dungeon_id)
+            except (ValueError, sqlite3.Error) as e:
+                for index in indexes:
+                    results[index] = e
+                continue
+            try:
+                self.writer.save_runs(runs)
+                continue
+            except (ValueError, sqlite3.Error):
+                pass
+
+            for index, run in zip(indexes, runs):
+                try:
+                    self.writer.save_runs([run])
+                except (ValueError, sqlite3.Error) as e:
+                    results[index] = e
+        return results
+
+    async def submit_run(
+        self, run_data, started_at=None, dungeon_id=DEFAULT_DUNGEON_ID
+    ):
+        """Queue a run for the next group commit and wait until it is saved."""
+        ended_at = datetime.now().isoformat(timespec="seconds")
+        future = asyncio.get_running_loop().create_future()
+        run = (started_at or ended_at, ended_at, run_data)
+        await self.write_queue.put(((dungeon_id, run), future))
+        await future
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as e:
+                    # The stream cannot be trusted after a bad request
+                    writer.write(encode_response(e.status, {"error": str(e)}))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, body = request
+                try:
+                    status, payload = await self.dispatch(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+                writer.write(encode_response(status, payload))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        route = (method, url.path.rstrip("/") or "/")
+        query = parse_qs(url.query)
+        dungeon_id = parse_int(query, "dungeon", DEFAULT_DUNGEON_ID)
+
+        if route == ("GET", "/dungeons"):
+            dungeons = await self._read(DungeonTrackerService.dungeons)
+            return 200, {"dungeons": [asdict(dungeon) for dungeon in dungeons]}
+        if route == ("GET", "/loot"):
+            return 200, {"loot": await self._read(DungeonTrackerService.loot_items)}
+        if route == ("POST", "/loot"):
+            name = str(parse_json(body).get("name") or "").strip()
+            if not name:
+                raise HTTPError(400, "name is required")
+            try:
+                await self._write(self.writer.add_loot_item, name)
+            except sqlite3.IntegrityError:
+                raise HTTPError(409, f"'{name}' already exists") from None
+            return 201, {"name": name}
+        if route == ("POST", "/runs"):
+            data = parse_json(body)
+            run_data = parse_run_data(data.get("run_data"))
+            # Unknown dungeons are a 404, not a failed run
+            await self._read(
+                DungeonTrackerService.selected_dungeon, dungeon_id=dungeon_id
+            )
+            try:
+                await self.submit_run(run_data, data.get("started_at"), dungeon_id)
+            except ValueError as e:
+                raise HTTPError(400, str(e)) from None
+            return 201, {"visits": len(run_data)}
+        if route == ("GET", "/runs"):
+            limit = parse_int(query, "limit", 50)
+            summaries = await self._read(
+                lambda service: service.logic.get_run_summaries(limit=limit),
+                dungeon_id=dungeon_id,
+            )
+            return 200, {"runs": [asdict(summary) for summary in summaries]}
+        if route == ("GET", "/stats/doors"):
+            doors = await self._read(
+                DungeonTrackerService.door_chart_data, dungeon_id=dungeon_id
+            )
+            return 200, {"doors": doors}
+        if route == ("GET", "/stats/report"):
+            report = await self._read(
+                DungeonTrackerService.report, dungeon_id=dungeon_id
+            )
+            return 200, {"rooms": [asdict(room) for room in report.rooms.values()]}
+
+        if url.path.rstrip("/") in (
+            "/dungeons",
+            "/loot",
+            "/runs",
+            "/stats/doors",
+            "/stats/report",
+        ):
+            raise HTTPError(405, f"{method} is not allowed here")
+        raise HTTPError(404, f"{url.path} not found")
+
+
+def parse_json(body):
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPError(400, "body is not valid JSON") from None
+    if not isinstance(data, dict):
+        raise HTTPError(400, "body must be a JSON object")
+    return data
+
+
+def parse_int(query, name, default):
+    """Return an integer query parameter, raising a 400 if it is malformed."""
+    value = query.get(name, [default])[0]
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer") from None
+
+
+def parse_run_data(run_data):
+    if not isinstance(run_data, list) or not run_data:
+        raise HTTPError(400, "run_data must be a non-empty list")
+    try:
+        return [
+            (str(run_date), int(room), str(door), str(loot or ""))
+            for run_date, room, door, loot in run_data
+        ]
+    except (TypeError, ValueError):
+        raise HTTPError(
+            400, "run_data entries must be [run_date, room, door, loot]"
+        ) from None
+
+
+async def read_request(reader):
+    """Read one HTTP/1.1 request; returns None when the client hangs up.
+
+    Raises HTTPError(400) for a malformed request line or Content-Length.
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "malformed request line") from None
+
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise HTTPError(400, "malformed Content-Length")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, body
+
+
+def encode_response(status, payload):
+    body = json.dumps(payload).encode()
+    head = (
+        f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def serve(args):
+    server = StatsServer(
+        args.db,
+        read_pool_size=args.readers,
+        batch_size=args.batch_size,
+        batch_window_ms=args.batch_window_ms,
+    )
+    await server.start(args.host, args.port)
+    print(f"Serving {args.db} on http://{args.host}:{args.port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database file (default: storage profile path)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--readers", type=int, default=4, help="read connections")
+    parser.add_argument(
+        "--batch-size", type=int, default=64, help="max runs per write commit"
+    )
+    parser.add_argument(
+        "--batch-window-ms",
+        type=float,
+        default=5,
+        help="how long the writer waits to fill a batch",
+    )
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+from datetime import datetime
+
+from dungeon_report import NUM_ROOMS
+from dungeon_report_view import ROOM_COLUMNS, SQL_VIEWS, ListRowSource
+
+
+class RunSession:
+    """Door choices recorded for the run in progress, before it is saved.
+
+    With a RunJournal every choice is also journaled, so resume() can
+    restore the run after a crash; reset() empties the journal.
+    """
+
+    def __init__(self, num_rooms=NUM_ROOMS, journal=None, dungeon_id=None):
+        self.num_rooms = num_rooms
+        self.journal = journal
+        self.dungeon_id = dungeon_id
+        self.run_date = datetime.now().strftime("%Y-%m-%d")
+        self._clear()
+
+    def _clear(self):
+        self.run_data = []
+        self.started_at = None
+        self.current_room = 1
+
+    def reset(self):
+        """Start a new run; call only once the previous one is saved."""
+        self._clear()
+        if self.journal is not None:
+            self.journal.truncate()
+
+    def record_choice(self, room, door, loot):
+        """Record the door taken and loot found in a room."""
+        if not self.run_data:
+            self.started_at = datetime.now().isoformat(timespec="seconds")
+        visit = (self.run_date, room, door, loot)
+        if self.journal is not None:
+            self.journal.append(self.dungeon_id, self.started_at, visit)
+        self.run_data.append(visit)
+        self.current_room = room + 1
+
+    def resume(self):
+        """Restore this dungeon's unfinished run from the journal, if any.
+
+        A journaled run of another dungeon is discarded. Returns whether
+        a run was restored.
+        """
+        if self.journal is None:
+            return False
+        pending = self.journal.replay()
+        if pending is None or pending.dungeon_id != self.dungeon_id:
+            self.reset()
+            return False
+        self.run_data = pending.run_data
+        self.started_at = pending.started_at
+        self.run_date = self.run_data[0][0]
+        self.current_room = self.run_data[-1][1] + 1
+        return True
+
+    def is_room_enabled(self, room):
+        return room == self.current_room
+
+
+class DungeonTrackerService:
+    """Front-end-agnostic operations shared by the Tk and Qt apps."""
+
+    def __init__(self, logic):
+        self.logic = logic
+        self._report_views = {}
+
+    @property
+    def num_rooms(self):
+        """Depth of the selected dungeon, read from its room definitions."""
+        return self.logic.num_rooms
+
+    def dungeons(self):
+        """Return every Dungeon, for building the dungeon picker."""
+        return self.logic.get_dungeons()
+
+    def selected_dungeon(self):
+        """Return the Dungeon that runs are recorded for."""
+        for dungeon in self.dungeons():
+            if dungeon.id == self.logic.dungeon_id:
+                return dungeon
+        raise ValueError(f"Dungeon {self.logic.dungeon_id} not found!")
+
+    def select_dungeon(self, dungeon_id):
+        """Switch every operation to another dungeon and return it."""
+        self.logic.select_dungeon(dungeon_id)
+        self._report_views = {}
+        return self.selected_dungeon()
+
+    def add_dungeon(self, name, num_rooms):
+        """Add a dungeon; raises sqlite3.IntegrityError for duplicates."""
+        return self.logic.add_dungeon(name, num_rooms)
+
+    @property
+    def door_rooms(self):
+        """Rooms that end in a left/right door choice."""
+        return range(1, self.num_rooms)
+
+    def loot_items(self):
+        self.logic.refresh_cache()
+        return self.logic.get_loot_items()
+
+    def add_loot_item(self, name):
+        """Add a loot item; raises sqlite3.IntegrityError for duplicates."""
+        self.logic.add_loot_item(name)
+
+    def door_chart_data(self):
+        """Return {room: {"Left": n, "Right": n}} for every door room."""
+        # One data_version check for the whole refresh, not one per room
+        self.logic.refresh_cache()
+        return {room: self.logic.get_graph_data(room) for room in self.door_rooms}
+
+    def complete_run(self, run_data, started_at=None):
+        """Save a finished run; raises ValueError for unknown rooms or loot."""
+        self.logic.complete_run(run_data, started_at=started_at)
+
+    def report(self):
+        return self.logic.get_report()
+
+    def door_predictions(self):
+        """Return {room: DoorPrediction} for the left door being correct.
+
+        Built from door_chart_data() on every call, so the estimates follow
+        the same committed counts as the charts, including other writers'.
+        """
+        # NumPy is only needed once predictions are first requested
+        from dungeon_predict import DoorPredictor
+
+        return DoorPredictor.from_door_counts(self.door_chart_data()).predictions()
+
+    def report_with_predictions(self):
+        return self.report(), self.door_predictions()
+
+    def report_views(self):
+        """Return (view, title) pairs for the report viewer, rooms first."""
+        return [("rooms", "Rooms")] + [
+            (view, title) for view, (title, _, _) in SQL_VIEWS.items()
+        ]
+
+    def _room_rows(self):
+        report, predictions = self.report_with_predictions()
+        final_room = max(report.rooms, default=None)
+        for room, room_report in report.rooms.items():
+            final = room == final_room
+            prediction = predictions.get(room)
+            yield [
+                room,
+                ", ".join(room_report.loot),
+                None if final else round(room_report.left_percentage, 2),
+                None if final else round(room_report.right_percentage, 2),
+                room_report.left_count,
+                room_report.right_count,
+                room_report.total_visits,
+                prediction.describe() if prediction else None,
+            ]
+
+    def open_report_view(self, view, sort=None, descending=False, text=""):
+        """Query a report view afresh; return (columns, row count, first page)."""
+        if view == "rooms":
+            source = ListRowSource(ROOM_COLUMNS, self._room_rows())
+        else:
+            source = self.logic.get_report_rows(view)
+        self._report_views[view] = source
+        total = source.query(sort, descending, text)
+        return source.columns, total, source.page(0)
+
+    def report_page(self, view, number):
+        """Return one page of the rows last selected by open_report_view."""
+        return self._report_views[view].page(number)
+
+    def next_door_counts(self, room, loot):
+        """Count the doors taken in the next room after loot dropped in room."""
+        self.logic.refresh_cache()
+        return self.logic.get_crosstab().marginal("next_door", room=room, loot=loot)
+
+    def query_stats(self):
+        """Return the query profiler's statistics as text."""
+        if self.logic.profiler is None:
+            return "Query profiling is off; start the app with --profile."
+        return self.logic.profiler.report()
@@ -0,0 +1,309 @@
+"""Monte Carlo estimates of expected depth and loot for door strategies.
+
+    python dungeon_simulator.py --trials 10000000 --workers 4 --seed 1
+
+Each room's chance that the left door is correct is the Beta posterior
+mean of its recorded door counts, and its chance of dropping loot is its
+recorded drops per visit. A simulated run picks a door in every room but
+the last and ends at the first wrong pick. Trials are split into a fixed
+number of chunks with independent SeedSequence streams, so every worker
+gets work and results for a seed do not depend on the number of worker
+processes. One process pool serves every strategy.
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from dungeon_migrations import DEFAULT_DUNGEON_ID
+from dungeon_predict import DoorPredictor
+from dungeon_tracker_logic import DungeonTrackerLogic
+
+DEFAULT_TRIALS = 1_000_000
+# Trials are split into this many tasks for the workers, unless that would
+# make them smaller than MIN_CHUNK_SIZE; each task runs in vectorized batches
+CHUNKS = 64
+MIN_CHUNK_SIZE = 10_000
+BATCH_SIZE = 1 << 18
+
+
+@dataclass(frozen=True)
+class DungeonModel:
+    """Per-room door counts and loot rates as arrays indexed by room - 1."""
+
+    left_counts: np.ndarray
+    right_counts: np.ndarray
+    loot_rates: np.ndarray
+
+    @property
+    def num_rooms(self):
+        return len(self.loot_rates)
+
+    @classmethod
+    def from_logic(cls, logic, start=None, end=None):
+        """Load the selected dungeon's counts for an inclusive date range."""
+        num_rooms = logic.num_rooms
+        door_counts = logic.get_door_counts_between(start, end)
+        loot_counts = logic.get_loot_counts_between(start, end)
+        rooms = range(1, num_rooms + 1)
+        left = [door_counts.get(room, {}).get("left", 0) for room in rooms]
+        right = [door_counts.get(room, {}).get("right", 0) for room in rooms]
+        drops = [sum(loot_counts.get(room, {}).values()) for room in rooms]
+        visits = np.add(left, right)
+        return cls(
+            left_counts=np.array(left, dtype=np.int64),
+            right_counts=np.array(right, dtype=np.int64),
+            loot_rates=np.divide(
+                drops, visits, out=np.zeros(num_rooms), where=visits > 0
+            ),
+        )
+
+    def predictor(self):
+        """DoorPredictor over the door rooms (every room but the last)."""
+        rooms = range(1, self.num_rooms)
+        counts = np.column_stack([self.left_counts, self.right_counts])[:-1]
+        return DoorPredictor(rooms, counts)
+
+    def left_probabilities(self):
+        return self.predictor().statistics()["left_mean"]
+
+
+def _always(door):
+    def choose(model, rng, trials):
+        return np.full((trials, model.num_rooms - 1), door == "left")
+
+    return choose
+
+
+def follow_majority(model, rng, trials):
+    """Take the door that was correct more often; left on ties."""
+    left = (model.left_counts >= model.right_counts)[:-1]
+    return np.broadcast_to(left, (trials, len(left)))
+
+
+def follow_posterior(model, rng, trials):
+    """Take the favoured door where the 95% interval excludes 50%.
+
+    Elsewhere each run samples the left-door chance from the posterior
+    and takes the door it favours (Thompson sampling).
+    """
+    stats = model.predictor().statistics()
+    picks = np.tile(stats["left_lower"] > 0.5, (trials, 1))
+    # Only the rooms without a confident answer need posterior draws
+    unsure = ~((stats["left_lower"] > 0.5) | (stats["left_upper"] < 0.5))
+    if unsure.any():
+        alpha = 1 + model.left_counts[:-1][unsure]
+        beta = 1 + model.right_counts[:-1][unsure]
+        picks[:, unsure] = rng.beta(alpha, beta, size=(trials, len(alpha))) > 0.5
+    return picks
+
+
+def random_door(model, rng, trials):
+    return rng.random((trials, model.num_rooms - 1)) < 0.5
+
+
+STRATEGIES = {
+    "always_left": _always("left"),
+    "always_right": _always("right"),
+    "follow_majority": follow_majority,
+    "follow_posterior": follow_posterior,
+    "random": random_door,
+}
+
+
+@dataclass
+class SimulationResult:
+    """Totals over all trials of one strategy, plus timing."""
+
+    strategy: str
+    trials: int
+    depth_counts: np.ndarray
+    loot_sum: float
+    loot_sum_squares: float
+    seconds: float = 0.0
+
+    @property
+    def mean_depth(self):
+        depths = np.arange(len(self.depth_counts))
+        return float(depths @ self.depth_counts) / self.trials
+
+    @property
+    def depth_stderr(self):
+        depths = np.arange(len(self.depth_counts))
+        mean_square = float(depths**2 @ self.depth_counts) / self.trials
+        return np.sqrt(max(mean_square - self.mean_depth**2, 0) / self.trials)
+
+    @property
+    def mean_loot(self):
+        return self.loot_sum / self.trials
+
+    @property
+    def loot_stderr(self):
+        variance = self.loot_sum_squares / self.trials - self.mean_loot**2
+        return np.sqrt(max(variance, 0) / self.trials)
+
+    @property
+    def clear_rate(self):
+        """Share of runs that reached the final room."""
+        return float(self.depth_counts[-1]) / self.trials
+
+    @property
+    def throughput(self):
+        return self.trials / self.seconds if self.seconds else float("inf")
+
+    def merge(self, other):
+        self.trials += other.trials
+        self.depth_counts = self.depth_counts + other.depth_counts
+        self.loot_sum += other.loot_sum
+        self.loot_sum_squares += other.loot_sum_squares
+
+
+def simulate_chunk(model, strategy, trials, seed_sequence, batch_size=BATCH_SIZE):
+    """Simulate `trials` runs in vectorized batches; runs in worker processes."""
+    rng = np.random.default_rng(seed_sequence)
+    choose = STRATEGIES[strategy]
+    left_probabilities = model.left_probabilities()
+    rooms = np.arange(model.num_rooms)
+    result = SimulationResult(
+        strategy, 0, np.zeros(model.num_rooms + 1, dtype=np.int64), 0.0, 0.0
+    )
+    for start in range(0, trials, batch_size):
+        size = min(batch_size, trials - start)
+        left_correct = rng.random((size, len(left_probabilities))) < left_probabilities
+        picks_left = choose(model, rng, size)
+        # Depth is the first room plus every room until the first wrong pick
+        survived = np.cumprod(picks_left == left_correct, axis=1)
+        depth = 1 + survived.sum(axis=1)
+        drops = rng.random((size, model.num_rooms)) < model.loot_rates
+        loot = (drops & (rooms < depth[:, None])).sum(axis=1)
+        result.merge(
+            SimulationResult(
+                strategy,
+                size,
+                np.bincount(depth, minlength=model.num_rooms + 1),
+                float(loot.sum()),
+                float((loot * loot).sum()),
+            )
+        )
+    return result
+
+
+def default_chunk_size(trials):
+    """Split trials into CHUNKS tasks of at least MIN_CHUNK_SIZE trials."""
+    return max(MIN_CHUNK_SIZE, -(-trials // CHUNKS))
+
+
+def simulate(
+    model, strategy, trials, seed=0, workers=None, chunk_size=None, executor=None
+):
+    """Run `trials` simulated runs of a strategy across worker processes.
+
+    Chunks go to executor when one is given, so several strategies can share
+    a pool; otherwise a pool is started for this call. With workers=1 the
+    chunks run in this process instead.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'")
+    chunk_size = chunk_size or default_chunk_size(trials)
+    sizes = [min(chunk_size, trials - start) for start in range(0, trials, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    chunks = [(model, strategy, size, seq) for size, seq in zip(sizes, seeds)]
+
+    start = time.perf_counter()
+    if executor is not None:
+        results = list(executor.map(simulate_chunk, *zip(*chunks)))
+    elif workers == 1:
+        results = [simulate_chunk(*chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(simulate_chunk, *zip(*chunks)))
+    total = SimulationResult(
+        strategy, 0, np.zeros(model.num_rooms + 1, dtype=np.int64), 0.0, 0.0
+    )
+    for result in results:
+        total.merge(result)
+    total.seconds = time.perf_counter() - start
+    return total
+
+
+def format_results(results):
+    lines = [
+        f"{'strategy':<18}{'depth':>16}{'loot':>16}{'clear %':>9}"
+        f"{'runs/s':>14}"
+    ]
+    for result in results:
+        lines.append(
+            f"{result.strategy:<18}"
+            f"{result.mean_depth:>8.3f} ±{result.depth_stderr:<6.3f}"
+            f"{result.mean_loot:>8.3f} ±{result.loot_stderr:<6.3f}"
+            f"{result.clear_rate * 100:>9.2f}{result.throughput:>14,.0f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database file (default: storage profile path)")
+    parser.add_argument("--trials", type=int, default=DEFAULT_TRIALS)
+    parser.add_argument(
+        "--strategies",
+        nargs="+",
+        choices=sorted(STRATEGIES),
+        default=["always_left", "follow_majority", "follow_posterior"],
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(), help="1 runs in-process"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help=f"trials per worker task (default: trials / {CHUNKS})",
+    )
+    parser.add_argument("--start", help="first day of history to use (YYYY-MM-DD)")
+    parser.add_argument("--end", help="last day of history to use (YYYY-MM-DD)")
+    parser.add_argument(
+        "--dungeon", type=int, default=DEFAULT_DUNGEON_ID, help="dungeon id"
+    )
+    args = parser.parse_args(argv)
+
+    logic = DungeonTrackerLogic(args.db, dungeon_id=args.dungeon)
+    try:
+        logic.database_setup()
+        model = DungeonModel.from_logic(logic, start=args.start, end=args.end)
+    finally:
+        logic.close()
+
+    rooms = range(1, model.num_rooms)
+    for room, p in zip(rooms, model.left_probabilities()):
+        print(f"Room {room}: left door correct {p * 100:.1f}%")
+    executor = None
+    if args.workers != 1:
+        executor = ProcessPoolExecutor(max_workers=args.workers)
+    try:
+        results = [
+            simulate(
+                model,
+                strategy,
+                args.trials,
+                seed=args.seed,
+                workers=args.workers,
+                chunk_size=args.chunk_size,
+                executor=executor,
+            )
+            for strategy in args.strategies
+        ]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    print(format_results(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Generate a realistic synthetic dungeon history for testing and benchmarks.
+
+    python dungeon_synthetic.py synthetic.db --visits 1000000 --seed 1
+
+Each room has its own chance that the left door is correct, runs end
+early at a per-room attrition rate, and loot follows a Zipf-like
+distribution in which a few items drop far more often than the rest.
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+from dungeon_migrations import DEFAULT_DUNGEON_ID
+from dungeon_report import NUM_ROOMS
+from dungeon_tracker_logic import DungeonTrackerLogic
+
+# Chance that the left door is the correct one, per door room
+LEFT_DOOR_WEIGHTS = {1: 0.35, 2: 0.45, 3: 0.55, 4: 0.25}
+# Chance that a run continues past each room
+SURVIVAL_RATES = {1: 0.75, 2: 0.6, 3: 0.5, 4: 0.4}
+# Chance that a room drops loot the tracker records
+LOOT_RATE = 0.85
+LOOT_CATALOGUE_SIZE = 200
+
+
+def synthetic_loot_names(count=LOOT_CATALOGUE_SIZE):
+    return [f"Synthetic Loot {i:03d}" for i in range(count)]
+
+
+def generate_runs(
+    visits,
+    seed=0,
+    num_rooms=NUM_ROOMS,
+    loot_names=None,
+    first_day=date(2024, 1, 1),
+    days=365,
+):
+    """Yield (started_at, ended_at, run_data) runs totalling `visits` visits."""
+    rng = random.Random(seed)
+    loot_names = loot_names or synthetic_loot_names()
+    # Zipf-like: the item of rank n drops 1/n as often as the most common one
+    ranks = range(1, len(loot_names) + 1)
+    cum_loot_weights = list(accumulate(1 / rank for rank in ranks))
+
+    remaining = visits
+    while remaining > 0:
+        day = first_day + timedelta(days=rng.randrange(days))
+        started = datetime.combine(day, datetime.min.time()) + timedelta(
+            seconds=rng.randrange(86400)
+        )
+        run_data = []
+        for room in range(1, num_rooms + 1):
+            left_correct = rng.random() < LEFT_DOOR_WEIGHTS.get(room, 0.5)
+            door = "left" if left_correct else "right"
+            loot = None
+            if rng.random() < LOOT_RATE:
+                loot = rng.choices(loot_names, cum_weights=cum_loot_weights)[0]
+            run_data.append((day.isoformat(), room, door, loot))
+            survived = rng.random() < SURVIVAL_RATES.get(room, 0.5)
+            if not survived or len(run_data) == remaining:
+                break
+        remaining -= len(run_data)
+        ended = started + timedelta(minutes=2 * len(run_data))
+        yield (
+            started.isoformat(timespec="seconds"),
+            ended.isoformat(timespec="seconds"),
+            run_data,
+        )
+
+
+def populate(logic, visits, seed=0, batch_size=10000, **kwargs):
+    """Save a synthetic history through save_runs, batch_size runs at a time."""
+    kwargs.setdefault("num_rooms", logic.num_rooms)
+    batch = []
+    for run in generate_runs(visits, seed=seed, **kwargs):
+        batch.append(run)
+        if len(batch) >= batch_size:
+            logic.save_runs(batch, create_missing_loot=True)
+            batch = []
+    if batch:
+        logic.save_runs(batch, create_missing_loot=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db", help="database file to create or extend")
+    parser.add_argument("--visits", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--dungeon", type=int, default=DEFAULT_DUNGEON_ID, help="dungeon id"
+    )
+    args = parser.parse_args(argv)
+
+    logic = DungeonTrackerLogic(args.db, dungeon_id=args.dungeon)
+    try:
+        logic.database_setup()
+        logic.enable_bulk_writes()
+        start = time.perf_counter()
+        populate(logic, args.visits, seed=args.seed)
+        elapsed = time.perf_counter() - start
+    finally:
+        logic.close()
+    print(f"Generated {args.visits} visits in {elapsed:.2f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
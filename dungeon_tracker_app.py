@@ -1,53 +1,262 @@
+import argparse
+import logging
 import sqlite3
-from datetime import datetime
-from tkinter import (BOTH, DISABLED, END, NORMAL, WORD, Button, Frame, Label,
-                     Text, Tk, Toplevel, messagebox, simpledialog, ttk)
+from tkinter import (BOTH, DISABLED, END, LEFT, NORMAL, RIGHT, Button, Entry,
+                     Frame, Label, Menu, StringVar, Text, Tk, Toplevel,
+                     messagebox, simpledialog, ttk)
+
+from dungeon_config import load_storage_profile
+from dungeon_journal import RunJournal, journal_path
+from dungeon_loot_index import LootIndex
+from dungeon_profiling import DEFAULT_SLOW_QUERY_MS, QueryProfiler
+from dungeon_report_view import PAGE_SIZE
+from dungeon_service import DungeonTrackerService, RunSession
+from dungeon_worker import DatabaseWorker
+
+WORKER_POLL_MS = 50
+LOOT_SUGGESTIONS = 50
+FILTER_DELAY_MS = 300
+
+
+class ReportWindow:
+    """Report viewer that only ever holds one page of rows in its Treeview.
+
+    Sorting (click a column heading), filtering and paging are all done by
+    the service on the database worker, so the window stays responsive
+    however many rows a view has.
+    """
+
+    def __init__(self, master, worker, on_error):
+        self.worker = worker
+        self.on_error = on_error
+        self.views = [("rooms", "Rooms")]
+        self.sort = None
+        self.descending = False
+        self.page_number = 0
+        self.total = 0
+        self._filter_job = None
+
+        self.window = Toplevel(master)
+        self.window.title("Dungeon Run Report")
+        self.window.geometry("900x600")
+
+        controls = Frame(self.window)
+        controls.pack(fill="x", padx=5, pady=5)
+        self.view_box = ttk.Combobox(controls, state="readonly")
+        self.view_box.pack(side=LEFT)
+        self.view_box.bind("<<ComboboxSelected>>", self.change_view)
+        Label(controls, text="Filter:").pack(side=LEFT, padx=(10, 2))
+        self.filter_text = StringVar()
+        filter_entry = Entry(controls, textvariable=self.filter_text)
+        filter_entry.pack(side=LEFT)
+        filter_entry.bind("<KeyRelease>", self.schedule_filter)
+        Button(controls, text="Next", command=lambda: self.go_to_page(1)).pack(
+            side=RIGHT
+        )
+        Button(controls, text="Previous", command=lambda: self.go_to_page(-1)).pack(
+            side=RIGHT
+        )
+        self.status = Label(controls)
+        self.status.pack(side=RIGHT, padx=10)
+
+        self.tree = ttk.Treeview(self.window, show="headings")
+        scrollbar = ttk.Scrollbar(self.window, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=RIGHT, fill="y")
+        self.tree.pack(fill=BOTH, expand=True)
+
+        self.worker.submit(
+            DungeonTrackerService.report_views,
+            callback=self.set_views,
+            on_error=self.on_error,
+        )
 
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
+    def set_views(self, views):
+        if not self.window.winfo_exists():
+            return
+        self.views = views
+        self.view_box.config(values=[title for _, title in views])
+        self.view_box.current(0)
+        self.change_view()
+
+    @property
+    def view(self):
+        return self.views[self.view_box.current()][0]
+
+    def change_view(self, _=None):
+        self.sort = None
+        self.descending = False
+        self.reload()
+
+    def schedule_filter(self, _):
+        """Re-query once typing pauses instead of on every key."""
+        if self._filter_job is not None:
+            self.window.after_cancel(self._filter_job)
+        self._filter_job = self.window.after(FILTER_DELAY_MS, self.reload)
+
+    def sort_by(self, column):
+        if self.sort == column:
+            self.descending = not self.descending
+        else:
+            self.sort = column
+            self.descending = False
+        self.reload()
+
+    def reload(self):
+        self._filter_job = None
+        self.page_number = 0
+        self.worker.submit(
+            DungeonTrackerService.open_report_view,
+            self.view,
+            self.sort,
+            self.descending,
+            self.filter_text.get().strip(),
+            callback=self.show_view,
+            on_error=self.on_error,
+        )
 
-from dungeon_tracker_logic import DungeonTrackerLogic
+    def show_view(self, result):
+        if not self.window.winfo_exists():
+            return
+        columns, self.total, rows = result
+        column_ids = [str(col) for col in range(len(columns))]
+        self.tree.config(columns=column_ids)
+        for col, header in enumerate(columns):
+            if col == self.sort:
+                header += " \u25bc" if self.descending else " \u25b2"
+            self.tree.heading(
+                column_ids[col], text=header, command=lambda c=col: self.sort_by(c)
+            )
+            self.tree.column(column_ids[col], width=120, stretch=True)
+        self.show_page(rows)
+
+    def go_to_page(self, step):
+        page_number = self.page_number + step
+        if page_number < 0 or page_number * PAGE_SIZE >= self.total:
+            return
+        self.page_number = page_number
+        self.worker.submit(
+            DungeonTrackerService.report_page,
+            self.view,
+            page_number,
+            callback=self.show_page,
+            on_error=self.on_error,
+        )
+
+    def show_page(self, rows):
+        if not self.window.winfo_exists():
+            return
+        self.tree.delete(*self.tree.get_children())
+        for row in rows:
+            self.tree.insert(
+                "", END, values=["-" if value is None else value for value in row]
+            )
+        first = self.page_number * PAGE_SIZE
+        self.status.config(
+            text=f"Rows {min(first + 1, self.total)}-{first + len(rows)} "
+            f"of {self.total}"
+        )
 
 
 class DungeonTrackerApp:
-    def __init__(self, root):
+    def __init__(self, root, profiler=None):
         self.root = root
         self.root.title("Dungeon Tracker")
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         self.root.grid_rowconfigure(0, weight=1)
         self.root.grid_columnconfigure(0, weight=1)
 
-        self.logic = DungeonTrackerLogic()
-        self.logic.database_setup()
-
-        self.current_room = 1
-        self.run_date = datetime.now().strftime("%Y-%m-%d")
-        self.run_data = []  # Store room choices temporarily until the run is completed
+        # All database work runs on the worker so the UI never waits on SQLite
+        self.worker = DatabaseWorker(cache=True, profiler=profiler)
+        self.worker.start()
+
+        # Store room choices temporarily until the run is completed, journaling
+        # them so a crash mid-run can be recovered on the next start
+        db_path = self.worker.db_path or load_storage_profile().path
+        self.journal = RunJournal(journal_path(db_path))
+        self.session = RunSession()
+        self.loot_index = LootIndex()
+        # Rooms and charts are built once the selected dungeon is known
+        self.dungeon = None
+        self.dungeons = []
+        self.graphs = None
+        # Bumped whenever the charts are torn down, so chart data queued for
+        # the old charts is dropped instead of drawn into the new ones
+        self.graph_generation = 0
 
         # GUI Components
         self.setup_gui()
-        self.create_graphs()
-        for room in range(1, 5):
-            self.update_graph(room)
+        if profiler is not None:
+            self.setup_debug_menu()
+
+        # Reopen the dungeon of an unfinished run so show_dungeon can resume it
+        pending = self.journal.replay()
+        if pending is not None:
+            self.worker.submit(
+                DungeonTrackerService.select_dungeon,
+                pending.dungeon_id,
+                callback=self.show_dungeon,
+                on_error=self.show_error,
+            )
+        else:
+            self.worker.submit(
+                DungeonTrackerService.selected_dungeon,
+                callback=self.show_dungeon,
+                on_error=self.show_error,
+            )
+        self.update_dungeon_list()
+        self.update_loot_dropdowns()
+        self.root.after(WORKER_POLL_MS, self.poll_worker)
 
     def setup_gui(self):
         """Create the GUI layout."""
         self.main_frame = Frame(self.root)
         self.main_frame.pack(pady=10)
 
-        Label(self.main_frame, text=f"Run Date: {self.run_date}").grid(
+        Label(self.main_frame, text=f"Run Date: {self.session.run_date}").grid(
             row=0, column=0, columnspan=2, pady=5, sticky="nsew"
         )
 
+        self.dungeon_box = ttk.Combobox(self.main_frame, state="readonly")
+        self.dungeon_box.grid(row=0, column=2, padx=10, pady=5, sticky="nsew")
+        self.dungeon_box.bind("<<ComboboxSelected>>", self.change_dungeon)
+        Button(self.main_frame, text="Add Dungeon", command=self.add_dungeon).grid(
+            row=0, column=4, columnspan=2, pady=5, sticky="nsew"
+        )
+
+        self.rooms_frame = None
         self.room_buttons = {}
-        for room in range(1, 6):  # 5 rooms -> 4 doors
-            Label(self.main_frame, text=f"Room {room}").grid(
+
+        Button(self.main_frame, text="Add Loot Item", command=self.add_loot_item).grid(
+            row=1, column=4, columnspan=2, pady=10, sticky="new"
+        )
+        self.complete_button = Button(
+            self.main_frame, text="Complete Run", command=self.complete_run
+        )
+        self.complete_button.grid(row=2, column=0, columnspan=2, pady=10, sticky="nsew")
+        Button(
+            self.main_frame, text="Generate Report", command=self.generate_report
+        ).grid(row=3, column=0, columnspan=2, pady=10, sticky="nsew")
+
+        # Shown while the database worker has requests in flight
+        self.progress = ttk.Progressbar(self.main_frame, mode="indeterminate")
+
+    def build_rooms(self, num_rooms):
+        """Create one row of door buttons and a loot drop-down per room."""
+        if self.rooms_frame is not None:
+            self.rooms_frame.destroy()
+        self.rooms_frame = Frame(self.main_frame)
+        self.rooms_frame.grid(row=1, column=0, columnspan=3, sticky="nsew")
+
+        self.room_buttons = {}
+        for room in range(1, num_rooms + 1):  # the final room has no doors
+            Label(self.rooms_frame, text=f"Room {room}").grid(
                 row=room, column=0, pady=5, sticky="nsew"
             )
-            frame = Frame(self.main_frame)
+            frame = Frame(self.rooms_frame)
             frame.grid(row=room, column=1, padx=5, pady=5, sticky="nsew")
 
-            if room != 5:
+            if room != num_rooms:
                 left_button = Button(
                     frame,
                     text="Left",
@@ -64,7 +273,7 @@ class DungeonTrackerApp:
                 )
                 right_button.grid(row=0, column=1, padx=5, sticky="nsew")
             else:
-                left_button = Button(
+                left_button = right_button = Button(
                     frame,
                     text="Submit Final Room Loot",
                     state=NORMAL if room == 1 else DISABLED,
@@ -78,31 +287,180 @@ class DungeonTrackerApp:
                 "loot": self.create_loot_dropdown(room),
             }
 
-        Button(self.main_frame, text="Add Loot Item", command=self.add_loot_item).grid(
-            row=1, column=4, columnspan=2, pady=10, sticky="nsew"
+    def update_dungeon_list(self):
+        self.worker.submit(
+            DungeonTrackerService.dungeons,
+            callback=self.set_dungeons,
+            on_error=self.show_error,
         )
-        Button(self.main_frame, text="Complete Run", command=self.complete_run).grid(
-            row=6, column=0, columnspan=2, pady=10, sticky="nsew"
+
+    def set_dungeons(self, dungeons):
+        self.dungeons = dungeons
+        self.dungeon_box.config(values=[dungeon.name for dungeon in dungeons])
+        self.select_current_dungeon()
+
+    def select_current_dungeon(self):
+        for index, dungeon in enumerate(self.dungeons):
+            if self.dungeon is not None and dungeon.id == self.dungeon.id:
+                self.dungeon_box.current(index)
+
+    def confirm_discard_run(self):
+        """Ask before a dungeon switch drops the unfinished run and its journal."""
+        return not self.session.run_data or messagebox.askokcancel(
+            "Discard Run",
+            f"Switching dungeons discards the unfinished run "
+            f"({len(self.session.run_data)} rooms). Continue?",
         )
-        Button(
-            self.main_frame, text="Generate Report", command=self.generate_report
-        ).grid(row=7, column=0, columnspan=2, pady=10, sticky="nsew")
 
-    def create_loot_dropdown(self, room):
-        loot_items = self.logic.get_loot_items()
+    def change_dungeon(self, _=None):
+        """Switch to the dungeon picked in the drop-down, dropping the run."""
+        dungeon = self.dungeons[self.dungeon_box.current()]
+        if self.dungeon is not None and dungeon.id == self.dungeon.id:
+            return
+        if not self.confirm_discard_run():
+            self.select_current_dungeon()
+            return
+        self.worker.submit(
+            DungeonTrackerService.select_dungeon,
+            dungeon.id,
+            callback=self.show_dungeon,
+            on_error=self.show_error,
+        )
+
+    def show_dungeon(self, dungeon):
+        """Rebuild the room rows and charts from the dungeon's room count."""
+        self.dungeon = dungeon
+        self.session = RunSession(dungeon.num_rooms, self.journal, dungeon.id)
+        self.build_rooms(dungeon.num_rooms)
+        self.refresh_loot_dropdowns()
+        if self.session.resume():
+            self.show_resumed_run()
+        self.select_current_dungeon()
+        if self.graphs is not None:
+            self.graph_frame.destroy()
+            self.graphs = None
+        self.graph_generation += 1
+        # matplotlib dominates start-up time, so charts load once the window is up
+        self.root.after_idle(self.load_graphs)
+
+    def show_resumed_run(self):
+        """Restore the buttons and loot of a run recovered from the journal."""
+        for _, room, _, loot in self.session.run_data:
+            self.room_buttons[room]["loot"].insert(0, loot)
+        for room, widgets in self.room_buttons.items():
+            state = NORMAL if self.session.is_room_enabled(room) else DISABLED
+            widgets["left"].config(state=state)
+            widgets["right"].config(state=state)
+        messagebox.showinfo(
+            "Run Restored",
+            f"Restored {len(self.session.run_data)} rooms of an unfinished run.",
+        )
 
-        # Create a drop-down for loot selection in the current room
-        loot_dropdown = ttk.Combobox(self.main_frame, values=loot_items, state="normal")
+    def add_dungeon(self):
+        """Prompt for a new dungeon's name and depth, then switch to it."""
+        if not self.confirm_discard_run():
+            return
+        name = simpledialog.askstring("Add Dungeon", "Enter the dungeon name:")
+        if not name:
+            return
+        num_rooms = simpledialog.askinteger(
+            "Add Dungeon", "How many rooms does it have?", minvalue=2
+        )
+        if num_rooms:
+            self.worker.submit(
+                DungeonTrackerService.add_dungeon,
+                name,
+                num_rooms,
+                callback=self.on_dungeon_added,
+                on_error=self.on_dungeon_failed,
+            )
+
+    def on_dungeon_added(self, dungeon_id):
+        self.worker.submit(
+            DungeonTrackerService.select_dungeon,
+            dungeon_id,
+            callback=self.show_dungeon,
+            on_error=self.show_error,
+        )
+        self.update_dungeon_list()
+
+    def on_dungeon_failed(self, error):
+        if isinstance(error, sqlite3.IntegrityError):
+            messagebox.showerror("Error", "This dungeon already exists.")
+        else:
+            self.show_error(error)
+
+    def setup_debug_menu(self):
+        menu_bar = Menu(self.root)
+        debug_menu = Menu(menu_bar, tearoff=0)
+        debug_menu.add_command(label="Query Statistics", command=self.show_query_stats)
+        menu_bar.add_cascade(label="Debug", menu=debug_menu)
+        self.root.config(menu=menu_bar)
+
+    def show_query_stats(self):
+        """Show the query profiler's statistics in a new window."""
+        self.worker.submit(
+            DungeonTrackerService.query_stats,
+            callback=self.show_text_window,
+            on_error=self.show_error,
+        )
+
+    def show_text_window(self, text):
+        stats_window = Toplevel(self.main_frame)
+        stats_window.title("Query Statistics")
+        text_widget = Text(stats_window, wrap="none", font=("Courier", 9))
+        text_widget.insert(END, text)
+        text_widget.config(state=DISABLED)
+        text_widget.pack(fill=BOTH, expand=True)
+
+    def poll_worker(self):
+        """Hand finished database work back to the UI and track progress."""
+        try:
+            if self.worker.poll():
+                if not self.progress.winfo_ismapped():
+                    self.progress.grid(row=4, column=0, columnspan=2, sticky="nsew")
+                    self.progress.start()
+            elif self.progress.winfo_ismapped():
+                self.progress.stop()
+                self.progress.grid_remove()
+        finally:
+            # A failing callback must not stop later results from being delivered
+            self.root.after(WORKER_POLL_MS, self.poll_worker)
+
+    def show_error(self, error):
+        messagebox.showerror("Error", str(error))
+
+    def create_loot_dropdown(self, room):
+        # Create a drop-down for loot selection in the current room; its
+        # values are suggestions from the loot index for the typed text
+        loot_dropdown = ttk.Combobox(self.rooms_frame, values=[], state="normal")
         loot_dropdown.grid(row=room, column=2, padx=10, pady=5, sticky="nsew")
+        loot_dropdown.bind(
+            "<KeyRelease>", lambda _: self.filter_loot_dropdown(loot_dropdown)
+        )
         return loot_dropdown
 
+    def filter_loot_dropdown(self, loot_dropdown):
+        """Offer the loot names matching what has been typed so far."""
+        loot_dropdown.config(
+            values=self.loot_index.search(loot_dropdown.get(), LOOT_SUGGESTIONS)
+        )
+
+    def refresh_loot_dropdowns(self):
+        for buttons in self.room_buttons.values():
+            self.filter_loot_dropdown(buttons["loot"])
+
     def update_loot_dropdowns(self):
         """Update the loot drop-down lists in all rooms."""
-        # Clear the previous loot dropdowns
-        for room in range(1, 6):
-            if "loot" in self.room_buttons[room]:
-                self.room_buttons[room]["loot"].destroy()  # Remove old drop-down
-                self.room_buttons[room]["loot"] = self.create_loot_dropdown(room)
+        self.worker.submit(
+            DungeonTrackerService.loot_items,
+            callback=self.set_loot_items,
+            on_error=self.show_error,
+        )
+
+    def set_loot_items(self, loot_items):
+        self.loot_index = LootIndex(loot_items)
+        self.refresh_loot_dropdowns()
 
     def add_loot_item(self):
         """Prompt user to add a new loot item to the database."""
@@ -112,64 +470,74 @@ class DungeonTrackerApp:
 
         if new_loot_item:
             # Insert the new loot item into the loot_items table
-            try:
-                self.logic.add_loot_item(new_loot_item)
-                messagebox.showinfo(
-                    "Success", f"'{new_loot_item}' has been added to the loot items."
-                )
-                self.update_loot_dropdowns()
-            except sqlite3.IntegrityError:
-                messagebox.showerror("Error", "This loot item already exists.")
+            self.worker.submit(
+                DungeonTrackerService.add_loot_item,
+                new_loot_item,
+                callback=lambda _: self.on_loot_item_added(new_loot_item),
+                on_error=self.on_loot_item_failed,
+            )
+
+    def on_loot_item_added(self, new_loot_item):
+        messagebox.showinfo(
+            "Success", f"'{new_loot_item}' has been added to the loot items."
+        )
+        self.loot_index.add(new_loot_item)
+        self.refresh_loot_dropdowns()
+
+    def on_loot_item_failed(self, error):
+        if isinstance(error, sqlite3.IntegrityError):
+            messagebox.showerror("Error", "This loot item already exists.")
+        else:
+            self.show_error(error)
 
     def on_closing(self):
         """Handle window close event."""
         # Ask the user if they are sure about closing (optional)
         if messagebox.askokcancel("Quit", "Do you want to quit?"):
-            self.logic.close()  # Close the database connection
+            self.worker.stop()  # Finish queued work and close the connection
+            self.journal.close()
             self.main_frame.destroy()  # Close the Tkinter window
 
+    def load_graphs(self):
+        """Create the graphs and draw the current data for each room."""
+        if self.graphs is not None or self.dungeon is None:
+            return
+        self.create_graphs()
+        self.update_graphs()
+
     def create_graphs(self):
-        """Set up graphs for each room."""
+        """Set up a single figure holding the graph of each room."""
+        from dungeon_charts import DoorChartRenderer
+
         self.graph_frame = Frame(self.root)
         self.graph_frame.pack(pady=10)
 
-        self.graphs = {}
-        for room in range(1, 5):
-            fig = Figure(figsize=(3, 2), dpi=100)
-            ax = fig.add_subplot(111)
-            ax.bar(["Left", "Right"], [0, 0], color=["blue", "green"])
-            ax.set_title(f"Room {room} Door Selections")
-            ax.set_ylim(0, 10)
-
-            canvas = FigureCanvasTkAgg(fig, self.graph_frame)
-            canvas.get_tk_widget().grid(
-                row=((room - 1) // 2), column=((room - 1) % 2), padx=10, pady=10
-            )
-
-            self.graphs[room] = {"figure": fig, "axes": ax, "canvas": canvas}
-
-    def update_graph(self, room_id):
-        """Update the graph for the selected room based on door selections."""
-        graph_data = self.logic.get_graph_data(room_id)
-
-        max_count = max(graph_data.values())
-
-        # Update the graph with the new data
-        ax = self.graphs[room_id]["axes"]
-        ax.clear()
-        ax.bar(
-            ["Left", "Right"],
-            [graph_data["Left"], graph_data["Right"]],
-            color=["blue", "green"],
+        self.graphs = DoorChartRenderer(
+            self.graph_frame, range(1, self.dungeon.num_rooms)
+        )
+        self.graphs.widget().grid(row=0, column=0, padx=10, pady=10)
+
+    def update_graphs(self):
+        """Update the graphs based on door selections, redrawing only changes."""
+        if self.graphs is None:
+            return  # Drawn with the latest data once the graphs are loaded
+
+        generation = self.graph_generation
+        self.worker.submit(
+            DungeonTrackerService.door_chart_data,
+            callback=lambda door_counts: self.show_graph_data(generation, door_counts),
+            on_error=self.show_error,
         )
-        ax.set_title(f"Room {room_id} Door Selections")
-        ax.set_ylim(0, max_count + 5)
-        self.graphs[room_id]["canvas"].draw()
+
+    def show_graph_data(self, generation, door_counts):
+        """Draw chart data, unless the charts were rebuilt since it was queued."""
+        if generation == self.graph_generation and self.graphs is not None:
+            self.graphs.update(door_counts)
 
     def record_choice(self, room, door):
         """Record the choice for the current room and loot."""
         loot = self.room_buttons[room]["loot"].get().strip()
-        self.run_data.append((self.run_date, room, door, loot))
+        self.session.record_choice(room, door, loot)
 
         # Disable buttons for the current room
         self.room_buttons[room]["left"].config(state=DISABLED)
@@ -183,24 +551,33 @@ class DungeonTrackerApp:
 
     def complete_run(self):
         """Mark the run as completed and save to the database."""
-        if not self.run_data:
+        if not self.session.run_data:
             messagebox.showerror("Error", "No data to save!")
             return
 
-        try:
-            self.logic.complete_run(self.run_data)
-            messagebox.showinfo("Success", "Run data saved successfully!")
-        except ValueError as e:
-            messagebox.showerror("Error", str(e))
-            return
+        # One save at a time: the session is only reset once the run is saved
+        self.complete_button.config(state=DISABLED)
+        self.worker.submit(
+            DungeonTrackerService.complete_run,
+            list(self.session.run_data),
+            self.session.started_at,
+            callback=self.on_run_completed,
+            on_error=self.on_run_failed,
+        )
+
+    def on_run_failed(self, error):
+        self.complete_button.config(state=NORMAL)
+        self.show_error(error)
+
+    def on_run_completed(self, _):
+        self.complete_button.config(state=NORMAL)
+        messagebox.showinfo("Success", "Run data saved successfully!")
 
         # Update all graphs for each room based on the recorded data
-        for room in range(1, 5):
-            self.update_graph(room)
+        self.update_graphs()
 
-        # Reset application state
-        self.run_data = []
-        self.current_room = 1
+        # Reset application state; the run is committed, so its journal can go
+        self.session.reset()
         for room in self.room_buttons:
             self.room_buttons[room]["left"].config(
                 state=NORMAL if room == 1 else DISABLED
@@ -211,57 +588,29 @@ class DungeonTrackerApp:
             self.room_buttons[room]["loot"].delete(0, END)
 
     def generate_report(self):
-        """Generate a report for all rooms, showing loot and door probabilities."""
-        report_data = self.logic.generate_report()
-
-        # Create a new top-level window for the report
-        report_window = Toplevel(self.main_frame)  # Reference to the root window
-        report_window.title("Dungeon Run Report")
-        report_window.geometry("800x600")  # Set initial size
-        report_window.resizable(True, True)  # Make the window resizable
-
-        # Set up a grid in the new window
-        report_frame = Frame(report_window)
-        report_frame.pack(fill=BOTH, expand=True)
-
-        # Column headers
-        headers = [
-            "Room",
-            "Loot Obtained",
-            "Left Door Correct %",
-            "Right Door Correct %",
-            "Left Door Count",
-            "Right Door Count",
-            "Visits",
-        ]
-        for col, header in enumerate(headers):
-            label = Label(
-                report_frame, text=header, font=("Helvetica", 10, "bold"), anchor="w"
-            )
-            label.grid(row=0, column=col, padx=10, pady=5, sticky="w")
-
-        # Populate the grid with data
-        for room, data in report_data.items():
-            for col, value in enumerate(data):
-                if col == 1:  # Loot column
-                    text_widget = Text(report_frame, height=4, wrap=WORD)
-                    text_widget.insert(END, value)
-                    text_widget.config(state=DISABLED)
-                    text_widget.grid(row=room, column=col, padx=10, pady=5, sticky="w")
-                else:
-                    label = Label(
-                        report_frame, text=value, font=("Helvetica", 10), anchor="w"
-                    )
-                    label.grid(row=room, column=col, padx=10, pady=5, sticky="w")
+        """Open the report viewer, starting with the per-room summary."""
+        ReportWindow(self.main_frame, self.worker, self.show_error)
 
     def close(self):
         """Close the database connection."""
-        self.logic.close()
+        self.worker.stop()
+        self.journal.close()
         self.root.destroy()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dungeon Tracker")
+    parser.add_argument(
+        "--profile", action="store_true", help="time queries; adds a Debug menu"
+    )
+    parser.add_argument("--slow-query-ms", type=float, default=DEFAULT_SLOW_QUERY_MS)
+    args = parser.parse_args()
+    logging.basicConfig(format="%(levelname)s %(message)s")
+    profiler = QueryProfiler(args.slow_query_ms) if args.profile else None
+
     root = Tk()
-    app = DungeonTrackerApp(root)
+    app = DungeonTrackerApp(root, profiler=profiler)
     root.protocol("WM_DELETE_WINDOW", app.close)  # Ensure database closes on exit
     root.mainloop()
+    if profiler is not None:
+        print(profiler.report())
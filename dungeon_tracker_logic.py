@@ -1,184 +1,445 @@
 import sqlite3
+from datetime import datetime
+
+from dungeon_cache import StatsCache
+from dungeon_config import load_storage_profile
+from dungeon_crosstab import fetch_crosstab
+from dungeon_migrations import (
+    DEFAULT_DUNGEON_ID,
+    create_dungeon,
+    migrate,
+    rebuild_door_stats,
+    verify_door_stats,
+)
+from dungeon_report import (
+    build_report,
+    fetch_door_counts,
+    fetch_dungeons,
+    fetch_room_loot,
+    fetch_run_summaries,
+)
+from dungeon_report_view import PAGE_SIZE, SQL_VIEWS, SqlRowSource
+from dungeon_trends import (
+    fetch_bucketed_door_counts,
+    fetch_daily_door_series,
+    fetch_door_counts_between,
+    fetch_loot_counts_between,
+    last_n_days,
+)
+from dungeon_write_behind import WriteBehindQueue
+
+# Stay well below SQLite's bound-parameter limit when building IN (...) lists
+LOOKUP_BATCH_SIZE = 500
 
 
 class DungeonTrackerLogic:
-    def __init__(self):
-        self.conn = sqlite3.connect("dungeon_runs.db")
-        self.cursor = self.conn.cursor()
+    def __init__(
+        self,
+        db_path=None,
+        cache=False,
+        write_behind=False,
+        flush_every=32,
+        flush_interval_ms=200,
+        profiler=None,
+        storage=None,
+        dungeon_id=DEFAULT_DUNGEON_ID,
+    ):
+        # The storage profile supplies the default path and connection pragmas
+        self.storage = storage or load_storage_profile()
+        self.db_path = db_path or self.storage.path
+        self.conn = self.storage.connect(self.db_path)
+        # Optional dungeon_profiling.QueryProfiler timing every query and method
+        self.profiler = profiler
+        if profiler is None:
+            self.cursor = self.conn.cursor()
+        else:
+            self.cursor = profiler.attach(self.conn)
+        # Optional in-memory stats cache, dropped by refresh_cache() when
+        # another connection has committed (PRAGMA data_version changes)
+        self.cache = StatsCache() if cache else None
+        self._data_version = None
+        # Runs are recorded for, and every statistic is scoped to, one dungeon
+        self.dungeon_id = dungeon_id
+        self._room_ids = None
+        # Optional write-behind mode: writes are validated here, then committed
+        # in groups by a background thread with its own connection
+        self.writer = None
+        self._writer_options = (flush_every, flush_interval_ms)
+        if write_behind:
+            self._start_writer()
+        if profiler is not None:
+            profiler.instrument(self)
 
-    def database_setup(self):
-        """Set up the SQLite database."""
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS rooms (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT
-            )
-        """
+    def _start_writer(self):
+        self.writer = WriteBehindQueue(
+            lambda: DungeonTrackerLogic(
+                self.db_path, storage=self.storage, dungeon_id=self.dungeon_id
+            ),
+            *self._writer_options,
+            on_error=self._drop_lost_writes,
         )
 
-        rooms = [
-            ("Room 1", "The first room of the dungeon."),
-            ("Room 2", "The second room of the dungeon."),
-            ("Room 3", "The third room of the dungeon."),
-            ("Room 4", "The fourth room of the dungeon."),
-            ("Room 5", "The final room of the dungeon."),
-        ]
+    def _drop_lost_writes(self, error):
+        # The cache counted the queued writes as soon as they were submitted
+        if self.cache is not None:
+            self.cache.invalidate()
 
-        for room_name, room_description in rooms:
-            # Check if the room already exists by its name
-            self.cursor.execute(
-                "SELECT COUNT(*) FROM rooms WHERE name = ?", (room_name,)
-            )
-            if self.cursor.fetchone()[0] == 0:
-                # If the room does not exist, insert it
-                self.cursor.execute(
-                    "INSERT INTO rooms (name, description) VALUES (?, ?)",
-                    (room_name, room_description),
-                )
+    def _load(self, loader):
+        # Reads must see queued writes, so flush them before hitting SQLite
+        if self.writer is not None:
+            self.writer.flush()
+        return loader()
 
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS loot_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL
-            )
-        """
-        )
+    def _cached(self, name, loader):
+        if self.cache is None:
+            return self._load(loader)
+        if self.writer is not None and self.writer.error is not None:
+            # Raise the commit error, dropping cached values that include it
+            self.writer.flush()
+        return self.cache.get(name, lambda: self._load(loader))
 
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS runs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                run_date TEXT NOT NULL,
-                room_id INTEGER NOT NULL,
-                door TEXT NOT NULL,
-                loot_id INTEGER,
-                FOREIGN KEY (room_id) REFERENCES rooms(id),
-                FOREIGN KEY (loot_id) REFERENCES loot_items(id)
-            )
+    def refresh_cache(self):
+        """Drop the cached stats if another connection has committed.
+
+        Costs one PRAGMA query, so callers run it once per batch of reads
+        (a chart refresh, a report) rather than once per cached lookup.
         """
+        if self.cache is None:
+            return
+        # Another app, the importer, the HTTP server, a CLI rebuild or our own
+        # write-behind thread committed, so the cached stats may be stale
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            self.cache.invalidate()
+
+    def _fetch_door_counts(self):
+        return self._cached(
+            "door_counts", lambda: fetch_door_counts(self.cursor, self.dungeon_id)
         )
 
-        self.conn.commit()
+    def database_setup(self):
+        """Set up the SQLite database, upgrading older schemas in place."""
+        migrate(self.conn)
 
-    def get_loot_items(self):
-        """Fetch loot items from the database."""
+    def _fetch_loot_items(self):
         self.cursor.execute("SELECT name FROM loot_items")
         return [row[0] for row in self.cursor.fetchall()]
 
+    def get_loot_items(self):
+        """Fetch loot items from the database."""
+        return list(self._cached("loot_items", self._fetch_loot_items))
+
     def add_loot_item(self, new_loot_item):
         """Add a new loot item to the database."""
-        self.cursor.execute(
-            "INSERT INTO loot_items (name) VALUES (?)", (new_loot_item,)
-        )
-        self.conn.commit()
+        if self.writer is not None:
+            self._queue_loot_item(new_loot_item)
+            return
+
+        with self.conn:
+            self.cursor.execute(
+                "INSERT INTO loot_items (name) VALUES (?)", (new_loot_item,)
+            )
+        if self.cache is not None:
+            self.cache.add_loot_item(new_loot_item)
 
-    def get_graph_data(self, room_id):
+    def get_graph_data(self, room):
         """Fetch graph data for the specified room."""
         graph_data = {"Left": 0, "Right": 0}
-        self.cursor.execute(
-            """
-            SELECT door, COUNT(*) 
-            FROM runs 
-            WHERE room_id = ? 
-            GROUP BY door
-        """,
-            (room_id,),
-        )
-
-        for door_name, count in self.cursor.fetchall():
+        door_counts = self._fetch_door_counts()
+        for door_name, count in door_counts.get(room, {}).items():
             graph_data[door_name.capitalize()] = count
 
         return graph_data
 
-    def complete_run(self, run_data):
-        """Complete the run and save data to the database."""
-        run_data_to_insert = []
-        for date, room, door, loot in run_data:
+    def _get_room_ids(self):
+        """Map the dungeon's room numbers to room ids; rooms never change."""
+        if self._room_ids is None:
             self.cursor.execute(
-                "SELECT id FROM rooms WHERE name = ?", (f"Room {room}",)
+                "SELECT position, id FROM rooms WHERE dungeon_id = ?",
+                (self.dungeon_id,),
             )
-            room_id = self.cursor.fetchone()
-            if not room_id:
-                raise ValueError(f"Room {room} not found!")
-            room_id = room_id[0]
-
-            loot_id = None
-            if loot:
-                self.cursor.execute("SELECT id FROM loot_items WHERE name = ?", (loot,))
-                loot_id = self.cursor.fetchone()
-                if loot_id:
-                    loot_id = loot_id[0]
-                else:
-                    raise ValueError(f"Loot item '{loot}' not found!")
+            self._room_ids = dict(self.cursor.fetchall())
+        return self._room_ids
 
-            run_data_to_insert.append((date, room_id, door, loot_id))
+    @property
+    def num_rooms(self):
+        """How many rooms deep the selected dungeon goes."""
+        return len(self._get_room_ids())
 
-        self.cursor.executemany(
-            "INSERT INTO runs (run_date, room_id, door, loot_id) VALUES (?, ?, ?, ?)",
-            run_data_to_insert,
-        )
-        self.conn.commit()
+    def get_dungeons(self):
+        """Fetch every dungeon with its room count."""
+        return fetch_dungeons(self.cursor)
 
-    def generate_report(self):
-        """Generate report data for all rooms."""
-        report_data = {}
-        for room in range(1, 6):
+    def add_dungeon(self, name, num_rooms):
+        """Add a dungeon with rooms 1..num_rooms and return its id.
+
+        Raises sqlite3.IntegrityError if the name is taken.
+        """
+        self.flush()
+        with self.conn:
+            return create_dungeon(self.cursor, name, num_rooms)
+
+    def select_dungeon(self, dungeon_id):
+        """Record runs for, and scope every statistic to, another dungeon."""
+        if dungeon_id == self.dungeon_id:
+            return
+        if not any(dungeon.id == dungeon_id for dungeon in self.get_dungeons()):
+            raise ValueError(f"Dungeon {dungeon_id} not found!")
+        # Queued runs belong to the old dungeon, so commit them first. If that
+        # fails we stay on the old dungeon, but never keep the stopped writer.
+        try:
+            if self.writer is not None:
+                self.writer.close()
+            self.dungeon_id = dungeon_id
+            self._room_ids = None
+            if self.cache is not None:
+                self.cache.invalidate()
+        finally:
+            if self.writer is not None:
+                self._start_writer()
+
+    def _resolve_loot_ids(self, loot_names):
+        """Look up the ids of many loot items with batched IN queries."""
+        loot_names = list(set(loot_names))
+        loot_ids = {}
+        for start in range(0, len(loot_names), LOOKUP_BATCH_SIZE):
+            batch = loot_names[start : start + LOOKUP_BATCH_SIZE]
+            placeholders = ", ".join("?" * len(batch))
             self.cursor.execute(
-                """
-                SELECT li.name
-                FROM runs r
-                JOIN loot_items li ON r.loot_id = li.id
-                WHERE r.room_id = ?
-            """,
-                (room,),
+                f"SELECT name, id FROM loot_items WHERE name IN ({placeholders})",
+                batch,
             )
-            loot = [row[0] for row in self.cursor.fetchall()]
+            loot_ids.update(self.cursor.fetchall())
+        return loot_ids
 
-            self.cursor.execute(
-                """
-                SELECT door, COUNT(*) 
-                FROM runs 
-                WHERE room_id = ? 
-                GROUP BY door
-            """,
-                (room,),
+    def complete_run(self, run_data, started_at=None, create_missing_loot=False):
+        """Complete the run and save data to the database.
+
+        With create_missing_loot, unknown loot names are added to the
+        catalogue in the same transaction instead of raising ValueError.
+        """
+        ended_at = datetime.now().isoformat(timespec="seconds")
+        run = (started_at or ended_at, ended_at, run_data)
+        if self.writer is not None:
+            self._queue_run(run, create_missing_loot)
+        else:
+            self.save_runs([run], create_missing_loot=create_missing_loot)
+
+    def _queue_loot_item(self, name):
+        """Validate a loot item like the database would, then queue it."""
+        # Check the queue before the table: a name leaves the queue only after
+        # it has been committed, so it is always visible in one of the two
+        pending = name in self.writer.pending_loot_items()
+        self.cursor.execute("SELECT 1 FROM loot_items WHERE name = ?", (name,))
+        if pending or self.cursor.fetchone():
+            raise sqlite3.IntegrityError("UNIQUE constraint failed: loot_items.name")
+        self.writer.put_loot_item(name)
+        if self.cache is not None:
+            self.cache.add_loot_item(name)
+
+    def _queue_run(self, run, create_missing_loot):
+        """Validate a run like save_runs would, then queue it."""
+        run_data = run[2]
+        room_ids = self._get_room_ids()
+        known_loot = self.writer.pending_loot_items()
+        loot_ids = self._resolve_loot_ids(loot for _, _, _, loot in run_data if loot)
+        known_loot.update(loot_ids)
+
+        visits = []
+        new_loot_items = []
+        for _, room, door, loot in run_data:
+            if room not in room_ids:
+                raise ValueError(f"Room {room} not found!")
+            if loot and loot not in known_loot:
+                if not create_missing_loot:
+                    raise ValueError(f"Loot item '{loot}' not found!")
+                known_loot.add(loot)
+                new_loot_items.append(loot)
+            visits.append((room, door, loot))
+
+        for name in new_loot_items:
+            self.writer.put_loot_item(name)
+        self.writer.put_run(run)
+        if self.cache is not None:
+            for name in new_loot_items:
+                self.cache.add_loot_item(name)
+            self.cache.record_runs([visits])
+
+    def flush(self):
+        """Wait until every queued write-behind submission is committed."""
+        if self.writer is not None:
+            self.writer.flush()
+
+    def save_runs(self, runs, create_missing_loot=False, loot_items=()):
+        """Save (started_at, ended_at, run_data) runs in a single transaction.
+
+        Names in loot_items are added to the catalogue in the same
+        transaction if they are not in it already.
+        """
+        runs = [run for run in runs if run[2]]
+        room_ids = self._get_room_ids()
+        loot_names = {
+            loot for _, _, run_data in runs for _, _, _, loot in run_data if loot
+        }
+        loot_names.update(loot_items)
+        loot_ids = self._resolve_loot_ids(loot_names)
+
+        with self.conn:
+            self.cursor.execute("BEGIN")
+            missing_loot = loot_names - loot_ids.keys()
+            if not create_missing_loot:
+                missing_loot &= set(loot_items)
+            new_loot_items = sorted(missing_loot)
+            if new_loot_items:
+                self.cursor.executemany(
+                    "INSERT INTO loot_items (name) VALUES (?)",
+                    [(name,) for name in new_loot_items],
+                )
+                loot_ids.update(self._resolve_loot_ids(new_loot_items))
+
+            run_data_to_insert = []
+            run_visits = []
+            for started_at, ended_at, run_data in runs:
+                self.cursor.execute(
+                    "INSERT INTO dungeon_runs "
+                    "(dungeon_id, run_date, started_at, ended_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (self.dungeon_id, run_data[0][0], started_at, ended_at),
+                )
+                dungeon_run_id = self.cursor.lastrowid
+
+                visits = []
+                run_visits.append(visits)
+                for date, room, door, loot in run_data:
+                    room_id = room_ids.get(room)
+                    if room_id is None:
+                        raise ValueError(f"Room {room} not found!")
+
+                    loot_id = None
+                    if loot:
+                        loot_id = loot_ids.get(loot)
+                        if loot_id is None:
+                            raise ValueError(f"Loot item '{loot}' not found!")
+
+                    run_data_to_insert.append(
+                        (self.dungeon_id, dungeon_run_id, date, room_id, door, loot_id)
+                    )
+                    visits.append((room, door, loot))
+
+            self.cursor.executemany(
+                "INSERT INTO runs "
+                "(dungeon_id, dungeon_run_id, run_date, room_id, door, loot_id) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                run_data_to_insert,
             )
-            door_counts = {door: count for door, count in self.cursor.fetchall()}
-            total_visits = sum(door_counts.values())
 
-            left_correct = door_counts.get("left", 0)
-            right_correct = door_counts.get("right", 0)
+        if self.cache is not None:
+            for name in new_loot_items:
+                self.cache.add_loot_item(name)
+            self.cache.record_runs(run_visits)
 
-            left_correct_percentage = (
-                (left_correct / total_visits * 100) if total_visits > 0 else 0
+    def get_run_summaries(self, run_date=None, limit=None):
+        """Fetch per-run depth and loot totals, newest first."""
+        return self._load(
+            lambda: fetch_run_summaries(
+                self.cursor, self.dungeon_id, run_date=run_date, limit=limit
             )
-            right_correct_percentage = (
-                (right_correct / total_visits * 100) if total_visits > 0 else 0
+        )
+
+    def get_door_counts_between(self, start=None, end=None):
+        """Door counts per room for an inclusive date range."""
+        return self._load(
+            lambda: fetch_door_counts_between(self.cursor, self.dungeon_id, start, end)
+        )
+
+    def get_recent_door_counts(self, days, today=None):
+        """Door counts per room over the last `days` days."""
+        return self.get_door_counts_between(*last_n_days(days, today))
+
+    def get_loot_counts_between(self, start=None, end=None):
+        """Drops per room and loot name for an inclusive date range."""
+        return self._load(
+            lambda: fetch_loot_counts_between(self.cursor, self.dungeon_id, start, end)
+        )
+
+    def get_daily_door_series(self, room, start=None, end=None):
+        """Per-day (day, left, right) counts for one room, for trend charts."""
+        room_id = self._get_room_ids().get(room)
+        return self._load(
+            lambda: fetch_daily_door_series(
+                self.cursor, self.dungeon_id, room_id, start, end
             )
-            left_correct_percentage_string = f"{left_correct_percentage:.2f}%"
-            right_correct_percentage_string = f"{right_correct_percentage:.2f}%"
+        )
+
+    def get_patch_door_counts(self, patches):
+        """Door counts per room for each (label, first_day) patch bucket."""
+        return self._load(
+            lambda: fetch_bucketed_door_counts(self.cursor, self.dungeon_id, patches)
+        )
+
+    def get_report(self):
+        """Build a typed report for all rooms in two grouped queries."""
+        self.refresh_cache()
+        return build_report(
+            self._fetch_door_counts(),
+            self._cached(
+                "room_loot", lambda: fetch_room_loot(self.cursor, self.dungeon_id)
+            ),
+            self.num_rooms,
+        )
+
+    def generate_report(self):
+        """Generate report data for all rooms."""
+        return self.get_report().as_rows()
+
+    def get_crosstab(self):
+        """Return visit counts by room, loot, door and next-room door.
+
+        Built in one grouped query; with cache=True it is kept and updated
+        by later writes, so repeated slicing never rescans the runs table.
+        """
+        return self._cached(
+            "crosstab", lambda: fetch_crosstab(self.cursor, self.dungeon_id)
+        )
+
+    def get_report_rows(self, view, page_size=PAGE_SIZE):
+        """Return a sortable, filterable SqlRowSource over one of SQL_VIEWS."""
+        self.flush()
+        _, columns, select = SQL_VIEWS[view]
+        return SqlRowSource(
+            self.cursor, view, columns, select, page_size, (self.dungeon_id,)
+        )
+
+    def rebuild_door_stats(self):
+        """Recompute the door-count summary from the raw runs table."""
+        self.flush()
+        with self.conn:
+            rebuild_door_stats(self.cursor)
+        if self.cache is not None:
+            self.cache.invalidate()
 
-            loot_display = "\n".join(set(loot)) if loot else "No loot recorded"
+    def verify_door_stats(self):
+        """Return summary rows that disagree with the raw runs table."""
+        return self._load(lambda: verify_door_stats(self.cursor))
 
-            if room == 5:
-                left_correct_percentage_string = "-"
-                right_correct_percentage_string = "-"
+    def export_columnar(self, path, format="npz", chunk_size=100000):
+        """Stream the tables to an .npz file or a Parquet directory."""
+        # NumPy (and pyarrow for Parquet) are only needed for exports
+        from dungeon_export import export_npz, export_parquet
 
-            report_data[room] = [
-                f"Room {room}",
-                loot_display,
-                left_correct_percentage_string,
-                right_correct_percentage_string,
-                str(left_correct),
-                str(right_correct),
-                str(total_visits),
-            ]
+        exporter = export_parquet if format == "parquet" else export_npz
+        return exporter(self, path, chunk_size=chunk_size)
 
-        return report_data
+    def enable_bulk_writes(self):
+        """Switch to WAL journaling with relaxed syncs for large imports."""
+        self.cursor.execute("PRAGMA journal_mode=WAL")
+        self.cursor.execute("PRAGMA synchronous=NORMAL")
 
     def close(self):
-        """Close the database connection."""
-        self.conn.close()
+        """Close the database connection, committing queued writes first."""
+        try:
+            if self.writer is not None:
+                self.writer.close()
+        finally:
+            self.conn.close()
@@ -0,0 +1,113 @@
+from bisect import bisect_right
+from datetime import date, timedelta
+
+
+def _rollup_filter(dungeon_id, start, end):
+    # dungeon_id leads the daily_rollups key, so other dungeons are never read
+    clauses = ["dungeon_id = ?"]
+    params = [dungeon_id]
+    if start is not None:
+        clauses.append("day >= ?")
+        params.append(str(start))
+    if end is not None:
+        clauses.append("day <= ?")
+        params.append(str(end))
+    return " WHERE " + " AND ".join(clauses), params
+
+
+def fetch_door_counts_between(cursor, dungeon_id, start=None, end=None):
+    """Door counts per room for an inclusive date range, from the rollups."""
+    where, params = _rollup_filter(dungeon_id, start, end)
+    cursor.execute(
+        f"""
+        SELECT rm.position, d.door, d.count
+        FROM (
+            SELECT room_id, door, SUM(count) AS count
+            FROM daily_rollups{where}
+            GROUP BY room_id, door
+        ) d
+        JOIN rooms rm ON rm.id = d.room_id
+    """,
+        params,
+    )
+    door_counts = {}
+    for room, door, count in cursor.fetchall():
+        door_counts.setdefault(room, {})[door] = count
+    return door_counts
+
+
+def fetch_loot_counts_between(cursor, dungeon_id, start=None, end=None):
+    """Drops per room and loot name for an inclusive date range."""
+    where, params = _rollup_filter(dungeon_id, start, end)
+    cursor.execute(
+        f"""
+        SELECT rm.position, li.name, d.count
+        FROM (
+            SELECT room_id, loot_id, SUM(count) AS count
+            FROM daily_rollups{where}
+            GROUP BY room_id, loot_id
+        ) d
+        JOIN rooms rm ON rm.id = d.room_id
+        JOIN loot_items li ON li.id = d.loot_id
+    """,
+        params,
+    )
+    loot_counts = {}
+    for room, name, count in cursor.fetchall():
+        loot_counts.setdefault(room, {})[name] = count
+    return loot_counts
+
+
+def fetch_daily_door_series(cursor, dungeon_id, room_id, start=None, end=None):
+    """Return [(day, left, right), ...] for one room, oldest day first."""
+    where, params = _rollup_filter(dungeon_id, start, end)
+    cursor.execute(
+        f"""
+        SELECT day,
+               SUM(CASE WHEN door = 'left' THEN count ELSE 0 END),
+               SUM(CASE WHEN door = 'right' THEN count ELSE 0 END)
+        FROM daily_rollups{where} AND room_id = ?
+        GROUP BY day
+        ORDER BY day
+    """,
+        params + [room_id],
+    )
+    return cursor.fetchall()
+
+
+def last_n_days(days, today=None):
+    """Return the (start, end) dates covering the last `days` days."""
+    end = today or date.today()
+    return end - timedelta(days=days - 1), end
+
+
+def fetch_bucketed_door_counts(cursor, dungeon_id, boundaries):
+    """Door counts per room for each bucket, e.g. one bucket per patch.
+
+    boundaries is a list of (label, first_day) pairs; a bucket runs until
+    the next boundary, and days before the first boundary are ignored.
+    """
+    boundaries = sorted(boundaries, key=lambda boundary: str(boundary[1]))
+    starts = [str(first_day) for _, first_day in boundaries]
+    buckets = {label: {} for label, _ in boundaries}
+
+    where, params = _rollup_filter(dungeon_id, starts[0] if starts else None, None)
+    cursor.execute(
+        f"""
+        SELECT d.day, rm.position, d.door, d.count
+        FROM (
+            SELECT day, room_id, door, SUM(count) AS count
+            FROM daily_rollups{where}
+            GROUP BY day, room_id, door
+        ) d
+        JOIN rooms rm ON rm.id = d.room_id
+    """,
+        params,
+    )
+    for day, room, door, count in cursor.fetchall():
+        index = bisect_right(starts, day) - 1
+        if index < 0:
+            continue
+        counts = buckets[boundaries[index][0]].setdefault(room, {})
+        counts[door] = counts.get(door, 0) + count
+    return buckets
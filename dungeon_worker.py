@@ -0,0 +1,65 @@
+import queue
+import threading
+
+from dungeon_service import DungeonTrackerService
+from dungeon_tracker_logic import DungeonTrackerLogic
+
+
+class DatabaseWorker(threading.Thread):
+    """Run database work on a thread that owns its own SQLite connection.
+
+    Jobs are functions called as func(service, *args) with a
+    DungeonTrackerService bound to the worker's connection. Their results (or
+    exceptions) are queued and handed to the callbacks by poll(), which the
+    GUI calls from its own thread, e.g. through root.after.
+    """
+
+    def __init__(self, db_path=None, cache=True, profiler=None):
+        super().__init__(name="DatabaseWorker", daemon=True)
+        self.db_path = db_path
+        self.cache = cache
+        self.profiler = profiler
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0
+
+    def run(self):
+        logic = DungeonTrackerLogic(
+            self.db_path, cache=self.cache, profiler=self.profiler
+        )
+        try:
+            logic.database_setup()
+            service = DungeonTrackerService(logic)
+            while (job := self.requests.get()) is not None:
+                func, args, callback, on_error = job
+                try:
+                    result = func(service, *args)
+                except Exception as e:
+                    self.results.put((on_error, e))
+                else:
+                    self.results.put((callback, result))
+        finally:
+            logic.close()
+
+    def submit(self, func, *args, callback=None, on_error=None):
+        """Queue func(service, *args) to run on the worker thread."""
+        self.pending += 1
+        self.requests.put((func, args, callback, on_error))
+
+    def poll(self):
+        """Deliver finished jobs to their callbacks; call from the GUI thread."""
+        while True:
+            try:
+                callback, value = self.results.get_nowait()
+            except queue.Empty:
+                return self.pending
+            self.pending -= 1
+            if callback is not None:
+                callback(value)
+            elif isinstance(value, Exception):
+                raise value
+
+    def stop(self):
+        """Finish the queued jobs, then close the worker's connection."""
+        self.requests.put(None)
+        self.join()
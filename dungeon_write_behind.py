@@ -0,0 +1,191 @@
+import queue
+import threading
+import time
+
+
+class WriteBehindError(Exception):
+    """Queued submissions could not be committed.
+
+    runs and loot_items hold the lost submissions so the caller can show
+    or resubmit them; __cause__ is the last database error.
+    """
+
+    def __init__(self, runs, loot_items, cause):
+        super().__init__(f"Could not save {len(runs)} queued run(s): {cause}")
+        self.runs = runs
+        self.loot_items = loot_items
+        self.__cause__ = cause
+
+
+class WriteBehindQueue:
+    """Commit submitted runs and loot items from a background thread in groups.
+
+    A group is committed once flush_every runs are queued or flush_interval_ms
+    after its first submission, whichever comes first. Each group commits
+    atomically, so a crash loses at most the submissions not yet flushed and
+    never leaves half a run behind. flush() and close() wait until everything
+    submitted so far is durable.
+
+    A group that fails to commit is retried one submission at a time; those
+    that still fail are raised as a WriteBehindError by the next put, flush
+    or close, after on_error(error) has been called on the caller's thread.
+    """
+
+    def __init__(self, connect, flush_every=32, flush_interval_ms=200, on_error=None):
+        self.connect = connect
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval_ms / 1000
+        self.on_error = on_error
+        self._pending_loot = set()
+        self.error = None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._thread = threading.Thread(
+            target=self._run, name="WriteBehindQueue", daemon=True
+        )
+        self._thread.start()
+
+    def put_run(self, run):
+        """Queue a (started_at, ended_at, run_data) run."""
+        self._put(("run", run))
+
+    def put_loot_item(self, name):
+        with self._lock:
+            self._pending_loot.add(name)
+        self._put(("loot", name))
+
+    def pending_loot_items(self):
+        """Return the loot names queued but not yet committed."""
+        with self._lock:
+            return set(self._pending_loot)
+
+    def _put(self, item):
+        self._raise_error()
+        self._check_running()
+        with self._lock:
+            self._pending += 1
+        self._queue.put(item)
+
+    def flush(self):
+        """Block until every queued submission has been committed."""
+        with self._lock:
+            pending = self._pending
+        if pending:
+            self._check_running()
+            done = threading.Event()
+            self._queue.put(("flush", done))
+            done.wait()
+        self._raise_error()
+
+    def close(self):
+        """Flush durably and stop the background thread.
+
+        The thread closes its connection on the way out, so it is closed
+        even when a stored commit error is raised here.
+        """
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
+
+    def _check_running(self):
+        # Nothing would ever commit submissions queued after close()
+        if not self._thread.is_alive():
+            raise RuntimeError("The write-behind queue is closed.")
+
+    def _raise_error(self):
+        with self._lock:
+            error, self.error = self.error, None
+        if error is not None:
+            if self.on_error is not None:
+                self.on_error(error)
+            raise error
+
+    def _run(self):
+        logic = self.connect()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+
+                group = [item]
+                deadline = time.monotonic() + self.flush_interval
+                stop = False
+                while item[0] != "flush" and self._runs_in(group) < self.flush_every:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    group.append(item)
+
+                self._commit(logic, group)
+                if stop:
+                    break
+        finally:
+            # Commit anything submitted before close() asked us to stop
+            remaining = []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    remaining.append(item)
+            self._commit(logic, remaining)
+            logic.close()
+
+    @staticmethod
+    def _runs_in(group):
+        return sum(1 for kind, _ in group if kind == "run")
+
+    def _commit(self, logic, group):
+        loot_items = [value for kind, value in group if kind == "loot"]
+        runs = [value for kind, value in group if kind == "run"]
+        if loot_items or runs:
+            try:
+                logic.save_runs(
+                    runs, create_missing_loot=True, loot_items=loot_items
+                )
+            except Exception:
+                self._commit_separately(logic, runs, loot_items)
+
+        with self._lock:
+            self._pending_loot.difference_update(loot_items)
+            self._pending -= len(loot_items) + len(runs)
+        for kind, value in group:
+            if kind == "flush":
+                value.set()
+
+    def _commit_separately(self, logic, runs, loot_items):
+        """Retry a failed group one submission at a time, keeping the failures."""
+        failed_runs = []
+        failed_loot = []
+        cause = None
+        for name in loot_items:
+            try:
+                logic.save_runs([], loot_items=[name])
+            except Exception as e:
+                failed_loot.append(name)
+                cause = e
+        for run in runs:
+            try:
+                logic.save_runs([run], create_missing_loot=True)
+            except Exception as e:
+                failed_runs.append(run)
+                cause = e
+        if cause is None:
+            return
+
+        with self._lock:
+            # Keep what earlier groups lost if nobody has seen that error yet
+            if self.error is not None:
+                failed_runs = self.error.runs + failed_runs
+                failed_loot = self.error.loot_items + failed_loot
+            self.error = WriteBehindError(failed_runs, failed_loot, cause)
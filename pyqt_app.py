@@ -1,102 +1,185 @@
+import argparse
+import logging
 import sys
 import sqlite3
-from datetime import datetime
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QWidget, QLabel, QPushButton, QComboBox, QGridLayout, QMessageBox, QInputDialog)
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QPushButton, QComboBox, QCompleter, QGridLayout, QMessageBox, QInputDialog, QPlainTextEdit, QLineEdit, QTableView)
 from PyQt5.QtChart import QChart, QChartView, QBarSet, QBarSeries, QBarCategoryAxis, QValueAxis
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPainter
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QStringListModel, QTimer
+from PyQt5.QtGui import QFontDatabase, QPainter
+
+from dungeon_journal import RunJournal, journal_path
+from dungeon_loot_index import LootIndex
+from dungeon_profiling import DEFAULT_SLOW_QUERY_MS, QueryProfiler
+from dungeon_report_view import PAGE_SIZE
+from dungeon_service import DungeonTrackerService, RunSession
+from dungeon_tracker_logic import DungeonTrackerLogic
+
+LOOT_SUGGESTIONS = 50
+FILTER_DELAY_MS = 300
+
+
+class ReportTableModel(QAbstractTableModel):
+    """Table model that pulls report rows from the service a page at a time.
+
+    The view asks for more rows through canFetchMore/fetchMore as it is
+    scrolled; sorting and filtering re-query the service from the first page.
+    """
+
+    def __init__(self, service, view, parent=None):
+        super().__init__(parent)
+        self.service = service
+        self.view = view
+        self.sort_column = None
+        self.descending = False
+        self.text = ""
+        self.reload()
+
+    def reload(self):
+        self.beginResetModel()
+        self.columns, self.total, self.rows = self.service.open_report_view(self.view, self.sort_column, self.descending, self.text)
+        self.endResetModel()
+
+    def set_view(self, view):
+        self.view = view
+        self.sort_column = None
+        self.reload()
+
+    def set_filter(self, text):
+        self.text = text
+        self.reload()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        value = self.rows[index.row()][index.column()]
+        return "-" if value is None else str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section]
+        return None
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and len(self.rows) < self.total
+
+    def fetchMore(self, parent):
+        rows = self.service.report_page(self.view, len(self.rows) // PAGE_SIZE)
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sort_column = column if column >= 0 else None
+        self.descending = order == Qt.DescendingOrder
+        self.reload()
 
-num_rooms = 5
 
 class DungeonTrackerApp(QMainWindow):
-    def __init__(self):
+    def __init__(self, profiler=None):
         super().__init__()
 
         self.setWindowTitle("Dungeon Tracker")
-        self.conn = sqlite3.connect('dungeon_runs.db')
-        self.cursor = self.conn.cursor()
-        self.database_setup()
+        # Commits stay synchronous: a run is only reported saved, and its
+        # journal truncated, once it is durable
+        self.logic = DungeonTrackerLogic(cache=True, profiler=profiler)
+        self.logic.database_setup()
+        self.service = DungeonTrackerService(self.logic)
 
-        self.current_room = 1
-        self.run_date = datetime.now().strftime("%Y-%m-%d")
-        self.run_data = []  # Store room choices temporarily until the run is completed
+        # Store room choices temporarily until the run is completed, journaling
+        # them so a crash mid-run can be recovered on the next start
+        self.journal = RunJournal(journal_path(self.logic.db_path))
+        self.session = RunSession()
+
+        # One sorted model shared by every loot drop-down, updated in place
+        self.loot_index = LootIndex(self.service.loot_items())
+        self.loot_model = QStringListModel(list(self.loot_index.names))
 
         self.main_widget = QWidget()
         self.setCentralWidget(self.main_widget)
         # self.main_layout = QVBoxLayout(self.main_widget)
 
         self.setup_gui()
-        self.create_graphs()
-        for room in range(1, num_rooms + 1):
-            self.update_graph(room)
+        if profiler is not None:
+            debug_menu = self.menuBar().addMenu("Debug")
+            debug_menu.addAction("Query Statistics", self.show_query_stats)
+        self.update_dungeon_list()
+        # Reopen the dungeon of an unfinished run so show_dungeon can resume it
+        pending = self.journal.replay()
+        if pending is not None:
+            self.show_dungeon(self.service.select_dungeon(pending.dungeon_id))
+        else:
+            self.show_dungeon(self.service.selected_dungeon())
 
     def closeEvent(self, event):
         reply = QMessageBox.question(self, 'Quit', 'Do you want to quit?', QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            self.conn.close()
+            self.logic.close()
+            self.journal.close()
             event.accept()
         else:
             event.ignore()
 
-    def database_setup(self):
-        """Set up the SQLite database."""
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS rooms (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT
-            )
-        """)
-
-        rooms = [
-            ("Room 1", "The first room of the dungeon."),
-            ("Room 2", "The second room of the dungeon."),
-            ("Room 3", "The third room of the dungeon."),
-            ("Room 4", "The fourth room of the dungeon."),
-            ("Room 5", "The final room of the dungeon."),
-        ]
-
-        for room_name, room_description in rooms:
-            self.cursor.execute("SELECT COUNT(*) FROM rooms WHERE name = ?", (room_name,))
-            if self.cursor.fetchone()[0] == 0:
-                self.cursor.execute("INSERT INTO rooms (name, description) VALUES (?, ?)", (room_name, room_description))
-
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS loot_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL
-            )
-        """)
-
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS runs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                run_date TEXT NOT NULL,
-                room_id INTEGER NOT NULL,
-                door TEXT NOT NULL,
-                loot_id INTEGER,
-                FOREIGN KEY (room_id) REFERENCES rooms(id),
-                FOREIGN KEY (loot_id) REFERENCES loot_items(id)
-            )
-        """)
-
-        self.conn.commit()
-
     def setup_gui(self):
         """Create the GUI layout."""
         self.main_layout = QVBoxLayout()
         self.main_widget.setLayout(self.main_layout)
 
-        self.run_date_label = QLabel(f"Run Date: {self.run_date}")
+        self.run_date_label = QLabel(f"Run Date: {self.session.run_date}")
         self.main_layout.addWidget(self.run_date_label)
 
+        dungeon_layout = QHBoxLayout()
+        self.dungeon_box = QComboBox()
+        self.dungeon_box.activated.connect(self.change_dungeon)
+        dungeon_layout.addWidget(self.dungeon_box)
+        add_dungeon_button = QPushButton("Add Dungeon")
+        add_dungeon_button.clicked.connect(self.add_dungeon)
+        dungeon_layout.addWidget(add_dungeon_button)
+        self.main_layout.addLayout(dungeon_layout)
+
+        # Room rows and charts are rebuilt from the selected dungeon's rooms
+        self.rooms_widget = None
+        self.rooms_layout = QVBoxLayout()
+        self.main_layout.addLayout(self.rooms_layout)
+        self.room_buttons = {}
+
+        add_loot_button = QPushButton("Add Loot Item")
+        add_loot_button.clicked.connect(self.add_loot_item)
+        self.main_layout.addWidget(add_loot_button)
+
+        complete_run_button = QPushButton("Complete Run")
+        complete_run_button.clicked.connect(self.complete_run)
+        self.main_layout.addWidget(complete_run_button)
+
+        generate_report_button = QPushButton("Generate Report")
+        generate_report_button.clicked.connect(self.generate_report)
+        self.main_layout.addWidget(generate_report_button)
+
+        self.graphs_widget = None
+        self.graphs_layout = QVBoxLayout()
+        self.main_layout.addLayout(self.graphs_layout)
+
+    def build_rooms(self, num_rooms):
+        """Create the door buttons and loot drop-down of every room."""
+        if self.rooms_widget is not None:
+            self.rooms_widget.deleteLater()
+        self.rooms_widget = QWidget()
+        layout = QVBoxLayout(self.rooms_widget)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.rooms_layout.addWidget(self.rooms_widget)
+
         self.room_buttons = {}
-        for room in range(1, 6):
+        for room in range(1, num_rooms + 1):
             room_label = QLabel(f"Room {room}")
-            self.main_layout.addWidget(room_label)
+            layout.addWidget(room_label)
 
             button_layout = QGridLayout()
-            if room != 5:
+            if room != num_rooms:
                 left_button = QPushButton("Left")
                 left_button.setEnabled(room == 1)
                 left_button.clicked.connect(lambda _, r=room: self.record_choice(r, "left"))
@@ -112,43 +195,114 @@ class DungeonTrackerApp(QMainWindow):
                 submit_button.clicked.connect(lambda _, r=room: self.record_choice(r, "right"))
                 button_layout.addWidget(submit_button, 0, 0)
 
-            self.main_layout.addLayout(button_layout)
+            layout.addLayout(button_layout)
 
             loot_dropdown = self.create_loot_dropdown(room)
-            self.main_layout.addWidget(loot_dropdown)
+            layout.addWidget(loot_dropdown)
 
             self.room_buttons[room] = {
-                "left": left_button if room != 5 else None,
-                "right": right_button if room != 5 else submit_button,
+                "left": left_button if room != num_rooms else None,
+                "right": right_button if room != num_rooms else submit_button,
                 "loot": loot_dropdown
             }
 
-        add_loot_button = QPushButton("Add Loot Item")
-        add_loot_button.clicked.connect(self.add_loot_item)
-        self.main_layout.addWidget(add_loot_button)
-
-        complete_run_button = QPushButton("Complete Run")
-        complete_run_button.clicked.connect(self.complete_run)
-        self.main_layout.addWidget(complete_run_button)
+    def update_dungeon_list(self):
+        self.dungeons = self.service.dungeons()
+        self.dungeon_box.clear()
+        for dungeon in self.dungeons:
+            self.dungeon_box.addItem(dungeon.name)
+
+    def show_dungeon(self, dungeon):
+        """Rebuild the room rows and charts from the dungeon's room count."""
+        self.dungeon = dungeon
+        self.session = RunSession(dungeon.num_rooms, self.journal, dungeon.id)
+        self.build_rooms(dungeon.num_rooms)
+        self.create_graphs()
+        self.update_graphs()
+        self.dungeon_box.setCurrentIndex([d.id for d in self.dungeons].index(dungeon.id))
+        if self.session.resume():
+            self.show_resumed_run()
+
+    def show_resumed_run(self):
+        """Restore the buttons and loot of a run recovered from the journal."""
+        for _, room, _, loot in self.session.run_data:
+            self.room_buttons[room]["loot"].setCurrentText(loot)
+        for room, buttons in self.room_buttons.items():
+            if buttons["left"] is not None:
+                buttons["left"].setEnabled(self.session.is_room_enabled(room))
+            buttons["right"].setEnabled(self.session.is_room_enabled(room))
+        QMessageBox.information(self, "Run Restored", f"Restored {len(self.session.run_data)} rooms of an unfinished run.")
+
+    def confirm_discard_run(self):
+        """Ask before a dungeon switch drops the unfinished run and its journal."""
+        if not self.session.run_data:
+            return True
+        reply = QMessageBox.question(self, "Discard Run", f"Switching dungeons discards the unfinished run ({len(self.session.run_data)} rooms). Continue?", QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        return reply == QMessageBox.Yes
+
+    def change_dungeon(self, index):
+        """Switch to the dungeon picked in the drop-down, dropping the run."""
+        if self.dungeons[index].id == self.dungeon.id:
+            return
+        if not self.confirm_discard_run():
+            self.dungeon_box.setCurrentIndex([d.id for d in self.dungeons].index(self.dungeon.id))
+            return
+        self.show_dungeon(self.service.select_dungeon(self.dungeons[index].id))
 
-        generate_report_button = QPushButton("Generate Report")
-        generate_report_button.clicked.connect(self.generate_report)
-        self.main_layout.addWidget(generate_report_button)
+    def add_dungeon(self):
+        """Prompt for a new dungeon's name and depth, then switch to it."""
+        if not self.confirm_discard_run():
+            return
+        name, ok = QInputDialog.getText(self, "Add Dungeon", "Enter the dungeon name:")
+        if not ok or not name:
+            return
+        num_rooms, ok = QInputDialog.getInt(self, "Add Dungeon", "How many rooms does it have?", 5, 2)
+        if not ok:
+            return
+        try:
+            dungeon_id = self.service.add_dungeon(name, num_rooms)
+        except sqlite3.IntegrityError:
+            QMessageBox.critical(self, "Error", "This dungeon already exists.")
+            return
+        self.update_dungeon_list()
+        self.show_dungeon(self.service.select_dungeon(dungeon_id))
+
+    def show_query_stats(self):
+        stats_window = QMainWindow(self)
+        stats_window.setWindowTitle("Query Statistics")
+        stats_text = QPlainTextEdit(self.service.query_stats())
+        stats_text.setReadOnly(True)
+        stats_text.setLineWrapMode(QPlainTextEdit.NoWrap)
+        stats_text.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        stats_window.setCentralWidget(stats_text)
+        stats_window.resize(900, 500)
+        stats_window.show()
 
     def create_loot_dropdown(self, room):
-        self.cursor.execute("SELECT name FROM loot_items")
-        loot_items = [row[0] for row in self.cursor.fetchall()]
-
         loot_dropdown = QComboBox()
-        loot_dropdown.addItems(loot_items)
+        loot_dropdown.setEditable(True)
+        # Typed text must never be added to the model every drop-down shares
+        loot_dropdown.setInsertPolicy(QComboBox.NoInsert)
+        loot_dropdown.setModel(self.loot_model)
+
+        # Suggestions come from the loot index, which already matched them
+        completer = QCompleter(QStringListModel(), loot_dropdown)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        loot_dropdown.setCompleter(completer)
+        loot_dropdown.lineEdit().textEdited.connect(lambda text: self.suggest_loot(completer, text))
         return loot_dropdown
 
-    def update_loot_dropdowns(self):
-        """Update the loot drop-down lists in all rooms."""
-        for room in range(1, 6):
-            if "loot" in self.room_buttons[room]:
-                self.room_buttons[room]["loot"].clear()
-                self.room_buttons[room]["loot"].addItems([row[0] for row in self.cursor.execute("SELECT name FROM loot_items")])
+    def suggest_loot(self, completer, text):
+        """Offer the loot names matching what has been typed so far."""
+        completer.model().setStringList(self.loot_index.search(text, LOOT_SUGGESTIONS))
+        completer.complete()
+
+    def update_loot_dropdowns(self, new_loot_item):
+        """Insert a new loot item into the shared drop-down model."""
+        position = self.loot_index.add(new_loot_item)
+        self.loot_model.insertRows(position, 1)
+        self.loot_model.setData(self.loot_model.index(position), new_loot_item)
 
     def add_loot_item(self):
         """Prompt user to add a new loot item to the database."""
@@ -156,17 +310,23 @@ class DungeonTrackerApp(QMainWindow):
 
         if ok and new_loot_item:
             try:
-                self.cursor.execute("INSERT INTO loot_items (name) VALUES (?)", (new_loot_item,))
-                self.conn.commit()
+                self.service.add_loot_item(new_loot_item)
                 QMessageBox.information(self, "Success", f"'{new_loot_item}' has been added to the loot items.")
-                self.update_loot_dropdowns()
+                self.update_loot_dropdowns(new_loot_item)
             except sqlite3.IntegrityError:
                 QMessageBox.critical(self, "Error", "This loot item already exists.")
 
     def create_graphs(self):
         """Set up graphs for each room."""
+        if self.graphs_widget is not None:
+            self.graphs_widget.deleteLater()
+        self.graphs_widget = QWidget()
+        graphs_layout = QVBoxLayout(self.graphs_widget)
+        graphs_layout.setContentsMargins(0, 0, 0, 0)
+        self.graphs_layout.addWidget(self.graphs_widget)
+
         self.graphs = {}
-        for room in range(1, num_rooms + 1):
+        for room in self.service.door_rooms:
             set0 = QBarSet("Left")
             set1 = QBarSet("Right")
             set0 << 0
@@ -194,7 +354,7 @@ class DungeonTrackerApp(QMainWindow):
 
             chart_view = QChartView(chart)
             chart_view.setRenderHint(QPainter.Antialiasing)
-            self.main_layout.addWidget(chart_view)
+            graphs_layout.addWidget(chart_view)
 
             self.graphs[room] = {
                 "chart": chart,
@@ -202,19 +362,11 @@ class DungeonTrackerApp(QMainWindow):
                 "chart_view": chart_view
             }
 
-    def update_graph(self, room_id):
-        graph_data = {"Left": 0, "Right": 0}
-
-        self.cursor.execute("""
-            SELECT door, COUNT(*) 
-            FROM runs 
-            WHERE room_id = ? 
-            GROUP BY door
-        """, (room_id,))
-        rows = self.cursor.fetchall()
-        for row in rows:
-            graph_data[row[0]] = row[1]
+    def update_graphs(self):
+        for room_id, graph_data in self.service.door_chart_data().items():
+            self.update_graph(room_id, graph_data)
 
+    def update_graph(self, room_id, graph_data):
         series = self.graphs[room_id]["series"]
         series.clear()
 
@@ -228,55 +380,37 @@ class DungeonTrackerApp(QMainWindow):
 
     def record_choice(self, room, door):
         loot = self.room_buttons[room]["loot"].currentText().strip()
-        self.run_data.append((self.run_date, room, door, loot))
+        self.session.record_choice(room, door, loot)
 
-        if room != 5:
+        if room != self.session.num_rooms:
             self.room_buttons[room]["left"].setEnabled(False)
             self.room_buttons[room]["right"].setEnabled(False)
             next_room = room + 1
-            self.room_buttons[next_room]["left"].setEnabled(True)
+            if self.room_buttons[next_room]["left"] is not None:
+                self.room_buttons[next_room]["left"].setEnabled(True)
             self.room_buttons[next_room]["right"].setEnabled(True)
 
     def complete_run(self):
-        if not self.run_data:
+        if not self.session.run_data:
             QMessageBox.critical(self, "Error", "No data to save!")
             return
 
-        run_data_to_insert = []
-        for date, room, door, loot in self.run_data:
-            self.cursor.execute("SELECT id FROM rooms WHERE name = ?", (f"Room {room}",))
-            room_id = self.cursor.fetchone()
-            if not room_id:
-                QMessageBox.critical(self, "Error", f"Room {room} not found!")
-                return
-            room_id = room_id[0]
-
-            loot_id = None
-            if loot:
-                self.cursor.execute("SELECT id FROM loot_items WHERE name = ?", (loot,))
-                loot_id = self.cursor.fetchone()
-                if loot_id:
-                    loot_id = loot_id[0]
-                else:
-                    QMessageBox.critical(self, "Error", f"Loot item '{loot}' not found!")
-                    return
-
-            run_data_to_insert.append((date, room_id, door, loot_id))
-
-        self.cursor.executemany("INSERT INTO runs (run_date, room_id, door, loot_id) VALUES (?, ?, ?, ?)", run_data_to_insert)
-        self.conn.commit()
+        try:
+            self.service.complete_run(self.session.run_data, self.session.started_at)
+        except (ValueError, sqlite3.Error) as e:
+            # The run stays in the session, so it can be completed again
+            QMessageBox.critical(self, "Error", str(e))
+            return
 
         QMessageBox.information(self, "Success", "Run data saved successfully!")
 
-        for room in range(1, num_rooms + 1):
-            self.update_graph(room)
+        self.update_graphs()
 
-        self.run_data = []
-        self.current_room = 1
+        self.session.reset()
         for room in self.room_buttons:
-            if room != 5:
+            if self.room_buttons[room]["left"] is not None:
                 self.room_buttons[room]["left"].setEnabled(room == 1)
-                self.room_buttons[room]["right"].setEnabled(room == 1)
+            self.room_buttons[room]["right"].setEnabled(room == 1)
             self.room_buttons[room]["loot"].setCurrentIndex(0)
 
     def generate_report(self):
@@ -286,56 +420,56 @@ class DungeonTrackerApp(QMainWindow):
         report_layout = QVBoxLayout(report_widget)
         report_window.setCentralWidget(report_widget)
 
-        headers = ["Room", "Loot Obtained", "Left Door Correct %", "Right Door Correct %", "Visits"]
-        header_layout = QGridLayout()
-        for col, header in enumerate(headers):
-            label = QLabel(header)
-            header_layout.addWidget(label, 0, col)
-        report_layout.addLayout(header_layout)
-
-        for room in range(1, 6):
-            self.cursor.execute("""
-                SELECT li.name
-                FROM runs r
-                JOIN loot_items li ON r.loot_id = li.id
-                WHERE r.room_id = ?
-            """, (room,))
-            loot = [row[0] for row in self.cursor.fetchall()]
-
-            self.cursor.execute("""
-                SELECT door, COUNT(*) 
-                FROM runs 
-                WHERE room_id = ? 
-                GROUP BY door
-            """, (room,))
-            door_counts = {door: count for door, count in self.cursor.fetchall()}
-            total_visits = sum(door_counts.values())
-
-            left_correct = door_counts.get("left", 0)
-            right_correct = door_counts.get("right", 0)
-
-            left_correct_percentage = (left_correct / total_visits * 100) if total_visits > 0 else 0
-            right_correct_percentage = (right_correct / total_visits * 100) if total_visits > 0 else 0
-            left_correct_percentage_string = f"{left_correct_percentage:.2f}%"
-            right_correct_percentage_string = f"{right_correct_percentage:.2f}%"
-
-            loot_display = ", ".join(set(loot)) if loot else "No loot recorded"
-
-            if room == 5:
-                left_correct_percentage_string = "-"
-                right_correct_percentage_string = "-"
-
-            row_data = [f"Room {room}", loot_display, left_correct_percentage_string, right_correct_percentage_string, str(total_visits)]
-            row_layout = QGridLayout()
-            for col, data in enumerate(row_data):
-                label = QLabel(data)
-                row_layout.addWidget(label, 0, col)
-            report_layout.addLayout(row_layout)
-
+        model = ReportTableModel(self.service, "rooms", report_window)
+        table_view = QTableView()
+        table_view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        table_view.setModel(model)
+        table_view.setSortingEnabled(True)
+
+        views = self.service.report_views()
+        view_box = QComboBox()
+        for view, title in views:
+            view_box.addItem(title)
+
+        def change_view(index):
+            header = table_view.horizontalHeader()
+            header.blockSignals(True)
+            header.setSortIndicator(-1, Qt.AscendingOrder)
+            header.blockSignals(False)
+            model.set_view(views[index][0])
+
+        view_box.currentIndexChanged.connect(change_view)
+
+        filter_edit = QLineEdit()
+        filter_edit.setPlaceholderText("Filter")
+        # Re-query once typing pauses instead of on every key
+        filter_timer = QTimer(report_window)
+        filter_timer.setSingleShot(True)
+        filter_timer.setInterval(FILTER_DELAY_MS)
+        filter_timer.timeout.connect(lambda: model.set_filter(filter_edit.text().strip()))
+        filter_edit.textChanged.connect(filter_timer.start)
+
+        controls = QHBoxLayout()
+        controls.addWidget(view_box)
+        controls.addWidget(filter_edit)
+        report_layout.addLayout(controls)
+        report_layout.addWidget(table_view)
+
+        report_window.resize(900, 600)
         report_window.show()
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = DungeonTrackerApp()
+    parser = argparse.ArgumentParser(description="Dungeon Tracker")
+    parser.add_argument("--profile", action="store_true", help="time queries; adds a Debug menu")
+    parser.add_argument("--slow-query-ms", type=float, default=DEFAULT_SLOW_QUERY_MS)
+    args, qt_args = parser.parse_known_args()
+    logging.basicConfig(format="%(levelname)s %(message)s")
+    profiler = QueryProfiler(args.slow_query_ms) if args.profile else None
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    window = DungeonTrackerApp(profiler)
     window.show()
-    sys.exit(app.exec_())
+    status = app.exec_()
+    if profiler is not None:
+        print(profiler.report())
+    sys.exit(status)
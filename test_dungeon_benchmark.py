@@ -0,0 +1,92 @@
+import pytest
+
+from dungeon_benchmark import (
+    BENCHMARKS,
+    COMPARISONS,
+    BenchmarkResult,
+    legacy_complete_run,
+    measure_app_import,
+    run_benchmark,
+    scaling_exponents,
+    synthetic_database,
+)
+from dungeon_synthetic import generate_runs, synthetic_loot_names
+from dungeon_tracker_logic import DungeonTrackerLogic
+
+
+@pytest.fixture(scope="module")
+def data_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("synthetic"))
+
+
+def bench(name, scale, data_dir, tmp_path):
+    return run_benchmark(name, scale, synthetic_database(scale, data_dir), tmp_path)
+
+
+def test_report_runs_two_queries_at_any_scale(data_dir, tmp_path):
+    for scale in (1000, 10000):
+        assert bench("generate_report", scale, data_dir, tmp_path).statements == 2
+        # Two per room plus the room list
+        legacy = bench("generate_report_legacy", scale, data_dir, tmp_path)
+        assert legacy.statements == 11
+
+
+def test_scaling_exponents_fit_time_against_visits():
+    results = [
+        BenchmarkResult("linear", 1000, "wal", 0.001, 0, 1),
+        BenchmarkResult("linear", 100000, "wal", 0.1, 0, 1),
+        BenchmarkResult("quadratic", 1000, "wal", 0.001, 0, 1),
+        BenchmarkResult("quadratic", 10000, "wal", 0.1, 0, 1),
+        BenchmarkResult("import_dungeon_tracker_app", 0, "", 0.1, 0, 0),
+    ]
+    exponents = scaling_exponents(results)
+    assert exponents.keys() == {("linear", "wal"), ("quadratic", "wal")}
+    assert exponents["linear", "wal"] == pytest.approx(1)
+    assert exponents["quadratic", "wal"] == pytest.approx(2)
+
+
+def lookups(logic, save, runs):
+    """Count the room and loot id lookups save(logic, runs) makes."""
+    statements = []
+    logic.conn.set_trace_callback(statements.append)
+    save(logic, runs)
+    logic.conn.set_trace_callback(None)
+    return sum(
+        1
+        for sql in statements
+        if sql.lstrip().startswith("SELECT") and ("rooms" in sql or "loot_items" in sql)
+    )
+
+
+def test_save_runs_resolves_ids_in_bulk(tmp_path):
+    logic = DungeonTrackerLogic(str(tmp_path / "runs.db"))
+    logic.database_setup()
+    logic.save_runs([], loot_items=synthetic_loot_names())
+    runs = list(generate_runs(3000, seed=1))
+    visits = sum(len(run_data) for _, _, run_data in runs[:100])
+
+    assert lookups(logic, DungeonTrackerLogic.save_runs, runs[:1]) <= 1
+    assert lookups(logic, DungeonTrackerLogic.save_runs, runs[1:101]) <= 1
+
+    def save_legacy(logic, runs):
+        for _, _, run_data in runs:
+            legacy_complete_run(logic, run_data)
+
+    assert lookups(logic, save_legacy, runs[:100]) >= visits
+    logic.close()
+
+
+@pytest.mark.parametrize(
+    "name", [name for name in BENCHMARKS if name not in COMPARISONS]
+)
+def test_benchmark_runs_at_small_scale(name, data_dir, tmp_path):
+    result = bench(name, 1000, data_dir, tmp_path)
+    assert result.seconds > 0
+    assert result.peak_bytes > 0
+    if name.endswith("_cached") or name.startswith("record_choice"):
+        assert result.statements == 0
+
+
+def test_app_import_stays_lazy():
+    _, heavy = measure_app_import()
+    assert heavy == []
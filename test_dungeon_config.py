@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from dungeon_config import (
+    DEFAULT_DB_PATH,
+    PROFILES,
+    StorageProfile,
+    load_storage_profile,
+)
+
+
+def write_config(tmp_path, text):
+    path = tmp_path / "dungeon_tracker.ini"
+    path.write_text(text)
+    return str(path)
+
+
+def test_defaults_without_config_or_environment(tmp_path):
+    missing = str(tmp_path / "missing.ini")
+    profile = load_storage_profile(missing, environ={})
+    assert profile == PROFILES["wal"]
+    assert profile.path == DEFAULT_DB_PATH
+
+
+def test_config_paths_are_relative_to_the_file(tmp_path):
+    config = write_config(
+        tmp_path,
+        "[storage]\nprofile = legacy\npath = data/runs.db\ncache_size = -4096\n",
+    )
+    profile = load_storage_profile(config, environ={})
+    assert profile.path == os.path.join(str(tmp_path), "data", "runs.db")
+    assert profile.journal_mode == "DELETE"
+    assert profile.cache_size == -4096
+
+
+def test_environment_overrides_the_file(tmp_path):
+    config = write_config(tmp_path, "[storage]\npath = runs.db\nmmap_size = 0\n")
+    environ = {
+        "DUNGEON_TRACKER_CONFIG": config,
+        "DUNGEON_TRACKER_PATH": str(tmp_path / "other.db"),
+        "DUNGEON_TRACKER_JOURNAL_MODE": "truncate",
+        "DUNGEON_TRACKER_PROFILE": "bulk",
+    }
+    profile = load_storage_profile(environ=environ)
+    assert profile.path == str(tmp_path / "other.db")
+    assert profile.journal_mode == "TRUNCATE"
+    assert profile.synchronous == "OFF"
+    assert profile.mmap_size == 0
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ("profile = fast", "Unknown storage profile 'fast'"),
+        ("page_size = 4096", "Unknown storage settings: page_size"),
+        ("journal_mode = fancy", "Invalid journal_mode 'FANCY'"),
+    ],
+)
+def test_bad_settings_are_rejected(tmp_path, text, message):
+    config = write_config(tmp_path, f"[storage]\n{text}\n")
+    with pytest.raises(ValueError, match=message):
+        load_storage_profile(config, environ={})
+
+
+def test_connect_applies_the_pragmas(tmp_path):
+    profile = StorageProfile(path=str(tmp_path / "runs.db"), cache_size=-1234)
+    conn = profile.connect()
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    assert conn.execute("PRAGMA cache_size").fetchone() == (-1234,)
+    assert conn.execute("PRAGMA busy_timeout").fetchone() == (5000,)
+    conn.close()
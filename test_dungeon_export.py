@@ -0,0 +1,61 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+import dungeon_export  # noqa: E402
+from dungeon_export import ColumnarAnalytics, main  # noqa: E402
+from dungeon_tracker_logic import DungeonTrackerLogic  # noqa: E402
+
+
+@pytest.fixture
+def logic(tmp_path):
+    logic = DungeonTrackerLogic(str(tmp_path / "runs.db"))
+    logic.database_setup()
+    logic.add_loot_item("Coin")
+    logic.complete_run([("2024-01-01", 1, "left", "Coin")])
+    yield logic
+    logic.close()
+
+
+def test_export_keeps_the_dungeon_depth(logic, tmp_path):
+    dungeon_id = logic.add_dungeon("Shifting Altars", 3)
+    logic.select_dungeon(dungeon_id)
+    logic.complete_run(
+        [("2024-01-01", 1, "right", "Coin"), ("2024-01-01", 2, "left", "")]
+    )
+    path = str(tmp_path / "altars.npz")
+    assert logic.export_columnar(path) == 2
+
+    analytics = ColumnarAnalytics.load(path)
+    assert analytics.num_rooms == 3
+    assert analytics.report() == logic.get_report()
+
+
+def test_cli_exports_the_selected_dungeon(logic, tmp_path, capsys):
+    dungeon_id = logic.add_dungeon("Shifting Altars", 3)
+    path = str(tmp_path / "altars.npz")
+    main(["--db", logic.db_path, "--dungeon", str(dungeon_id), "export", path])
+    assert "Exported 0 visits" in capsys.readouterr().out
+    assert ColumnarAnalytics.load(path).num_rooms == 3
+
+    main(["--db", logic.db_path, "export", path])
+    assert "Exported 1 visits" in capsys.readouterr().out
+    assert len(ColumnarAnalytics.load(path).report().rooms) == 5
+
+
+def test_export_reads_one_snapshot(logic, tmp_path, monkeypatch):
+    fetch = dungeon_export.fetch_loot_dictionary
+
+    def fetch_while_another_writer_commits(cursor):
+        # Lands between the row count and the streamed rows
+        other = DungeonTrackerLogic(logic.db_path)
+        other.complete_run([("2024-01-02", 1, "right", "")])
+        other.close()
+        return fetch(cursor)
+
+    monkeypatch.setattr(
+        dungeon_export, "fetch_loot_dictionary", fetch_while_another_writer_commits
+    )
+    path = str(tmp_path / "runs.npz")
+    assert logic.export_columnar(path) == 1
+    assert len(ColumnarAnalytics.load(path).room_id) == 1
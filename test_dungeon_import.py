@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from dungeon_import import import_file, main
+from dungeon_tracker_logic import DungeonTrackerLogic
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "runs.db")
+    logic = DungeonTrackerLogic(path)
+    logic.database_setup()
+    logic.close()
+    return path
+
+
+def open_logic(db_path):
+    logic = DungeonTrackerLogic(db_path)
+    logic.database_setup()
+    return logic
+
+
+def test_csv_import_groups_runs_and_creates_loot(db_path, tmp_path, capsys):
+    path = tmp_path / "history.csv"
+    path.write_text(
+        "run_date,room,door,loot\n"
+        "2024-01-01,1,left,Coin\n"
+        "2024-01-01,2,Right,\n"
+        "2024-01-01,1,right,Map\n"
+        "2024-01-02,1,left,\n"
+    )
+    assert main([str(path), "--db", db_path, "--quiet"]) == 0
+    assert "Imported 4 rows" in capsys.readouterr().out
+
+    logic = open_logic(db_path)
+    assert sorted(logic.get_loot_items()) == ["Coin", "Map"]
+    assert logic.get_graph_data(1) == {"Left": 2, "Right": 1}
+    assert logic.get_graph_data(2) == {"Left": 0, "Right": 1}
+    depths = sorted(summary.depth for summary in logic.get_run_summaries())
+    assert depths == [1, 1, 2]
+    logic.close()
+
+
+def test_jsonl_import_rejects_bad_lines(db_path, tmp_path, capsys):
+    path = tmp_path / "history.jsonl"
+    lines = [
+        {"run_date": "2024-01-01", "room": 1, "door": "left", "loot": "Coin"},
+        {"run_date": "01/02/2024", "room": 1, "door": "left"},
+        {"run_date": "2024-01-01", "room": 6, "door": "left"},
+        {"run_date": "2024-01-01", "room": 2, "door": "up"},
+        [1, "left"],
+        {"run_date": "2024-01-01", "room": 2, "door": "right"},
+    ]
+    path.write_text("\n".join(json.dumps(line) for line in lines) + "\n{oops\n")
+    assert main([str(path), "--db", db_path, "--quiet"]) == 0
+    captured = capsys.readouterr()
+    assert "Imported 2 rows" in captured.out
+    assert captured.err.splitlines() == [
+        "line 2: invalid run_date '01/02/2024'",
+        "line 3: room 6 is out of range",
+        "line 4: invalid door 'up'",
+        "line 5: record is not an object",
+        "line 7: invalid JSON: Expecting property name enclosed in double quotes: "
+        "line 1 column 2 (char 1)",
+    ]
+
+    logic = open_logic(db_path)
+    assert [summary.depth for summary in logic.get_run_summaries()] == [2]
+    logic.close()
+
+
+def test_run_field_groups_visits(db_path, tmp_path):
+    path = tmp_path / "history.jsonl"
+    visit = {"run_date": "2024-01-01", "door": "left"}
+    path.write_text(
+        "\n".join(
+            json.dumps({**visit, "run": run, "room": room})
+            for run, room in [("a", 1), ("a", 2), ("b", 3), ("b", 4), ("b", 5)]
+        )
+    )
+    logic = open_logic(db_path)
+    # Without the run field, rooms 1-5 on one day would make a single run
+    assert import_file(logic, str(path), "jsonl")[0] == 5
+    depths = sorted(summary.depth for summary in logic.get_run_summaries())
+    assert depths == [2, 3]
+    logic.close()
+
+
+def test_import_commits_whole_runs_in_chunks(db_path, tmp_path, monkeypatch):
+    path = tmp_path / "history.csv"
+    path.write_text(
+        "run_date,room,door,loot\n"
+        + "".join(f"2024-01-01,{room},left,\n" for _ in range(5) for room in (1, 2))
+    )
+    logic = open_logic(db_path)
+    chunks = []
+    save_runs = logic.save_runs
+    monkeypatch.setattr(
+        logic,
+        "save_runs",
+        lambda runs, **kwargs: chunks.append(len(runs)) or save_runs(runs, **kwargs),
+    )
+    rows, _ = import_file(logic, str(path), "csv", chunk_size=3)
+    assert rows == 10
+    # A run is never split across transactions, so chunks end on run edges
+    assert chunks == [2, 2, 1]
+    assert logic.get_graph_data(2) == {"Left": 5, "Right": 0}
+    logic.close()
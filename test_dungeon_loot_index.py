@@ -0,0 +1,29 @@
+from dungeon_loot_index import LootIndex
+
+
+def test_search_matches_any_word_start_case_insensitively():
+    names = ["Cat Eye Glasses", "Mamonite", "Twilight Gemstone", "Coin"]
+    index = LootIndex(names)
+    assert index.search("gla") == ["Cat Eye Glasses"]
+    assert index.search("C") == ["Cat Eye Glasses", "Coin"]
+    assert index.search("  gem ") == ["Twilight Gemstone"]
+    assert index.search("light") == []
+    assert index.search("") == sorted(names)
+
+
+def test_add_inserts_in_place_and_returns_position():
+    index = LootIndex(["Coin", "Map"])
+    assert index.add("crown") == 1
+    assert index.names == ["Coin", "crown", "Map"]
+    assert index.add("crown") == 1
+    assert len(index) == 3
+    assert "crown" in index
+    assert index.search("cr") == ["crown"]
+
+
+def test_search_stops_at_the_limit():
+    index = LootIndex([f"Synthetic Loot {i:03d}" for i in range(100)])
+    assert len(index.search("loot", limit=10)) == 10
+    assert index.search("loot 09", limit=5) == [
+        f"Synthetic Loot {i:03d}" for i in range(90, 95)
+    ]
@@ -0,0 +1,160 @@
+import re
+import sqlite3
+import time
+
+import pytest
+
+from dungeon_migrations import (
+    SCHEMA_VERSION,
+    create_base_schema,
+    get_schema_version,
+    migrate,
+    verify_door_stats,
+)
+from dungeon_report import fetch_door_counts, fetch_room_loot, fetch_run_summaries
+from dungeon_tracker_logic import DungeonTrackerLogic
+from dungeon_trends import (
+    fetch_bucketed_door_counts,
+    fetch_daily_door_series,
+    fetch_door_counts_between,
+    fetch_loot_counts_between,
+)
+
+INDEXED_STEP = r"USING (COVERING )?INDEX|USING (INTEGER )?PRIMARY KEY"
+TABLES = {
+    "runs",
+    "rooms",
+    "loot_items",
+    "dungeons",
+    "dungeon_runs",
+    "room_door_stats",
+    "daily_rollups",
+}
+
+
+class PlanRecorder:
+    """Cursor wrapper that records the query plan of every query it runs."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.plans = []
+
+    def execute(self, sql, params=()):
+        plan = self.cursor.connection.execute("EXPLAIN QUERY PLAN " + sql, params)
+        self.plans.append((sql, [row[3] for row in plan]))
+        return self.cursor.execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+
+def count_rows(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def make_legacy_db(path, num_runs):
+    """Write a version-0 database the way the original app laid it out.
+
+    Runs visit rooms 1..n (n cycling 1-5), alternating doors, with loot in
+    every third room, over a week of dates.
+    """
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    create_base_schema(cursor)
+    cursor.executemany(
+        "INSERT INTO loot_items (name) VALUES (?)", [("Coin",), ("Map",), ("Crown",)]
+    )
+    visits = [
+        (
+            f"2024-01-{run % 7 + 1:02d}",
+            room,
+            "left" if (run + room) % 2 else "right",
+            (run + room) % 3 + 1 if room % 3 == 0 else None,
+        )
+        for run in range(num_runs)
+        for room in range(1, run % 5 + 2)
+    ]
+    cursor.executemany(
+        "INSERT INTO runs (run_date, room_id, door, loot_id) VALUES (?, ?, ?, ?)",
+        visits,
+    )
+    conn.commit()
+    conn.close()
+    return len(visits)
+
+
+@pytest.fixture
+def legacy_copy(tmp_path):
+    path = str(tmp_path / "dungeon_runs.db")
+    make_legacy_db(path, 40)
+    return path
+
+
+def test_upgrade_from_version_0_keeps_every_row(legacy_copy):
+    conn = sqlite3.connect(legacy_copy)
+    assert get_schema_version(conn) == 0
+    before = {
+        table: count_rows(conn, table) for table in ("rooms", "loot_items", "runs")
+    }
+    assert before["runs"]
+
+    assert migrate(conn) == SCHEMA_VERSION
+    for table, count in before.items():
+        assert count_rows(conn, table) == count
+    assert conn.execute(
+        "SELECT COUNT(*) FROM runs WHERE dungeon_run_id IS NULL OR dungeon_id != 1"
+    ).fetchone() == (0,)
+    assert conn.execute("SELECT SUM(count) FROM daily_rollups").fetchone() == (
+        before["runs"],
+    )
+    assert verify_door_stats(conn.cursor()) == []
+
+    # Running it again is a no-op
+    assert migrate(conn) == SCHEMA_VERSION
+    assert count_rows(conn, "runs") == before["runs"]
+    conn.close()
+
+
+def hot_query_plans(path):
+    logic = DungeonTrackerLogic(path)
+    logic.database_setup()
+    recorder = PlanRecorder(logic.cursor)
+    fetch_door_counts(recorder, 1)
+    fetch_room_loot(recorder, 1)
+    fetch_run_summaries(recorder, 1, limit=10)
+    fetch_run_summaries(recorder, 1, run_date="2024-01-01")
+    fetch_door_counts_between(recorder, 1, "2024-01-01", "2024-12-31")
+    fetch_loot_counts_between(recorder, 1)
+    fetch_daily_door_series(recorder, 1, 1)
+    fetch_bucketed_door_counts(recorder, 1, [("7.0", "2024-07-02")])
+    logic.cursor = recorder
+    logic._resolve_loot_ids(["Coin", "Map"])
+    logic.close()
+    return recorder.plans
+
+
+def test_hot_queries_use_indexes(legacy_copy):
+    plans = hot_query_plans(legacy_copy)
+    assert len(plans) == 9
+    for sql, plan in plans:
+        steps = "\n".join(plan)
+        assert re.search(INDEXED_STEP, steps), sql
+        for step in plan:
+            table = re.match(r"SCAN (\w+)", step)
+            assert table is None or table.group(1) not in TABLES, (sql, steps)
+
+
+def test_dungeon_runs_backfill_scales_linearly(tmp_path):
+    path = str(tmp_path / "dungeon_runs.db")
+    visits = make_legacy_db(path, 8000)
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    migrate(conn)
+    elapsed = time.perf_counter() - start
+
+    # A per-row scan of the grouping table took tens of seconds at this size
+    assert elapsed < 5, elapsed
+    assert conn.execute(
+        "SELECT COUNT(*), COUNT(DISTINCT dungeon_run_id) FROM runs"
+    ).fetchone() == (visits, 8000)
+    conn.close()
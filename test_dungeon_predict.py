@@ -0,0 +1,70 @@
+import math
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from dungeon_predict import (  # noqa: E402
+    DoorPredictor,
+    beta_cdf,
+    beta_credible_interval,
+    beta_quantile,
+    log_gamma,
+)
+
+
+def test_beta_cdf_matches_closed_forms():
+    x = np.linspace(0, 1, 11)
+    assert np.allclose(beta_cdf(x, 1, 1), x)
+    assert np.allclose(beta_cdf(x, 5, 1), x**5)
+    assert np.allclose(beta_cdf(x, 1, 3), 1 - (1 - x) ** 3)
+
+
+def test_beta_quantile_inverts_the_cdf():
+    alpha = np.array([1.0, 2.5, 40.0, 900.0])
+    beta = np.array([1.0, 7.0, 60.0, 1100.0])
+    for q in (0.025, 0.5, 0.975):
+        assert np.allclose(beta_cdf(beta_quantile(q, alpha, beta), alpha, beta), q)
+
+
+def test_small_samples_get_exact_intervals():
+    mean, lower, upper = beta_credible_interval(5.0, 1.0)
+    assert mean == pytest.approx(5 / 6)
+    assert lower == pytest.approx(0.025**0.2)
+    assert upper == pytest.approx(0.975**0.2)
+
+
+def test_four_of_four_left_is_not_yet_favoured():
+    prediction = DoorPredictor([1], [[4, 0]]).predictions()[1]
+    assert prediction.left_lower == pytest.approx(0.478, abs=1e-3)
+    assert prediction.favoured_door is None
+
+    prediction = DoorPredictor([1], [[6, 0]]).predictions()[1]
+    assert prediction.favoured_door == "left"
+
+
+def test_large_samples_match_beta_draws():
+    alpha = np.array([30.0, 6000.0])
+    beta = np.array([20.0, 5000.0])
+    _, lower, upper = beta_credible_interval(alpha, beta)
+    draws = np.random.default_rng(0).beta(alpha, beta, size=(200000, 2))
+    expected = np.quantile(draws, [0.025, 0.975], axis=0)
+    assert np.allclose([lower, upper], expected, atol=2e-3)
+
+
+def test_log_gamma_matches_math():
+    x = np.array([0.1, 0.5, 1.0, 2.5, 40.0, 9999.5])
+    expected = [math.lgamma(value) for value in x]
+    assert np.allclose(log_gamma(x), expected, rtol=1e-13, atol=1e-13)
+
+
+def test_many_distinct_slices_stay_vectorized():
+    rng = np.random.default_rng(0)
+    counts = rng.integers(0, 5000, size=(20000, 2))
+    start = time.perf_counter()
+    stats = DoorPredictor(range(20000), counts).statistics()
+    # Per-slice Python loops took several seconds here
+    assert time.perf_counter() - start < 2
+    assert np.all(stats["left_lower"] <= stats["left_mean"])
+    assert np.all(stats["left_mean"] <= stats["left_upper"])
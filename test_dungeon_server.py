@@ -0,0 +1,129 @@
+import asyncio
+import json
+
+import pytest
+
+from dungeon_server import StatsServer
+from dungeon_tracker_logic import DungeonTrackerLogic
+
+
+async def request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    data = json.loads(await reader.readexactly(length))
+    writer.close()
+    await writer.wait_closed()
+    return status, data
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "runs.db")
+    logic = DungeonTrackerLogic(path)
+    logic.database_setup()
+    logic.add_dungeon("Shifting Altars", 3)
+    logic.close()
+    return path
+
+
+def run_server(db_path, scenario):
+    async def main():
+        server = StatsServer(db_path, read_pool_size=2)
+        await server.start("127.0.0.1", 0)
+        port = server.server.sockets[0].getsockname()[1]
+        try:
+            return await scenario(port)
+        finally:
+            await server.close()
+
+    return asyncio.run(main())
+
+
+def test_runs_and_stats_are_per_dungeon(db_path):
+    async def scenario(port):
+        run = {"run_data": [["2024-01-01", 1, "right", ""]]}
+        assert (await request(port, "POST", "/runs?dungeon=2", run))[0] == 201
+        assert (await request(port, "POST", "/runs", run))[0] == 201
+        assert (await request(port, "POST", "/runs?dungeon=2", run))[0] == 201
+
+        status, data = await request(port, "GET", "/stats/doors?dungeon=2")
+        assert status == 200
+        assert data["doors"] == {
+            "1": {"Left": 0, "Right": 2},
+            "2": {"Left": 0, "Right": 0},
+        }
+        _, data = await request(port, "GET", "/stats/doors")
+        assert data["doors"]["1"] == {"Left": 0, "Right": 1}
+        assert len(data["doors"]) == 4
+        _, data = await request(port, "GET", "/stats/report?dungeon=2")
+        assert len(data["rooms"]) == 3
+        _, data = await request(port, "GET", "/runs?dungeon=2")
+        assert len(data["runs"]) == 2
+        _, data = await request(port, "GET", "/dungeons")
+        assert [d["num_rooms"] for d in data["dungeons"]] == [5, 3]
+
+    run_server(db_path, scenario)
+
+
+def test_unknown_or_malformed_dungeon_is_rejected(db_path):
+    async def scenario(port):
+        run = {"run_data": [["2024-01-01", 1, "right", ""]]}
+        assert (await request(port, "POST", "/runs?dungeon=9", run))[0] == 404
+        assert (await request(port, "GET", "/stats/doors?dungeon=9"))[0] == 404
+        assert (await request(port, "GET", "/stats/doors?dungeon=x"))[0] == 400
+        # A room the dungeon does not have fails only that run
+        bad = {"run_data": [["2024-01-01", 5, "right", ""]]}
+        assert (await request(port, "POST", "/runs?dungeon=2", bad))[0] == 400
+
+    run_server(db_path, scenario)
+
+
+async def raw_request(port, data):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    # The server hangs up after a malformed request
+    await reader.read()
+    writer.close()
+    await writer.wait_closed()
+    return status
+
+
+def test_malformed_requests_are_bad_requests(db_path):
+    async def scenario(port):
+        assert (await request(port, "GET", "/runs?limit=x"))[0] == 400
+        assert await raw_request(port, b"GARBAGE\r\n\r\n") == 400
+        assert await raw_request(
+            port, b"POST /loot HTTP/1.1\r\nContent-Length: x\r\n\r\n"
+        ) == 400
+        assert (await request(port, "GET", "/runs?limit=1"))[0] == 200
+
+    run_server(db_path, scenario)
+
+
+def test_close_closes_reader_connections(db_path, monkeypatch):
+    closed = []
+    close = DungeonTrackerLogic.close
+    monkeypatch.setattr(
+        DungeonTrackerLogic, "close", lambda self: closed.append(self) or close(self)
+    )
+
+    async def scenario(port):
+        # The pool hands out readers in turn, so both get a connection
+        assert (await request(port, "GET", "/loot"))[0] == 200
+        assert (await request(port, "GET", "/runs"))[0] == 200
+
+    run_server(db_path, scenario)
+    assert len(closed) == 3
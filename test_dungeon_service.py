@@ -0,0 +1,220 @@
+import sqlite3
+
+import pytest
+
+from dungeon_journal import RunJournal
+from dungeon_service import DungeonTrackerService, RunSession
+from dungeon_tracker_logic import DungeonTrackerLogic
+
+
+@pytest.fixture(params=[False, True], ids=["direct", "write-behind"])
+def service(tmp_path, request):
+    # Both GUIs use the cached logic directly; write-behind is for bulk writers
+    logic = DungeonTrackerLogic(
+        str(tmp_path / "runs.db"), cache=True, write_behind=request.param
+    )
+    logic.database_setup()
+    logic.add_loot_item("Coin")
+    logic.add_loot_item("Map")
+    yield DungeonTrackerService(logic)
+    logic.close()
+
+
+def record_run(service, doors, loot=()):
+    session = RunSession(service.num_rooms)
+    for room, door in enumerate(doors, start=1):
+        session.record_choice(room, door, loot[room - 1] if room <= len(loot) else "")
+    service.complete_run(session.run_data, session.started_at)
+    return session
+
+
+def test_chart_data_counts_completed_runs(service):
+    assert service.door_chart_data() == {
+        room: {"Left": 0, "Right": 0} for room in range(1, 5)
+    }
+    record_run(service, ["left", "right"])
+    record_run(service, ["left", "left", "right"])
+
+    chart_data = service.door_chart_data()
+    assert chart_data[1] == {"Left": 2, "Right": 0}
+    assert chart_data[2] == {"Left": 1, "Right": 1}
+    assert chart_data[3] == {"Left": 0, "Right": 1}
+    assert chart_data[4] == {"Left": 0, "Right": 0}
+
+
+def test_complete_run_rejects_unknown_loot(service):
+    with pytest.raises(ValueError):
+        record_run(service, ["left"], ["Crown"])
+    service.logic.flush()
+    assert service.door_chart_data()[1] == {"Left": 0, "Right": 0}
+
+
+def test_add_loot_item_rejects_duplicates(service):
+    service.add_loot_item("Crown")
+    with pytest.raises(sqlite3.IntegrityError):
+        service.add_loot_item("Crown")
+    assert sorted(service.loot_items()) == ["Coin", "Crown", "Map"]
+
+
+def test_report_combines_doors_and_loot(service):
+    record_run(service, ["left", "right", "right", "left", "right"], ["Coin", "Map"])
+    record_run(service, ["right"], ["Coin"])
+
+    report = service.report()
+    assert list(report.rooms) == [1, 2, 3, 4, 5]
+    room_1 = report.rooms[1]
+    assert (room_1.left_count, room_1.right_count, room_1.total_visits) == (1, 1, 2)
+    assert room_1.left_percentage == 50
+    assert room_1.loot == ["Coin"]
+    assert report.rooms[2].loot == ["Map"]
+    assert report.as_rows()[5][2:4] == ["-", "-"]
+
+
+def test_report_views_sort_filter_and_page(service):
+    record_run(service, ["left", "right"], ["Coin", "Map"])
+    record_run(service, ["right"], ["Map"])
+    record_run(service, ["right"], ["Map"])
+
+    columns, total, rows = service.open_report_view("loot", sort=2, descending=True)
+    assert columns[:3] == ["Room", "Loot", "Drops"]
+    assert total == 3
+    assert rows[0] == [1, "Map", 2, 0, 2]
+
+    _, total, rows = service.open_report_view("visits", text="Coin")
+    assert total == 1
+    assert rows[0][3:] == [1, "left", "Coin"]
+    assert service.report_page("visits", 1) == []
+
+
+def test_room_report_view_includes_predictions(service):
+    pytest.importorskip("numpy")
+    record_run(service, ["left"])
+    columns, total, rows = service.open_report_view("rooms")
+    assert total == 5
+    assert rows[0][:7] == [1, "", 100.0, 0.0, 1, 0, 1]
+
+
+def test_select_dungeon_scopes_statistics(service):
+    record_run(service, ["left"])
+    dungeon_id = service.add_dungeon("Shifting Altars", 3)
+    dungeon = service.select_dungeon(dungeon_id)
+    assert (dungeon.name, dungeon.num_rooms) == ("Shifting Altars", 3)
+    assert list(service.door_rooms) == [1, 2]
+    assert service.door_chart_data()[1] == {"Left": 0, "Right": 0}
+
+    record_run(service, ["right", "right", "right"])
+    assert service.door_chart_data() == {
+        1: {"Left": 0, "Right": 1},
+        2: {"Left": 0, "Right": 1},
+    }
+    service.select_dungeon(1)
+    assert service.door_chart_data()[1] == {"Left": 1, "Right": 0}
+
+
+def test_run_session_enables_one_room_at_a_time():
+    session = RunSession(3)
+    assert session.is_room_enabled(1)
+    session.record_choice(1, "left", "Coin")
+    assert not session.is_room_enabled(1)
+    assert session.is_room_enabled(2)
+    assert session.run_data == [(session.run_date, 1, "left", "Coin")]
+    assert session.started_at is not None
+
+    session.reset()
+    assert session.run_data == []
+    assert session.started_at is None
+    assert session.is_room_enabled(1)
+
+
+def test_run_session_resumes_from_journal(tmp_path):
+    journal = RunJournal(str(tmp_path / "runs.journal"))
+    session = RunSession(5, journal, dungeon_id=1)
+    session.record_choice(1, "left", "Coin")
+    session.record_choice(2, "right", "")
+
+    resumed = RunSession(5, journal, dungeon_id=1)
+    assert resumed.resume()
+    assert resumed.run_data == session.run_data
+    assert resumed.started_at == session.started_at
+    assert resumed.is_room_enabled(3)
+
+    resumed.reset()
+    assert not RunSession(5, journal, dungeon_id=1).resume()
+    journal.close()
+
+
+def test_cached_stats_see_other_writers(service):
+    assert service.door_chart_data()[1] == {"Left": 0, "Right": 0}
+    other = DungeonTrackerLogic(service.logic.db_path)
+    other.complete_run([("2024-01-01", 1, "right", "")])
+    other.add_loot_item("Crown")
+    other.close()
+
+    assert service.door_chart_data()[1] == {"Left": 0, "Right": 1}
+    assert "Crown" in service.loot_items()
+
+
+def test_unsorted_report_view_pages_without_a_copy(service):
+    for _ in range(3):
+        record_run(service, ["left", "right"])
+    source = service.logic.get_report_rows("visits", page_size=4)
+    assert source.query() == 6
+    assert [len(source.page(number)) for number in range(3)] == [4, 2, 0]
+    service.logic.cursor.execute("SELECT name FROM sqlite_temp_master")
+    assert service.logic.cursor.fetchall() == []
+
+
+def test_report_filter_matches_wildcards_literally(service):
+    service.add_loot_item("100%_Coin")
+    record_run(service, ["left", "right"], ["Coin", "100%_Coin"])
+
+    assert service.open_report_view("loot", text="%_")[1] == 1
+    assert service.open_report_view("loot", text="0%")[1] == 1
+    assert service.open_report_view("loot", text="C_in")[1] == 0
+
+
+def test_journal_replay_skips_corrupt_lines(tmp_path):
+    path = str(tmp_path / "runs.journal")
+    journal = RunJournal(path)
+    journal.append(1, "2024-01-01T10:00:00", ("2024-01-01", 1, "left", "Coin"))
+    with open(path, "ab") as f:
+        f.write(b'\x00\x00{"dungeon_id": 1, "ro\n[1, 2]\n')
+    journal.append(1, "2024-01-01T10:00:00", ("2024-01-01", 2, "right", ""))
+
+    pending = journal.replay()
+    assert pending.run_data == [
+        ("2024-01-01", 1, "left", "Coin"),
+        ("2024-01-01", 2, "right", ""),
+    ]
+    journal.close()
+
+
+def test_predictions_follow_committed_counts(service):
+    pytest.importorskip("numpy")
+    assert service.door_predictions()[1].trials == 0
+    record_run(service, ["left"])
+    other = DungeonTrackerLogic(service.logic.db_path)
+    for _ in range(5):
+        other.complete_run([("2024-01-01", 1, "right", "")])
+    other.close()
+
+    prediction = service.door_predictions()[1]
+    assert prediction.trials == 6
+    assert prediction.left_mean == pytest.approx(2 / 8)
+    assert service.door_chart_data()[1] == {"Left": 1, "Right": 5}
+
+
+def test_cached_reads_check_data_version_once_per_refresh(tmp_path):
+    logic = DungeonTrackerLogic(str(tmp_path / "runs.db"), cache=True)
+    logic.database_setup()
+    service = DungeonTrackerService(logic)
+    service.door_chart_data()
+
+    statements = []
+    logic.conn.set_trace_callback(statements.append)
+    service.door_chart_data()
+    assert statements == ["PRAGMA data_version"]
+    del statements[:]
+    logic.get_graph_data(1)
+    assert statements == []
+    logic.close()
@@ -0,0 +1,34 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from dungeon_simulator import (  # noqa: E402
+    DEFAULT_TRIALS,
+    DungeonModel,
+    default_chunk_size,
+    simulate,
+)
+
+MODEL = DungeonModel(
+    left_counts=np.array([8, 2, 5, 0], dtype=np.int64),
+    right_counts=np.array([2, 8, 5, 0], dtype=np.int64),
+    loot_rates=np.array([0.5, 0.1, 0.2, 1.0]),
+)
+
+
+def test_default_run_splits_across_workers():
+    assert DEFAULT_TRIALS // default_chunk_size(DEFAULT_TRIALS) >= 8
+    assert default_chunk_size(100) == 10_000
+
+
+def test_results_do_not_depend_on_workers():
+    trials = 50_000
+    local = simulate(MODEL, "follow_majority", trials, seed=7, workers=1)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        pooled = simulate(MODEL, "follow_majority", trials, seed=7, executor=executor)
+        other = simulate(MODEL, "random", trials, seed=7, executor=executor)
+    assert pooled.trials == local.trials == other.trials == trials
+    assert np.array_equal(pooled.depth_counts, local.depth_counts)
+    assert pooled.loot_sum == pytest.approx(local.loot_sum)
@@ -0,0 +1,180 @@
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+from dungeon_tracker_logic import DungeonTrackerLogic
+from dungeon_write_behind import WriteBehindError
+
+RUN = [("2024-01-01", 1, "left", ""), ("2024-01-01", 2, "right", "")]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "runs.db")
+    logic = DungeonTrackerLogic(path)
+    logic.database_setup()
+    logic.close()
+    return path
+
+
+def fail_inserts(db_path):
+    """Make every later insert into runs abort, as a full disk would."""
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TRIGGER fail_runs BEFORE INSERT ON runs "
+        "BEGIN SELECT RAISE(ABORT, 'disk full'); END"
+    )
+    conn.commit()
+    conn.close()
+
+
+def allow_inserts(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TRIGGER fail_runs")
+    conn.commit()
+    conn.close()
+
+
+def count_runs(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_select_dungeon_restarts_writer_after_commit_error(db_path):
+    logic = DungeonTrackerLogic(db_path, write_behind=True)
+    dungeon_id = logic.add_dungeon("Other", 3)
+    fail_inserts(db_path)
+    logic.complete_run(RUN)
+    with pytest.raises(Exception):
+        logic.select_dungeon(dungeon_id)
+    allow_inserts(db_path)
+
+    logic.select_dungeon(dungeon_id)
+    logic.complete_run(RUN)
+    logic.flush()
+    assert count_runs(db_path) == 2
+    logic.close()
+
+
+def test_close_closes_connection_when_commit_failed(db_path):
+    logic = DungeonTrackerLogic(db_path, write_behind=True)
+    fail_inserts(db_path)
+    logic.complete_run(RUN)
+    with pytest.raises(Exception):
+        logic.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        logic.conn.execute("SELECT 1")
+
+
+def test_failed_commit_invalidates_cache_and_returns_lost_runs(db_path):
+    fail_inserts(db_path)
+    logic = DungeonTrackerLogic(db_path, cache=True, write_behind=True)
+    assert logic.get_graph_data(1) == {"Left": 0, "Right": 0}
+    logic.complete_run(RUN)
+    assert logic.get_graph_data(1) == {"Left": 1, "Right": 0}
+
+    with pytest.raises(WriteBehindError) as excinfo:
+        logic.flush()
+    assert [run[2] for run in excinfo.value.runs] == [RUN]
+    assert isinstance(excinfo.value.__cause__, sqlite3.IntegrityError)
+    assert count_runs(db_path) == 0
+    assert logic.get_graph_data(1) == {"Left": 0, "Right": 0}
+    logic.close()
+
+
+def test_cached_read_raises_pending_commit_error(db_path):
+    logic = DungeonTrackerLogic(db_path, cache=True, write_behind=True)
+    logic.get_graph_data(1)
+    fail_inserts(db_path)
+    logic.complete_run(RUN)
+    # Let the writer thread try the group without flushing from this thread
+    deadline = time.monotonic() + 5
+    while logic.writer.error is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    with pytest.raises(WriteBehindError):
+        logic.get_graph_data(1)
+    assert logic.get_graph_data(1) == {"Left": 0, "Right": 0}
+    logic.close()
+
+
+def test_failed_group_keeps_the_runs_that_can_commit(db_path):
+    logic = DungeonTrackerLogic(db_path, write_behind=True, flush_every=3)
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TRIGGER fail_room_2 BEFORE INSERT ON runs WHEN NEW.door = 'up' "
+        "BEGIN SELECT RAISE(ABORT, 'bad door'); END"
+    )
+    conn.commit()
+    conn.close()
+
+    bad_run = [("2024-01-01", 1, "up", "")]
+    logic.complete_run(RUN)
+    logic.complete_run(bad_run)
+    logic.complete_run(RUN)
+    with pytest.raises(WriteBehindError) as excinfo:
+        logic.flush()
+    assert [run[2] for run in excinfo.value.runs] == [bad_run]
+    assert count_runs(db_path) == 4
+    assert logic.verify_door_stats() == []
+    logic.close()
+
+
+def test_close_commits_everything_queued(db_path):
+    logic = DungeonTrackerLogic(db_path, write_behind=True, flush_every=7)
+    for _ in range(100):
+        logic.complete_run(RUN)
+    logic.close()
+
+    logic = DungeonTrackerLogic(db_path)
+    assert count_runs(db_path) == 200
+    assert len(logic.get_run_summaries()) == 100
+    assert logic.verify_door_stats() == []
+    logic.close()
+
+
+CRASHING_WRITER = """
+import os, sys
+from dungeon_tracker_logic import DungeonTrackerLogic
+
+logic = DungeonTrackerLogic(sys.argv[1], write_behind=True, flush_every=8)
+run = [("2024-01-01", 1, "left", "Coin"), ("2024-01-01", 2, "right", ""),
+       ("2024-01-01", 3, "left", "")]
+for number in range(100000):
+    logic.complete_run(run, create_missing_loot=True)
+    if number == 500:
+        logic.flush()
+        print("running", flush=True)
+"""
+
+
+@pytest.mark.parametrize("signum", [signal.SIGKILL, signal.SIGTERM])
+def test_crash_mid_stream_leaves_only_whole_runs(db_path, signum):
+    process = subprocess.Popen(
+        [sys.executable, "-c", CRASHING_WRITER, db_path],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    assert process.stdout.readline() == "running\n"
+    # Neither signal lets the process run close() or any finally block
+    process.send_signal(signum)
+    process.wait(timeout=10)
+    process.stdout.close()
+
+    logic = DungeonTrackerLogic(db_path)
+    summaries = logic.get_run_summaries()
+    assert summaries
+    assert {summary.depth for summary in summaries} == {3}
+    assert {summary.loot_count for summary in summaries} == {1}
+    assert count_runs(db_path) == 3 * len(summaries)
+    assert logic.verify_door_stats() == []
+    logic.close()